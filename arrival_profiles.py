@@ -0,0 +1,292 @@
+import math
+from statistics import NormalDist
+
+import numpy as np
+
+# --- Global Constants ---
+ARRIVAL_SHAPES = ("hold", "ramp", "step", "spike", "diurnal", "rows")
+ARRIVAL_PROCESSES = ("poisson", "uniform")
+DEFAULT_ARRIVALS = "poisson"
+DEFAULT_PERCENTILE = 99.0 # threads cover the concurrency needed 99% of the time under Poisson arrivals
+DEFAULT_SPIKE_WIDTH_SEC = 10
+DEFAULT_SPIKE_RISE_SEC = 1
+DAY_SEC = 86_400
+DEFAULT_DIURNAL_PEAK_SEC = 14 * 3600 # 14:00
+DIURNAL_KNOT_SEC = 300 # the daily curve is followed with 5-minute linear rows (2016 rows per week)
+
+# An arrival-rate profile (ARRIVAL_PROFILE in a test case YAML) is a list of
+# segments played one after the other, for example:
+#   ARRIVAL_PROFILE:
+#     - {shape: ramp, from: 0, to: 500, duration: 60}
+#     - {shape: hold, rps: 500, duration: 600}
+#     - {shape: step, from: 500, to: 1000, steps: 5, duration: 600}
+#     - {shape: spike, base: 500, peak: 3000, duration: 300, at: 120, width: 20}
+#     - {shape: diurnal, min: 50, max: 800, duration: 604800}
+#     - {shape: rows, rows: [[100, 200, 30], [200, 200, 60]]}
+# Every segment compiles to rows of (start_rps, end_rps, duration_sec) with a
+# linear rate inside each row, the schedule format of JMeter's Throughput
+# Shaping Timer, so the curve the calculator evaluates is exactly the one the
+# generated plan asks JMeter for.
+
+
+def _number(segment, key, default=None):
+    value = segment.get(key, default)
+    if value is None:
+        raise ValueError(f"Arrival profile segment {segment} needs '{key}'.")
+    value = float(value)
+    if value < 0:
+        raise ValueError(f"Arrival profile segment {segment}: '{key}' must not be negative.")
+    return value
+
+
+def _segment_rows(segment):
+    shape = str(segment.get("shape", "hold")).lower()
+    if shape not in ARRIVAL_SHAPES:
+        raise ValueError(f"Unknown arrival profile shape '{shape}' (choose from {', '.join(ARRIVAL_SHAPES)})")
+    if shape == "rows":
+        rows = np.asarray(segment.get("rows") or [], dtype=np.float64).reshape(-1, 3)
+        if (rows < 0).any():
+            raise ValueError("Arrival profile rows must not contain negative values.")
+        return rows
+
+    duration = _number(segment, "duration")
+    if shape == "hold":
+        rps = _number(segment, "rps")
+        return np.array([[rps, rps, duration]])
+    if shape == "ramp":
+        return np.array([[_number(segment, "from"), _number(segment, "to"), duration]])
+    if shape == "step":
+        steps = int(segment.get("steps", 1))
+        if steps < 1:
+            raise ValueError(f"Arrival profile segment {segment}: 'steps' must be at least 1.")
+        levels = np.linspace(_number(segment, "from"), _number(segment, "to"), steps) if steps > 1 \
+            else np.array([_number(segment, "to")])
+        return np.column_stack((levels, levels, np.full(steps, duration / steps)))
+    if shape == "spike":
+        base, peak = _number(segment, "base"), _number(segment, "peak")
+        width = _number(segment, "width", DEFAULT_SPIKE_WIDTH_SEC)
+        rise = min(_number(segment, "rise", DEFAULT_SPIKE_RISE_SEC), width / 2)
+        at = _number(segment, "at", max(duration - width, 0) / 2)
+        if at + width > duration:
+            raise ValueError(f"Arrival profile segment {segment}: the spike ends after the segment.")
+        return np.array([
+            [base, base, at],
+            [base, peak, rise],
+            [peak, peak, width - 2 * rise],
+            [peak, base, rise],
+            [base, base, duration - at - width],
+        ])
+    # diurnal: a raised cosine between min and max, peaking at peak_at every period
+    low, high = _number(segment, "min"), _number(segment, "max")
+    period = _number(segment, "period", DAY_SEC)
+    peak_at = _number(segment, "peak_at", DEFAULT_DIURNAL_PEAK_SEC)
+    knot = _number(segment, "knot", DIURNAL_KNOT_SEC)
+    if period <= 0 or knot <= 0:
+        raise ValueError(f"Arrival profile segment {segment}: 'period' and 'knot' must be greater than 0.")
+    knots = np.append(np.arange(0.0, duration, knot), duration)
+    rates = low + (high - low) * (1 + np.cos(2 * np.pi * (knots - peak_at) / period)) / 2
+    return np.column_stack((rates[:-1], rates[1:], np.diff(knots)))
+
+
+def compile_profile(profile):
+    """
+    Compiles an ARRIVAL_PROFILE (list of segments) into an (n, 3) array of
+    (start_rps, end_rps, duration_sec) rows. Zero-length rows are dropped.
+    """
+    if not profile:
+        raise ValueError("ARRIVAL_PROFILE is empty.")
+    if isinstance(profile, dict):
+        profile = [profile]
+    rows = np.concatenate([_segment_rows(dict(segment)) for segment in profile])
+    rows = rows[rows[:, 2] > 0]
+    if not rows.size:
+        raise ValueError("ARRIVAL_PROFILE has no segment with a positive duration.")
+    return rows
+
+
+def arrival_rate_series(rows, resolution=1.0):
+    """
+    Target arrival rate over time, evaluated for every time step at once: each
+    time is located in the rows' cumulative boundaries and interpolated
+    linearly inside its row. A week at 1 s resolution is 604800 points.
+    :return: (time_series, rps_series) NumPy arrays.
+    """
+    if resolution <= 0:
+        raise ValueError("resolution must be greater than 0.")
+    rows = np.asarray(rows, dtype=np.float64)
+    bounds = np.concatenate(([0.0], np.cumsum(rows[:, 2])))
+    time_series = np.arange(int(math.ceil(bounds[-1] / resolution)) + 1) * resolution
+    index = np.clip(np.searchsorted(bounds, time_series, side="right") - 1, 0, len(rows) - 1)
+    fraction = np.clip((time_series - bounds[index]) / rows[index, 2], 0.0, 1.0)
+    rps_series = rows[index, 0] + (rows[index, 1] - rows[index, 0]) * fraction
+    rps_series[time_series > bounds[-1]] = 0.0
+    return time_series, rps_series
+
+
+def sample_arrivals(rps_series, resolution=1.0, arrivals=DEFAULT_ARRIVALS, seed=None):
+    """Arrivals per time step: Poisson counts around the target rate, or the rate itself for uniform pacing."""
+    expected = np.asarray(rps_series, dtype=np.float64) * resolution
+    if arrivals == "uniform":
+        return np.rint(expected).astype(np.int64)
+    return np.random.default_rng(seed).poisson(expected)
+
+
+def concurrency_series(rps_series, response_time_ms, think_time_ms=0, arrivals=DEFAULT_ARRIVALS,
+                       percentile=DEFAULT_PERCENTILE):
+    """
+    Threads needed over time. Little's law gives the mean number of requests
+    in flight, L = lambda * W, with W the time a thread spends on one request
+    (response time plus any think time). With Poisson arrivals the number in
+    flight is itself Poisson with mean L (M/G/inf), so the percentile of
+    that distribution is used (normal approximation) instead of the mean.
+    """
+    mean = np.asarray(rps_series, dtype=np.float64) * (max(response_time_ms, 0) + max(think_time_ms, 0)) / 1000.0
+    if arrivals == "poisson":
+        z = NormalDist().inv_cdf(percentile / 100.0)
+        return mean + z * np.sqrt(mean)
+    return mean
+
+
+def calculate_open_model_values(profile, response_time_ms, think_time_ms=0, arrivals=DEFAULT_ARRIVALS,
+                                percentile=DEFAULT_PERCENTILE):
+    """
+    Open-model (arrival-rate) counterpart of calculate_closed_loop_values.
+    The Throughput Shaping Timer starts its schedule with the test and stops
+    the test when the schedule ends, so the profile length is the test length.
+    :param profile: ARRIVAL_PROFILE segments.
+    :param response_time_ms: Expected server response time at the target load.
+    :return: dict with the keys the runner reads (max_rps, total_requests_approx,
+             total_simulation_time) plus the open-model details, including threads_required.
+    """
+    if arrivals not in ARRIVAL_PROCESSES:
+        raise ValueError(f"Unknown ARRIVALS '{arrivals}' (choose from {', '.join(ARRIVAL_PROCESSES)})")
+    rows = compile_profile(profile)
+    duration = float(rows[:, 2].sum())
+    total_requests = float(((rows[:, 0] + rows[:, 1]) / 2 * rows[:, 2]).sum()) # exact integral of the linear rows
+    peak_rps = float(rows[:, :2].max())
+    # the rate of a row peaks at one of its ends, so the threads follow from the peak of the row ends
+    peak_threads = float(concurrency_series(peak_rps, response_time_ms, think_time_ms, arrivals, percentile))
+    return {
+        "max_rps": peak_rps,
+        "mean_rps": total_requests / duration,
+        "min_rps": float(rows[:, :2].min()),
+        "total_requests_approx": total_requests,
+        "total_simulation_time": duration,
+        "response_time_ms": response_time_ms,
+        "mean_concurrency_at_peak": peak_rps * (response_time_ms + think_time_ms) / 1000.0,
+        "threads_required": max(int(math.ceil(peak_threads)), 1),
+        "arrivals": arrivals,
+        "percentile": percentile,
+        "shaping_rows": int((shaping_timer_durations(rows) > 0).sum()),
+    }
+
+
+def open_model_values_from_params(params, response_time_ms):
+    """calculate_open_model_values for a test case's ARRIVAL_PROFILE, ARRIVALS and CONCURRENCY_PERCENTILE keys."""
+    return calculate_open_model_values(
+        params["ARRIVAL_PROFILE"],
+        response_time_ms,
+        arrivals=str(params.get("ARRIVALS", DEFAULT_ARRIVALS)).lower(),
+        percentile=float(params.get("CONCURRENCY_PERCENTILE", DEFAULT_PERCENTILE)),
+    )
+
+
+# --- JMeter plan ---
+
+def _java_hash(text):
+    """Java's String.hashCode, which JMeter uses to name the cells of a saved shaping timer table."""
+    value = 0
+    for char in text:
+        value = (31 * value + ord(char)) & 0xFFFFFFFF
+    return value - (1 << 32) if value >= 1 << 31 else value
+
+
+def shaping_timer_durations(rows):
+    """
+    Whole-second durations of the rows for the Throughput Shaping Timer. The
+    cumulative row boundaries are rounded (the last one up), not each
+    duration, so the schedule always ends at ceil(profile length), the
+    DURATION of the plan (float noise below 1 us is not rounded up). A row may round to 0 seconds.
+    """
+    bounds = np.cumsum(np.asarray(rows, dtype=np.float64)[:, 2])
+    bounds = np.concatenate(([0], np.round(bounds[:-1]), [math.ceil(round(bounds[-1], 6))])).astype(np.int64)
+    return np.diff(bounds)
+
+
+def shaping_timer_rows(rows):
+    """
+    The <collectionProp> rows of a Throughput Shaping Timer load_profile
+    (start RPS, end RPS, duration). Rates keep three decimals, durations
+    come from shaping_timer_durations; a row of 0 seconds is left out.
+    """
+    from html import escape
+
+    rows = np.asarray(rows, dtype=np.float64)
+    durations = shaping_timer_durations(rows)
+    lines = []
+    for index, (start, end, duration) in enumerate(zip(rows[:, 0], rows[:, 1], durations)):
+        if duration <= 0:
+            continue
+        cells = [f"{round(start, 3):g}", f"{round(end, 3):g}", str(int(duration))]
+        props = "".join(f'<stringProp name="{_java_hash(cell)}">{escape(cell, quote=False)}</stringProp>' for cell in cells)
+        lines.append(f'<collectionProp name="{_java_hash(f"row{index}")}">{props}</collectionProp>')
+    return "\n".join(lines)
+
+
+def open_model_plan_params(params, theory):
+    """
+    Placeholder values for jmx_template/open_model_template.jmx from a test
+    case and its open-model theory: THREADS (the YAML's, else threads_required),
+    RAMP_UP, DURATION (the profile length) and the LOAD_PROFILE schedule.
+    """
+    from jmx_engine import JmxFragment
+
+    plan = {key: value for key, value in params.items()
+            if key.upper() in ("TARGET_HOST", "TARGET_PORT")}
+    plan.update({
+        "THREADS": int(params.get("THREADS") or theory["threads_required"]),
+        "RAMP_UP": params.get("RAMP_UP", 0),
+        "DURATION": int(math.ceil(round(theory["total_simulation_time"], 6))), # 40 x 2.4 s is 96, not 96.00000000000001
+        "LOAD_PROFILE": JmxFragment(shaping_timer_rows(compile_profile(params["ARRIVAL_PROFILE"]))),
+    })
+    return plan
+
+
+def arrival_specs(profile, theory, resolution=1.0, max_points=2000, seed=None):
+    """
+    Chart specs (see chart_render) of the target arrival rate (with a sampled
+    arrival count when arrivals are Poisson) and the threads it needs.
+    Week-long curves are decimated to about max_points before plotting.
+    """
+    from jmeter_calc import decimate_series
+
+    time_series, rps_series = arrival_rate_series(compile_profile(profile), resolution)
+    threads = concurrency_series(rps_series, theory["response_time_ms"], arrivals=theory["arrivals"],
+                                 percentile=theory["percentile"])
+    sampled = sample_arrivals(rps_series, resolution, theory["arrivals"], seed) / resolution
+    time_series, rps_series, sampled, threads = decimate_series(time_series, rps_series, sampled, threads,
+                                                                max_points=max_points)
+    rate_series = [{"x": time_series, "y": rps_series, "label": "Target arrival rate", "color": "blue"}]
+    if theory["arrivals"] == "poisson":
+        rate_series.insert(0, {"x": time_series, "y": sampled, "label": "Poisson arrivals (sampled)",
+                               "color": "lightsteelblue", "linewidth": 0.8})
+    return [
+        {
+            "name": "arrival_rate_profile",
+            "kind": "line",
+            "title": "Open Model: Target Arrival Rate",
+            "xlabel": "Time (seconds)",
+            "ylabel": "Arrivals per Second",
+            "figsize": (12, 6),
+            "series": rate_series,
+        },
+        {
+            "name": "arrival_required_threads",
+            "kind": "line",
+            "title": f"Threads Needed (Little's law, R = {theory['response_time_ms']:g} ms)",
+            "xlabel": "Time (seconds)",
+            "ylabel": "Threads",
+            "figsize": (12, 6),
+            "series": [{"x": time_series, "y": threads, "label": "Threads needed", "color": "purple"}],
+        },
+    ]
@@ -0,0 +1,276 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from run_test import JMX_TEMPLATE, RESULTS_DIR, YAML_TESTCASES_DIR, load_yaml, run_test_case
+
+# --- Global Constants ---
+DEFAULT_TESTCASE_PATTERN = os.path.join(YAML_TESTCASES_DIR, "*.yaml")
+DEFAULT_BATCH_ROOT = os.path.join(RESULTS_DIR, "batch")
+DEFAULT_STORE_PATH = os.path.join(RESULTS_DIR, "experiment_results.csv")
+DEFAULT_CONCURRENCY = 2
+EXCLUSIVE_THREADS = 1000 # cases with at least this many threads run alone so they don't skew each other
+# same columns as Jmeter_Experiment_Results.csv
+EXPERIMENT_COLUMNS = [
+    "TestCase", "Threads", "RampUp_s", "Duration_s", "ThinkTime_ms", "TheoreticalMaxRPS", "ActualRPS",
+    "TheoreticalTotalRequests", "ActualTotalRequests", "TheoreticalDuration_s", "ActualDuration_s", "Efficiency_pct",
+]
+# extra columns kept by the SQLite store
+RUN_COLUMNS = ["BatchId", "StartedAt", "Status", "Profile", "ErrorRate_pct", "P99Latency_ms", "OutputDir"]
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+
+
+def discover_testcases(pattern=DEFAULT_TESTCASE_PATTERN):
+    """Sorted test case YAML paths matching a glob pattern."""
+    return sorted(glob.glob(pattern))
+
+
+def case_directory_name(name):
+    """A NAME made safe as a single directory name: anything but letters, digits, '.', '-' and '_' becomes '_'."""
+    safe = re.sub(r"[^\w.-]", "_", name).lstrip(".")
+    return safe or "case"
+
+
+def is_exclusive(params, exclusive_threads=EXCLUSIVE_THREADS):
+    """A case runs alone when its YAML says EXCLUSIVE: true or it is a stress-sized case."""
+    if "EXCLUSIVE" in params:
+        return bool(params["EXCLUSIVE"])
+    return int(params.get("THREADS", 1)) >= exclusive_threads
+
+
+class SlotScheduler:
+    """
+    Admits runs in submission order while at most `capacity` slots are in use.
+    A normal run takes one slot, an exclusive run takes all of them, so it
+    waits for the running cases to finish and nothing starts beside it.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = max(1, int(capacity))
+        self.free = self.capacity
+        self._waiting = deque()
+        self._condition = threading.Condition()
+
+    def acquire(self, slots):
+        slots = min(slots, self.capacity)
+        ticket = object()
+        with self._condition:
+            self._waiting.append(ticket)
+            self._condition.wait_for(lambda: self._waiting[0] is ticket and self.free >= slots)
+            self._waiting.popleft()
+            self.free -= slots
+            self._condition.notify_all()
+        return slots
+
+    def release(self, slots):
+        with self._condition:
+            self.free += slots
+            self._condition.notify_all()
+
+
+def experiment_row(record):
+    """Maps a run_test_case record onto the Jmeter_Experiment_Results.csv columns."""
+    params = record["params"]
+    theory = record["theory"] or {}
+    actual = record["actual"] or {}
+    efficiency = record["efficiency_pct"]
+    return {
+        "TestCase": str(params.get("NAME", "")).title(),
+        "Threads": params.get("THREADS"),
+        "RampUp_s": params.get("RAMP_UP"),
+        "Duration_s": params.get("DURATION"),
+        "ThinkTime_ms": params.get("THINK_TIME"),
+        "TheoreticalMaxRPS": round(theory["max_rps"], 2) if theory else None,
+        "ActualRPS": round(actual["actual_rps"], 2) if actual else None,
+        "TheoreticalTotalRequests": int(round(theory["total_requests_approx"])) if theory else None,
+        "ActualTotalRequests": actual.get("actual_requests"),
+        "TheoreticalDuration_s": round(theory["total_simulation_time"], 2) if theory else None,
+        "ActualDuration_s": round(actual["duration_sec"], 2) if actual else None,
+        "Efficiency_pct": round(efficiency, 2) if efficiency is not None else None,
+    }
+
+
+class ResultsStore:
+    """
+    Append-only store for batch results. A .csv path gets rows in the
+    Jmeter_Experiment_Results.csv format (header written once) for completed
+    runs only, since that table has no status column; a .db/.sqlite path gets
+    an `experiments` table with the same columns plus run details, for every run.
+    Safe to call from concurrent runs.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.use_sqlite = path.lower().endswith(SQLITE_EXTENSIONS)
+        self._lock = threading.Lock()
+        store_dir = os.path.dirname(path)
+        if store_dir:
+            os.makedirs(store_dir, exist_ok=True)
+        if self.use_sqlite:
+            with sqlite3.connect(path) as db:
+                columns = ", ".join(f'"{c}"' for c in EXPERIMENT_COLUMNS + RUN_COLUMNS)
+                db.execute(f"CREATE TABLE IF NOT EXISTS experiments ({columns})")
+                # stores created by an older version lack the newer run columns
+                existing = {row[1] for row in db.execute("PRAGMA table_info(experiments)")}
+                for column in EXPERIMENT_COLUMNS + RUN_COLUMNS:
+                    if column not in existing:
+                        db.execute(f'ALTER TABLE experiments ADD COLUMN "{column}"')
+
+    def append(self, record, batch_id, started_at):
+        row = experiment_row(record)
+        with self._lock:
+            if self.use_sqlite:
+                actual = record["actual"] or {}
+                row.update({
+                    "BatchId": batch_id,
+                    "StartedAt": started_at,
+                    "Status": record["status"],
+                    "Profile": record.get("profile"),
+                    "ErrorRate_pct": actual.get("error_rate_pct"),
+                    "P99Latency_ms": actual.get("p99_latency_ms"),
+                    "OutputDir": record["output_dir"],
+                })
+                names = EXPERIMENT_COLUMNS + RUN_COLUMNS
+                columns = ", ".join(f'"{c}"' for c in names)
+                placeholders = ", ".join("?" for _ in names)
+                with sqlite3.connect(self.path) as db:
+                    db.execute(f"INSERT INTO experiments ({columns}) VALUES ({placeholders})",
+                               [row[c] for c in names])
+            elif record["status"] != "completed":
+                print(f"⚠️ {row['TestCase']} {record['status']}: not added to {self.path} "
+                      f"(see its summary.json, or use a .db store to keep every run).")
+            else:
+                write_header = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+                with open(self.path, "a", newline='') as f:
+                    writer = csv.DictWriter(f, fieldnames=EXPERIMENT_COLUMNS)
+                    if write_header:
+                        writer.writeheader()
+                    writer.writerow(row)
+
+
+def write_run_summary(record, path):
+    """Writes the scalar parts of a run record as JSON next to the run's files."""
+    actual = record["actual"] or {}
+    drift = record.get("drift") or {}
+    summary = {
+        "params": record["params"],
+        "status": record["status"],
+        "profile": record.get("profile"),
+        "load_generator": record.get("load_generator"),
+        "error": record["error"],
+        "efficiency_pct": record["efficiency_pct"],
+        "theory": record["theory"],
+        "actual": {k: v for k, v in actual.items() if isinstance(v, (int, float, str)) or v is None},
+        "drift": {k: v for k, v in drift.items() if isinstance(v, (int, float)) or v is None},
+        "resources": record.get("resources"),
+    }
+    with open(path, "w") as f:
+        json.dump(summary, f, indent=2, default=str)
+
+
+def run_batch(yaml_paths, store_path=DEFAULT_STORE_PATH, concurrency=DEFAULT_CONCURRENCY,
+              exclusive_threads=EXCLUSIVE_THREADS, output_root=DEFAULT_BATCH_ROOT, template_path=JMX_TEMPLATE):
+    """
+    Runs several test cases, up to `concurrency` at a time. Each case gets its
+    own output directory <output_root>/<batch id>/<case>/ holding the generated
+    JMX, JTL, JMeter log, live summary and a summary.json; its result row is
+    appended to the results store as soon as it finishes. A NAME is made safe
+    as a directory name (see case_directory_name), and one used by an earlier
+    case of the batch gets a _2, _3... suffix.
+    :return: list of run_test_case records in input order.
+    """
+    batch_id = time.strftime("%Y%m%d-%H%M%S")
+    batch_dir = os.path.join(output_root, batch_id)
+    store = ResultsStore(store_path)
+    scheduler = SlotScheduler(concurrency)
+
+    cases = []
+    names = {} # NAME -> how many cases used it so far
+    for path in yaml_paths:
+        try:
+            params = load_yaml(path)
+        except Exception as e:
+            print(f"❌ Skipping {path}: {e}")
+            continue
+        name = str(params.get("NAME") or os.path.splitext(os.path.basename(path))[0])
+        safe = case_directory_name(name)
+        if safe != name:
+            print(f"⚠️ {path}: NAME '{name}' is not a safe directory name; running it as '{safe}'.")
+            name = safe
+        if name in names:
+            # cases sharing a NAME would write the same output directory at the same time
+            names[name] += 1
+            unique = f"{name}_{names[name]}"
+            while unique in names:
+                names[name] += 1
+                unique = f"{name}_{names[name]}"
+            print(f"⚠️ {path}: NAME '{name}' is already used in this batch; running it as '{unique}'.")
+            name = unique
+        names[name] = 1
+        params["NAME"] = name
+        cases.append((name, params))
+
+    def run_one(name, params):
+        slots = scheduler.acquire(scheduler.capacity if is_exclusive(params, exclusive_threads) else 1)
+        try:
+            started_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+            print(f"\n▶️ [{name}] starting ({slots} slot(s))")
+            output_dir = os.path.join(batch_dir, name)
+            try:
+                record = run_test_case(params, output_dir, template_path=template_path, name=name)
+            except Exception as e:
+                print(f"❌ [{name}] failed: {e}")
+                record = {"params": params, "theory": None, "actual": None, "efficiency_pct": None, "drift": None,
+                          "profile": None, "status": "failed", "error": str(e), "output_dir": output_dir}
+            os.makedirs(output_dir, exist_ok=True)
+            write_run_summary(record, os.path.join(output_dir, "summary.json"))
+            store.append(record, batch_id, started_at)
+            print(f"⏹️ [{name}] {record['status']}")
+            return record
+        finally:
+            scheduler.release(slots)
+
+    # one thread per case: the scheduler, not the pool, limits how many run at once
+    with ThreadPoolExecutor(max_workers=max(1, len(cases))) as pool:
+        futures = [pool.submit(run_one, name, params) for name, params in cases]
+        records = [future.result() for future in futures]
+
+    print(f"\n📚 Batch {batch_id}: {len(records)} case(s) stored in {store_path}")
+    for record in records:
+        efficiency = record["efficiency_pct"]
+        print(f"  {record['params']['NAME']:<20} {record['status']:<10} "
+              f"{f'{efficiency:.2f}%' if efficiency is not None else '-'}")
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run several JMeter test cases and collect their results")
+    parser.add_argument("testcases", nargs="*", help=f"test case YAMLs (default: {DEFAULT_TESTCASE_PATTERN})")
+    parser.add_argument("--pattern", default=DEFAULT_TESTCASE_PATTERN, help="glob used when no YAMLs are given")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"test cases running at the same time (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--exclusive-threads", type=int, default=EXCLUSIVE_THREADS,
+                        help=f"cases with at least this many threads run alone (default: {EXCLUSIVE_THREADS})")
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH,
+                        help="results store: .csv (Jmeter_Experiment_Results.csv format) or .db/.sqlite")
+    parser.add_argument("--output-root", default=DEFAULT_BATCH_ROOT)
+    parser.add_argument("--template", default=JMX_TEMPLATE)
+    args = parser.parse_args()
+
+    yaml_paths = args.testcases or discover_testcases(args.pattern)
+    if not yaml_paths:
+        print(f"❌ No test case YAMLs found for '{args.pattern}'")
+        return
+    run_batch(yaml_paths, args.store, args.concurrency, args.exclusive_threads, args.output_root, args.template)
+
+
+if __name__ == "__main__":
+    main()
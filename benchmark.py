@@ -0,0 +1,528 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+
+import numpy as np
+
+# --- Global Constants ---
+BENCH_DIR = os.path.join("results", "benchmark") # synthetic JTLs are kept here and reused between runs
+HISTORY_PATH = "benchmark_history.jsonl" # one JSON record per run, commit it to track results across commits
+DEFAULT_ROWS = 1_000_000
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD_PCT = 10.0 # a benchmark more than 10% worse than the baseline fails the run
+SIZE_SUFFIXES = {"k": 1_000, "m": 1_000_000, "g": 1_000_000_000}
+
+# Synthetic JTL: JMeter's default CSV save configuration
+JTL_HEADER = ("timeStamp,elapsed,label,responseCode,responseMessage,threadName,dataType,success,"
+              "failureMessage,bytes,sentBytes,grpThreads,allThreads,URL,Latency,IdleTime,Connect")
+GENERATE_BLOCK_ROWS = 1_000_000 # rows generated and written per vectorized step (bounds memory)
+SYNTHETIC_LABELS = ["Home", "Login", "Search", "Product", "Checkout"]
+SYNTHETIC_LABEL_WEIGHTS = [0.35, 0.10, 0.30, 0.20, 0.05]
+SYNTHETIC_RPS = 5_000 # plateau rate, so 1M rows is about a 3.5 minute test
+SYNTHETIC_RAMP_UP_SEC = 60
+SYNTHETIC_THREADS = 500
+SYNTHETIC_MEDIAN_MS = 45 # lognormal latency, median 45 ms, with a slow tail
+SYNTHETIC_LATENCY_SIGMA = 0.6
+SYNTHETIC_ERROR_PCT = 0.5 # background error rate, plus bursts
+SYNTHETIC_BURST_EVERY_SEC = 120 # one 5-second error burst every 2 minutes
+SYNTHETIC_BURST_SEC = 5
+SYNTHETIC_BURST_ERROR_PCT = 30.0
+SYNTHETIC_START_MS = 1_700_000_000_000
+
+# Workload sizes of the non-JTL benchmarks
+GRID_SCENARIOS = 1_000_000 # calculate_theoretical_values_batch / sweep_scenarios
+SCALAR_SCENARIOS = 100_000 # calculate_theoretical_values called once per scenario
+CURVE_DURATION_SEC = 86_400 # a day-long soak at 10 ms resolution, about 8.6M points
+CURVE_RESOLUTION = 0.01
+SIM_PARAMS = {"THREADS": 1000, "RAMP_UP": 60, "DURATION": 300, "THINK_TIME": 100}
+SIM_RESPONSE_MS = 20
+MOCK_CONNECTIONS = 50
+MOCK_SECONDS = 5.0
+
+# What a benchmark's measure() returns when wall time is not its metric
+Metric = namedtuple("Metric", ["value", "unit", "higher_is_better"])
+
+
+def parse_size(text):
+    """Row counts like 1000000, 1M, 10M or 250k."""
+    text = str(text).strip()
+    suffix = text[-1:].lower()
+    if suffix in SIZE_SUFFIXES:
+        return int(float(text[:-1]) * SIZE_SUFFIXES[suffix])
+    return int(text)
+
+
+def format_size(rows):
+    for suffix, factor in (("G", 1_000_000_000), ("M", 1_000_000), ("k", 1_000)):
+        if rows >= factor and rows % factor == 0:
+            return f"{rows // factor}{suffix}"
+    return str(rows)
+
+# --- Synthetic JTL ---
+
+def _arrival_times_ms(work, rps, ramp_up_sec):
+    """
+    Maps points of a unit-rate Poisson process through the inverse of the
+    cumulative rate of a linear ramp to `rps` over ramp_up_sec, then constant.
+    """
+    ramp_work = rps * ramp_up_sec / 2.0
+    seconds = np.where(
+        work < ramp_work,
+        np.sqrt(2.0 * ramp_up_sec * work / rps) if ramp_up_sec > 0 else 0.0,
+        ramp_up_sec + (work - ramp_work) / rps,
+    )
+    return SYNTHETIC_START_MS + np.floor(seconds * 1000.0).astype(np.int64)
+
+
+def generate_synthetic_jtl(output_path, rows, seed=0, rps=SYNTHETIC_RPS, ramp_up_sec=SYNTHETIC_RAMP_UP_SEC,
+                           error_pct=SYNTHETIC_ERROR_PCT, block_rows=GENERATE_BLOCK_ROWS):
+    """
+    Writes a CSV JTL of `rows` samples that looks like a real run: arrivals
+    ramp up linearly and then hold at `rps` (Poisson), latencies are lognormal
+    with a slow tail, a background error rate is topped up by periodic error
+    bursts, and rows are written in completion order (timeStamp + elapsed),
+    so timeStamp is not monotonic, just like JMeter's output.
+    Generated a block at a time, so memory stays bounded by block_rows.
+    """
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    labels = np.array(SYNTHETIC_LABELS)
+    label_urls = np.array([f"http://target.local/{label.lower()}" for label in SYNTHETIC_LABELS])
+    work = 0.0
+    carry = None # rows of the previous block that complete after its last row
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "w", newline='', encoding="utf-8") as f:
+        f.write(JTL_HEADER + "\n")
+        for start in range(0, rows, block_rows):
+            count = min(block_rows, rows - start)
+            gaps = rng.exponential(1.0, count)
+            points = work + np.cumsum(gaps)
+            work = float(points[-1])
+            timestamps = _arrival_times_ms(points, rps, ramp_up_sec)
+
+            elapsed = np.rint(np.exp(rng.normal(np.log(SYNTHETIC_MEDIAN_MS), SYNTHETIC_LATENCY_SIGMA, count)))
+            slow = rng.random(count) < 0.001
+            elapsed[slow] *= rng.uniform(10, 40, int(slow.sum()))
+            elapsed = np.maximum(elapsed, 1).astype(np.int64)
+
+            offset_sec = (timestamps - SYNTHETIC_START_MS) / 1000.0
+            in_burst = (offset_sec % SYNTHETIC_BURST_EVERY_SEC) >= SYNTHETIC_BURST_EVERY_SEC - SYNTHETIC_BURST_SEC
+            failure_pct = np.where(in_burst, SYNTHETIC_BURST_ERROR_PCT, error_pct)
+            success = rng.random(count) * 100.0 >= failure_pct
+            label_index = rng.choice(len(SYNTHETIC_LABELS), count, p=SYNTHETIC_LABEL_WEIGHTS)
+            threads_started = np.minimum(
+                np.ceil(offset_sec / ramp_up_sec * SYNTHETIC_THREADS) if ramp_up_sec > 0 else SYNTHETIC_THREADS,
+                SYNTHETIC_THREADS).astype(np.int64)
+            threads_started = np.maximum(threads_started, 1)
+            thread_number = rng.integers(0, threads_started) + 1
+            block = {
+                "timeStamp": timestamps,
+                "elapsed": elapsed,
+                "label": labels[label_index],
+                "responseCode": np.where(success, "200", np.where(in_burst, "504", "500")),
+                "responseMessage": np.where(success, "OK", np.where(in_burst, "Gateway Timeout", "Internal Server Error")),
+                "threadName": np.char.add("Thread Group 1-", thread_number.astype(str)),
+                "dataType": np.full(count, "text"),
+                "success": np.where(success, "true", "false"),
+                "failureMessage": np.full(count, ""),
+                "bytes": np.where(success, rng.integers(800, 4000, count), 320),
+                "sentBytes": rng.integers(120, 260, count),
+                "grpThreads": threads_started,
+                "allThreads": threads_started,
+                "URL": label_urls[label_index],
+                "Latency": np.maximum(elapsed - rng.integers(0, 5, count), 0),
+                "IdleTime": np.zeros(count, dtype=np.int64),
+                "Connect": rng.integers(0, 3, count),
+            }
+            block_text, carry = _completion_ordered_csv(block, carry, final=start + count >= rows)
+            f.write(block_text)
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def _completion_ordered_csv(block, carry, final):
+    """
+    Sorts a block (plus the rows held back from the previous one) by completion
+    time and renders it as CSV text. Rows completing after the block's last
+    arrival are held back for the next block unless this is the final one.
+    """
+    import pandas as pd
+
+    frame = pd.DataFrame(block)
+    if carry is not None:
+        frame = pd.concat([carry, frame], ignore_index=True)
+    completion = frame["timeStamp"].to_numpy() + frame["elapsed"].to_numpy()
+    frame = frame.iloc[np.argsort(completion, kind="stable")]
+    if not final:
+        cutoff = int(block["timeStamp"][-1])
+        held = (frame["timeStamp"] + frame["elapsed"]).to_numpy() > cutoff
+        carry = frame[held]
+        frame = frame[~held]
+    else:
+        carry = None
+    return frame.to_csv(header=False, index=False, lineterminator="\n"), carry
+
+
+def synthetic_jtl(rows, seed=0, bench_dir=BENCH_DIR):
+    """Path of the synthetic JTL for (rows, seed), generated on first use and reused afterwards."""
+    path = os.path.join(bench_dir, f"synthetic_{format_size(rows)}_seed{seed}.jtl")
+    if not os.path.exists(path):
+        print(f"🧪 Generating synthetic JTL with {rows:,} rows at {path}...")
+        start = time.perf_counter()
+        generate_synthetic_jtl(path, rows, seed)
+        print(f"✅ Generated in {time.perf_counter() - start:.1f} sec ({os.path.getsize(path) / 1e6:.0f} MB)")
+    return path
+
+# --- Benchmarks ---
+# Each benchmark takes the run config and returns (setup, measure):
+# setup() runs once untimed, measure() is timed `repeat` times.
+# Wall time is reported in seconds (lower is better); a benchmark may instead
+# return its own Metric from measure(). Any other return value is ignored.
+
+def bench_analyze_jtl(config):
+    """run_test.analyze_jtl's parser, without the columnar cache: full CSV parse of the synthetic JTL."""
+    from jtl_cache import analyze_jtl_cached
+
+    path = synthetic_jtl(config["rows"], config["seed"], config["bench_dir"])
+    return None, lambda: analyze_jtl_cached(path, workers=config["workers"], use_cache=False)
+
+
+def bench_analyze_jtl_cached(config):
+    """run_test.analyze_jtl answered from the columnar cache (built untimed in setup)."""
+    from jtl_cache import analyze_jtl_cached, build_cache, is_cache_valid
+
+    path = synthetic_jtl(config["rows"], config["seed"], config["bench_dir"])
+
+    def setup():
+        if not is_cache_valid(path):
+            build_cache(path, workers=config["workers"])
+
+    return setup, lambda: analyze_jtl_cached(path, workers=config["workers"])
+
+
+def _scenario_grid(size, seed):
+    rng = np.random.default_rng(seed)
+    return {
+        "THREADS": rng.integers(1, 20_000, size),
+        "RAMP_UP": rng.integers(0, 600, size),
+        "DURATION": rng.integers(10, 7_200, size),
+        "THINK_TIME": rng.choice([0, 100, 250, 500, 1000, 2000], size),
+    }
+
+
+def bench_theory_grid(config):
+    """sweep_scenarios (calculate_theoretical_values_batch) over a large scenario grid."""
+    from jmeter_calc import sweep_scenarios
+
+    grid = _scenario_grid(GRID_SCENARIOS, config["seed"])
+    return None, lambda: sweep_scenarios(grid)
+
+
+def bench_theory_scalar(config):
+    """calculate_theoretical_values and calculate_closed_loop_values, one call per scenario."""
+    from jmeter_calc import calculate_closed_loop_values, calculate_theoretical_values
+
+    grid = _scenario_grid(SCALAR_SCENARIOS, config["seed"])
+    rows = list(zip(*(grid[key].tolist() for key in ("THREADS", "RAMP_UP", "DURATION", "THINK_TIME"))))
+
+    def measure():
+        for threads, ramp_up, duration, think in rows:
+            calculate_theoretical_values(threads, ramp_up, duration, think)
+            calculate_closed_loop_values(threads, ramp_up, duration, think, server_capacity_rps=50_000)
+
+    return None, measure
+
+
+def bench_curve(config):
+    """traffic_pattern_series for a day-long soak at 10 ms resolution, then decimation for plotting."""
+    from jmeter_calc import decimate_series, traffic_pattern_series
+
+    def measure():
+        time_series, user_series, rps_series = traffic_pattern_series(
+            5_000, 600, CURVE_DURATION_SEC, 500, resolution=CURVE_RESOLUTION)
+        decimate_series(time_series, rps_series, user_series)
+
+    return None, measure
+
+
+def bench_simulator(config):
+    """jmeter_sim.simulate_test_case for a 1000-thread, 6-minute test case."""
+    from jmeter_sim import simulate_test_case
+
+    return None, lambda: simulate_test_case(SIM_PARAMS, SIM_RESPONSE_MS, seed=config["seed"])
+
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _load_client(host, port, connections, seconds):
+    """Keep-alive GET loop on `connections` sockets for `seconds`; returns completed responses."""
+    request = f"GET / HTTP/1.1\r\nHost: {host}:{port}\r\n\r\n".encode("ascii")
+    deadline = time.perf_counter() + seconds
+    completed = [0]
+
+    async def connection():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while time.perf_counter() < deadline:
+                writer.write(request)
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line[:15].lower() == b"content-length:":
+                        length = int(line[15:])
+                if length:
+                    await reader.readexactly(length)
+                completed[0] += 1
+        finally:
+            writer.close()
+
+    await asyncio.gather(*(connection() for _ in range(connections)))
+    return completed[0]
+
+
+def bench_mock_server(config):
+    """mock_server.py throughput (responses/s) under a local keep-alive asyncio load client."""
+    from mock_server import start_workers
+
+    host, port = "127.0.0.1", _free_port()
+    processes = []
+
+    def setup():
+        processes.extend(start_workers(host, port, workers=config["workers"] or 1))
+
+    def measure():
+        start = time.perf_counter()
+        completed = asyncio.run(_load_client(host, port, MOCK_CONNECTIONS, MOCK_SECONDS))
+        return Metric(completed / (time.perf_counter() - start), "req/s", True)
+
+    def teardown():
+        for process in processes:
+            process.terminate()
+            process.join()
+
+    return setup, measure, teardown
+
+
+BENCHMARKS = {
+    "analyze_jtl": bench_analyze_jtl,
+    "analyze_jtl_cached": bench_analyze_jtl_cached,
+    "theory_grid": bench_theory_grid,
+    "theory_scalar": bench_theory_scalar,
+    "curve": bench_curve,
+    "simulator": bench_simulator,
+    "mock_server": bench_mock_server,
+}
+
+
+def run_benchmark(name, config, repeat=DEFAULT_REPEAT):
+    """
+    Runs one benchmark: setup once, then `repeat` measured runs.
+    Times are reported as the best run (least disturbed by other load),
+    throughputs as the best run too, with the median kept alongside.
+    """
+    parts = BENCHMARKS[name](config)
+    setup, measure = parts[:2]
+    teardown = parts[2] if len(parts) > 2 else None
+    values = []
+    unit, higher_is_better = "s", False
+    try:
+        if setup is not None:
+            setup()
+        for _ in range(repeat):
+            start = time.perf_counter()
+            metric = measure()
+            elapsed = time.perf_counter() - start
+            if isinstance(metric, Metric):
+                values.append(metric.value)
+                unit, higher_is_better = metric.unit, metric.higher_is_better
+            else:
+                values.append(elapsed)
+    finally:
+        if teardown is not None:
+            teardown()
+    return {
+        "value": max(values) if higher_is_better else min(values),
+        "median": statistics.median(values),
+        "unit": unit,
+        "higher_is_better": higher_is_better,
+        "runs": len(values),
+    }
+
+# --- History and regression check ---
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment_info():
+    """Commit and machine the results belong to; results are only compared within one machine."""
+    return {
+        "commit": _git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()}-{platform.machine()}-{os.cpu_count()}cpu",
+    }
+
+
+def load_history(history_path=HISTORY_PATH):
+    if not os.path.exists(history_path):
+        return []
+    with open(history_path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def append_history(record, history_path=HISTORY_PATH):
+    history_dir = os.path.dirname(history_path)
+    if history_dir:
+        os.makedirs(history_dir, exist_ok=True)
+    with open(history_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, sort_keys=True) + "\n")
+
+
+def find_baseline(history, record, commit=None):
+    """
+    The newest earlier run on the same machine with the same workload config
+    that passed its own check (or, with commit, the newest run of that commit),
+    so a recorded regression never becomes the next baseline.
+    """
+    for previous in reversed(history):
+        if previous["machine"] != record["machine"] or previous["config"] != record["config"]:
+            continue
+        if commit is not None:
+            if previous.get("commit") and previous["commit"].startswith(commit):
+                return previous
+        elif previous.get("status") == "pass":
+            return previous
+    return None
+
+
+def compare_results(results, baseline, threshold_pct=DEFAULT_THRESHOLD_PCT):
+    """
+    Change of every benchmark against the baseline, as a percentage where
+    positive means worse (slower, or lower throughput).
+    :return: ({name: change_pct}, [names worse than threshold_pct])
+    """
+    changes = {}
+    regressions = []
+    for name, result in results.items():
+        previous = baseline["results"].get(name)
+        if not previous or not previous["value"]:
+            continue
+        change = (result["value"] - previous["value"]) / previous["value"] * 100
+        if result["higher_is_better"]:
+            change = -change
+        changes[name] = change
+        if change > threshold_pct:
+            regressions.append(name)
+    return changes, regressions
+
+
+def print_results(results, changes, threshold_pct):
+    print(f"\n{'benchmark':<22}{'best':>14}{'median':>14}  vs baseline")
+    for name, result in results.items():
+        unit = result["unit"]
+        change = changes.get(name)
+        if change is None:
+            verdict = "-"
+        else:
+            marker = "❌" if change > threshold_pct else ("⚠️" if change > threshold_pct / 2 else "✅")
+            verdict = f"{marker} {change:+.1f}% {'worse' if change > 0 else 'better'}"
+        print(f"{name:<22}{result['value']:>12.3f} {unit:<2}{result['median']:>11.3f} {unit:<2} {verdict}")
+
+# --- CLI ---
+
+def _cmd_generate(args):
+    start = time.perf_counter()
+    generate_synthetic_jtl(args.output, args.rows, seed=args.seed, rps=args.rps, error_pct=args.error_pct)
+    print(f"✅ {args.rows:,} rows written to {args.output} in {time.perf_counter() - start:.1f} sec")
+    return 0
+
+
+def _cmd_run(args):
+    names = args.only or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        print(f"❌ Unknown benchmark(s): {', '.join(unknown)} (choose from {', '.join(BENCHMARKS)})")
+        return 2
+    config = {"rows": args.rows, "seed": args.seed, "workers": args.workers, "bench_dir": args.bench_dir}
+
+    results = {}
+    for name in names:
+        print(f"⏱️ {name}...")
+        results[name] = run_benchmark(name, config, repeat=args.repeat)
+
+    record = dict(environment_info(), config={"rows": args.rows, "seed": args.seed, "workers": args.workers},
+                  timestamp=datetime.now(timezone.utc).isoformat(timespec="seconds"), results=results)
+    baseline = find_baseline(load_history(args.history), record, commit=args.baseline)
+    changes, regressions = compare_results(results, baseline, args.threshold) if baseline else ({}, [])
+    print_results(results, changes, args.threshold)
+    if baseline:
+        print(f"\nBaseline: commit {baseline.get('commit')} from {baseline['timestamp']}")
+    else:
+        print("\nNo baseline for this machine and config yet; this run becomes the baseline.")
+
+    record["baseline_commit"] = baseline.get("commit") if baseline else None
+    record["status"] = "regression" if regressions else "pass"
+    if not args.no_record:
+        append_history(record, args.history)
+        print(f"📝 Recorded in {args.history}")
+    if regressions:
+        print(f"❌ Regression above {args.threshold:g}%: {', '.join(regressions)}")
+        return 1
+    print("✅ No regression above the threshold.")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmarks of the calculator, JTL analyzer, simulator and mock server")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate = subparsers.add_parser("generate", help="write a synthetic JTL")
+    generate.add_argument("output")
+    generate.add_argument("--rows", type=parse_size, default=DEFAULT_ROWS, help="e.g. 1M, 10M, 100M (default: 1M)")
+    generate.add_argument("--seed", type=int, default=0)
+    generate.add_argument("--rps", type=float, default=SYNTHETIC_RPS, help="plateau request rate")
+    generate.add_argument("--error-pct", type=float, default=SYNTHETIC_ERROR_PCT, help="background error rate")
+    generate.set_defaults(handler=_cmd_generate)
+
+    run = subparsers.add_parser("run", help="run the benchmarks and check them against the history")
+    run.add_argument("--only", nargs="+", metavar="NAME", help=f"benchmarks to run: {', '.join(BENCHMARKS)}")
+    run.add_argument("--rows", type=parse_size, default=DEFAULT_ROWS, help="synthetic JTL size (default: 1M)")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="measured runs per benchmark")
+    run.add_argument("--workers", type=int, default=1, help="JTL parsing processes / mock server workers")
+    run.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD_PCT,
+                     help="fail when a benchmark is this many percent worse than the baseline")
+    run.add_argument("--baseline", metavar="COMMIT", help="compare with this commit's run instead of the latest passing one")
+    run.add_argument("--history", default=HISTORY_PATH)
+    run.add_argument("--bench-dir", default=BENCH_DIR, help="where synthetic JTLs are generated and reused")
+    run.add_argument("--no-record", action="store_true", help="check against the history without appending to it")
+    run.set_defaults(handler=_cmd_run)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+import argparse
+import csv
+import math
+import os
+import time
+
+from run_test import JMX_TEMPLATE, RESULTS_DIR, load_yaml, predict_theoretical_values, run_test_case
+
+# --- Global Constants ---
+DEFAULT_MIN_EFFICIENCY_PCT = 85.0 # actual vs theoretical RPS a probe must reach to count as sustainable
+DEFAULT_MAX_ERROR_PCT = 1.0
+DEFAULT_PROBE_DURATION = 30 # seconds, includes the probe ramp-up like JMeter's scheduler
+DEFAULT_PROBE_RAMP_UP = 5
+DEFAULT_MAX_PROBES = 8
+DEFAULT_TOLERANCE = 0.05 # stop when the bracket is within 5% of the knee
+DEFAULT_CAPACITY_DIR = os.path.join(RESULTS_DIR, "capacity")
+CURVE_COLUMNS = [
+    "probe", "threads", "theoretical_rps", "actual_rps", "efficiency_pct",
+    "error_rate_pct", "p99_latency_ms", "passed", "output_dir",
+]
+
+
+def initial_bracket(params, max_rps=None, min_threads=1):
+    """
+    Thread range to search, from the closed-loop model the probes are scored
+    against: the upper end is the thread count whose cycle rate (think time
+    plus the case's RESPONSE_TIME, see predict_theoretical_values) reaches
+    max_rps, or the case's THREADS when no target is given.
+    """
+    single_thread = dict(params, THREADS=1, RAMP_UP=0, ARRIVAL_PROFILE=None)
+    cycle_time_sec = predict_theoretical_values(single_thread)["cycle_time_sec"]
+    high = math.ceil(max_rps * cycle_time_sec) if max_rps else int(params.get("THREADS", 1))
+    low = max(1, min(int(min_threads), high))
+    return low, high
+
+
+def steady_state_efficiency(record):
+    """
+    Actual vs theoretical requests between the end of the probe's ramp-up
+    and the scheduler stop, from the run's per-second drift comparison.
+    The whole-run efficiency would count the ramp-up against the plateau
+    rate (a 5 s ramp in a 30 s probe caps it near 92%). Falls back to the
+    whole-run efficiency when there is no steady window to measure.
+    """
+    drift = record["drift"]
+    if drift is None:
+        return record["efficiency_pct"]
+    params = record["params"]
+    start = int(math.ceil(params.get("RAMP_UP", 0)))
+    stop = int(math.ceil(params.get("DURATION", 60)))
+    theoretical = drift["theoretical_rps"][start:stop].sum()
+    if theoretical <= 0:
+        return record["efficiency_pct"]
+    return float(drift["actual_rps"][start:stop].sum() / theoretical * 100)
+
+
+def evaluate_probe(record, min_efficiency_pct, max_error_pct, max_p99_ms=None):
+    """Turns a run_test_case record into a curve point and decides whether it is within SLO."""
+    actual = record["actual"] or {}
+    theory = record["theory"] or {}
+    point = {
+        "threads": int(record["params"]["THREADS"]),
+        "theoretical_rps": theory.get("max_rps"),
+        "actual_rps": actual.get("actual_rps"),
+        "efficiency_pct": steady_state_efficiency(record),
+        "error_rate_pct": actual.get("error_rate_pct"),
+        "p99_latency_ms": actual.get("p99_latency_ms"),
+        "output_dir": record["output_dir"],
+    }
+    passed = (record["status"] == "completed" and actual.get("actual_requests", 0) > 0
+              and point["efficiency_pct"] >= min_efficiency_pct
+              and point["error_rate_pct"] <= max_error_pct)
+    if passed and max_p99_ms is not None:
+        passed = point["p99_latency_ms"] <= max_p99_ms
+    point["passed"] = passed
+    return point
+
+
+def _model_guess(point, min_efficiency_pct):
+    """
+    Threads at which the failed probe's measured throughput would still be
+    min_efficiency_pct of theory (Little's law: theoretical RPS grows linearly
+    with threads, the server's delivered RPS doesn't). None when the probe
+    failed for another reason than throughput.
+    """
+    if not point["efficiency_pct"] or point["efficiency_pct"] >= min_efficiency_pct:
+        return None
+    return int(point["threads"] * point["efficiency_pct"] / min_efficiency_pct)
+
+
+def find_knee(params, min_threads=1, max_threads=None, max_rps=None,
+              min_efficiency_pct=DEFAULT_MIN_EFFICIENCY_PCT, max_error_pct=DEFAULT_MAX_ERROR_PCT, max_p99_ms=None,
+              probe_duration=DEFAULT_PROBE_DURATION, probe_ramp_up=DEFAULT_PROBE_RAMP_UP,
+              max_probes=DEFAULT_MAX_PROBES, tolerance=DEFAULT_TOLERANCE,
+              output_dir=DEFAULT_CAPACITY_DIR, template_path=JMX_TEMPLATE):
+    """
+    Finds the highest thread count (at the case's think time) whose short
+    JMeter probe stays within SLO: steady-state efficiency (after the probe's
+    ramp-up, see steady_state_efficiency) >= min_efficiency_pct, error
+    rate <= max_error_pct and, if given, p99 <= max_p99_ms.
+
+    The bracket comes from initial_bracket(); both ends are probed, then the
+    bracket is narrowed by model-guided steps (see _model_guess), falling back
+    to geometric bisection when the model is unavailable or misses twice on
+    the same side, until it is within `tolerance` or max_probes runs were spent.
+    :return: dict with knee_threads (None if even the lowest load fails),
+             knee (its curve point), curve (all probes sorted by threads) and probes.
+    """
+    low, high = initial_bracket(params, max_rps, min_threads)
+    if max_threads:
+        high = int(max_threads)
+    points = {}
+
+    def probe(threads):
+        if threads in points:
+            return points[threads]
+        index = len(points) + 1
+        probe_params = dict(params, THREADS=threads, DURATION=probe_duration, RAMP_UP=probe_ramp_up)
+        probe_dir = os.path.join(output_dir, f"probe_{index:02d}_{threads}")
+        print(f"\n🔎 Probe {index}: {threads} threads")
+        record = run_test_case(probe_params, probe_dir, template_path=template_path, name=f"probe {index}")
+        point = evaluate_probe(record, min_efficiency_pct, max_error_pct, max_p99_ms)
+        point["probe"] = index
+        points[threads] = point
+        print(f"{'✅' if point['passed'] else '❌'} {threads} threads: "
+              f"efficiency {point['efficiency_pct'] or 0:.1f}%, errors {point['error_rate_pct'] or 0:.2f}%")
+        return point
+
+    best = None
+    if probe(high)["passed"]:
+        best = high
+        print(f"⚠️ The top of the bracket ({high} threads) is still within SLO; raise --max-threads/--max-rps.")
+    elif not probe(low)["passed"]:
+        print(f"⚠️ Even {low} thread(s) fail the SLO.")
+    else:
+        best = low
+        model_outcomes = []
+        while len(points) < max_probes and high - low > max(1, low * tolerance):
+            guess = _model_guess(points[high], min_efficiency_pct)
+            # the model missed twice on the same side, so it is biased here: halve the bracket instead
+            use_model = guess is not None and model_outcomes[-2:] not in ([True, True], [False, False])
+            if use_model:
+                guess = max(guess, low + max(1, int(low * tolerance)))
+            else:
+                guess = int(round(math.sqrt(low * high)))
+                model_outcomes = []
+            guess = min(max(guess, low + 1), high - 1)
+            passed = probe(guess)["passed"]
+            if use_model:
+                model_outcomes.append(passed)
+            if passed:
+                low = best = guess
+            else:
+                high = guess
+
+    curve = sorted(points.values(), key=lambda p: p["threads"])
+    return {
+        "knee_threads": best,
+        "knee": points.get(best),
+        "curve": curve,
+        "probes": len(points),
+    }
+
+
+def write_curve_csv(curve, output_path):
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(output_path, "w", newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=CURVE_COLUMNS)
+        writer.writeheader()
+        for point in curve:
+            writer.writerow({c: point.get(c) for c in CURVE_COLUMNS})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search for the maximum sustainable load of a test case (knee point)")
+    parser.add_argument("testcase", help="test case YAML whose think time, target and model keys are used")
+    parser.add_argument("--min-threads", type=int, default=1)
+    parser.add_argument("--max-threads", type=int, help="top of the bracket (default: from --max-rps or THREADS)")
+    parser.add_argument("--max-rps", type=float, help="derive the top of the bracket from this theoretical RPS")
+    parser.add_argument("--min-efficiency", type=float, default=DEFAULT_MIN_EFFICIENCY_PCT,
+                        help=f"SLO: minimum actual/theoretical RPS in %% (default: {DEFAULT_MIN_EFFICIENCY_PCT})")
+    parser.add_argument("--max-error-pct", type=float, default=DEFAULT_MAX_ERROR_PCT,
+                        help=f"SLO: maximum error rate in %% (default: {DEFAULT_MAX_ERROR_PCT})")
+    parser.add_argument("--max-p99-ms", type=float, help="SLO: maximum p99 latency in ms")
+    parser.add_argument("--probe-duration", type=int, default=DEFAULT_PROBE_DURATION)
+    parser.add_argument("--probe-ramp-up", type=int, default=DEFAULT_PROBE_RAMP_UP)
+    parser.add_argument("--max-probes", type=int, default=DEFAULT_MAX_PROBES)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"relative bracket width to stop at (default: {DEFAULT_TOLERANCE})")
+    parser.add_argument("--template", default=JMX_TEMPLATE)
+    args = parser.parse_args()
+
+    params = load_yaml(args.testcase)
+    name = str(params.get("NAME") or os.path.splitext(os.path.basename(args.testcase))[0])
+    output_dir = os.path.join(DEFAULT_CAPACITY_DIR, f"{name}_{time.strftime('%Y%m%d-%H%M%S')}")
+
+    result = find_knee(params, args.min_threads, args.max_threads, args.max_rps,
+                       args.min_efficiency, args.max_error_pct, args.max_p99_ms,
+                       args.probe_duration, args.probe_ramp_up, args.max_probes, args.tolerance,
+                       output_dir, args.template)
+
+    curve_path = os.path.join(output_dir, "capacity_curve.csv")
+    write_curve_csv(result["curve"], curve_path)
+
+    print("\n=== Capacity Curve ===")
+    print(f"{'threads':>8} {'theory rps':>11} {'actual rps':>11} {'eff %':>7} {'err %':>7} {'p99 ms':>8}  SLO")
+    for point in result["curve"]:
+        print(f"{point['threads']:>8} {point['theoretical_rps'] or 0:>11.1f} {point['actual_rps'] or 0:>11.1f} "
+              f"{point['efficiency_pct'] or 0:>7.1f} {point['error_rate_pct'] or 0:>7.2f} "
+              f"{point['p99_latency_ms'] or 0:>8.0f}  {'pass' if point['passed'] else 'fail'}")
+    knee = result["knee"]
+    if knee:
+        print(f"\n🎯 Knee point: {knee['threads']} threads, {knee['actual_rps']:.1f} req/s "
+              f"({knee['efficiency_pct']:.1f}% efficiency) after {result['probes']} probes")
+    else:
+        print(f"\n❌ No load within SLO after {result['probes']} probes")
+    print(f"✅ Curve written to {curve_path}")
+
+
+if __name__ == "__main__":
+    main()
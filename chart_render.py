@@ -0,0 +1,157 @@
+import html
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# --- Global Constants ---
+CHART_FORMATS = ("png", "svg")
+DEFAULT_FIGSIZE = (10, 6)
+DEFAULT_DPI = 100
+
+# A chart spec is a plain (picklable) dict, so the same spec renders in this
+# process, in a worker process or into the HTML report:
+# {
+#     "name": "efficiency_bar_chart",          # output file name without extension
+#     "kind": "line" | "bar" | "grouped_bar",
+#     "title": ..., "xlabel": ..., "ylabel": ...,
+#     "series": [{"x": [...], "y": [...], "label": ..., "color": ..., "linewidth": ..., "marker": ...}],
+#     "categories": [...],                      # bar / grouped_bar x tick labels
+#     "vlines": [{"x": ..., "color": ..., "linestyle": ..., "label": ...}],
+#     "figsize": (w, h), "log_y": bool, "ylim": (low, high),
+#     "grid_axis": "both" | "y", "bar_labels": bool, "legend": bool,
+# }
+
+
+def _draw(spec, ax):
+    kind = spec.get("kind", "line")
+    series = spec.get("series", [])
+    if kind == "line":
+        for s in series:
+            ax.plot(s["x"], s["y"], label=s.get("label"), color=s.get("color"),
+                    linewidth=s.get("linewidth", 1.5), marker=s.get("marker"), linestyle=s.get("linestyle", "-"))
+    elif kind == "bar":
+        s = series[0]
+        bars = ax.bar(spec["categories"], s["y"], color=s.get("color"), label=s.get("label"))
+        if spec.get("bar_labels"):
+            for bar in bars:
+                height = bar.get_height()
+                ax.text(bar.get_x() + bar.get_width() / 2, height + 0.5, round(height, 2),
+                        ha='center', va='bottom', fontsize=9)
+    elif kind == "grouped_bar":
+        index = range(len(spec["categories"]))
+        width = 0.7 / len(series)
+        for i, s in enumerate(series):
+            offset = (i - (len(series) - 1) / 2) * width
+            ax.bar([x + offset for x in index], s["y"], width, label=s.get("label"), color=s.get("color"))
+        ax.set_xticks(list(index))
+        ax.set_xticklabels(spec["categories"])
+    else:
+        raise ValueError(f"Unknown chart kind '{kind}' in chart '{spec.get('name')}'")
+
+    for line in spec.get("vlines", []):
+        ax.axvline(x=line["x"], color=line.get("color"), linestyle=line.get("linestyle", ":"), label=line.get("label"))
+
+    ax.set_xlabel(spec.get("xlabel", ""), fontsize=12)
+    ax.set_ylabel(spec.get("ylabel", ""), fontsize=12)
+    ax.set_title(spec.get("title", ""), fontsize=14)
+    ax.grid(axis=spec.get("grid_axis", "both"), linestyle='--', alpha=0.7)
+    if spec.get("log_y"):
+        ax.set_yscale('log')
+    if spec.get("ylim"):
+        ax.set_ylim(*spec["ylim"])
+    if spec.get("legend", True) and any(s.get("label") for s in series):
+        ax.legend(fontsize=10)
+
+
+def build_figure(spec):
+    """
+    Creates the figure of a spec on the Agg canvas. Figures made this way are
+    not registered with pyplot, so no display is needed and nothing stays
+    alive once the figure goes out of scope.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=spec.get("figsize", DEFAULT_FIGSIZE), dpi=DEFAULT_DPI)
+    FigureCanvasAgg(fig)
+    _draw(spec, fig.add_subplot())
+    fig.tight_layout()
+    return fig
+
+
+def render_chart(spec, output_dir, formats=("png",)):
+    """Renders one spec to <output_dir>/<name>.<format> for each format; returns the written paths."""
+    for fmt in formats:
+        if fmt not in CHART_FORMATS:
+            raise ValueError(f"Unsupported chart format '{fmt}' (choose from {', '.join(CHART_FORMATS)})")
+    os.makedirs(output_dir, exist_ok=True)
+    fig = build_figure(spec)
+    paths = []
+    try:
+        for fmt in formats:
+            path = os.path.join(output_dir, f"{spec['name']}.{fmt}")
+            fig.savefig(path, format=fmt)
+            paths.append(path)
+    finally:
+        fig.clear()
+    return paths
+
+
+def render_charts(specs, output_dir, formats=("png",), workers=1):
+    """
+    Renders many specs in one pass, in a process pool when workers > 1.
+    Returns the written paths in spec order.
+    """
+    specs = list(specs)
+    if len(specs) > 1 and (workers is None or workers > 1):
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(render_chart, specs, [output_dir] * len(specs), [tuple(formats)] * len(specs))
+            return [path for paths in results for path in paths]
+    return [path for spec in specs for path in render_chart(spec, output_dir, formats)]
+
+
+def render_svg(spec):
+    """The chart of a spec as an SVG document string."""
+    fig = build_figure(spec)
+    buffer = io.StringIO()
+    try:
+        fig.savefig(buffer, format="svg")
+    finally:
+        fig.clear()
+    svg = buffer.getvalue()
+    return svg[svg.index("<svg"):] # drop the XML prolog so it can be inlined
+
+
+def write_html_report(specs, output_path, title="JMeter Test Report"):
+    """Writes a single self-contained HTML file with every chart inlined as SVG."""
+    sections = []
+    for spec in specs:
+        sections.append(f"<section><h2>{html.escape(spec.get('title') or spec['name'])}</h2>\n{render_svg(spec)}</section>")
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(
+            "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">"
+            f"<title>{html.escape(title)}</title>"
+            "<style>body{font-family:sans-serif;margin:2em}section{margin-bottom:2em}svg{max-width:100%;height:auto}</style>"
+            f"</head><body><h1>{html.escape(title)}</h1>\n" + "\n".join(sections) + "\n</body></html>\n"
+        )
+    return output_path
+
+
+def show_charts(specs):
+    """Opens the charts in interactive windows (blocks until they are closed) and then closes them."""
+    import matplotlib.pyplot as plt
+
+    figures = []
+    for spec in specs:
+        fig = plt.figure(figsize=spec.get("figsize", DEFAULT_FIGSIZE))
+        _draw(spec, fig.add_subplot())
+        fig.tight_layout()
+        figures.append(fig)
+    try:
+        plt.show()
+    finally:
+        for fig in figures:
+            plt.close(fig)
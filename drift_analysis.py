@@ -0,0 +1,203 @@
+import csv
+import os
+
+import numpy as np
+
+from arrival_profiles import arrival_rate_series, compile_profile
+
+# --- Global Constants ---
+DEFAULT_WINDOW_SEC = 10
+SUBSAMPLES_PER_SECOND = 4 # theory is averaged over each second instead of read at its start
+DRIFT_ALLOWANCE = 0.10 # CUSUM slack: a shortfall up to 10% of theory is not drift
+DRIFT_THRESHOLD = 5.0 # CUSUM alarm level, in seconds-worth of a total shortfall
+RAMP_LEVEL = 0.9 # ramp-up lag is measured where each curve reaches 90% of the theoretical plateau
+WINDOW_CSV_COLUMNS = ["window_start_sec", "theoretical_requests", "actual_requests", "efficiency_pct"]
+
+
+def scheduler_stop_sec(params, theory):
+    """
+    Seconds after the test start at which no new sample starts. The thread
+    group's scheduler stops every thread DURATION seconds after the start,
+    ramp-up included (as jmeter_sim.simulate_thread_group does); an open-model
+    case ends with its shaping timer schedule.
+    """
+    if params.get("ARRIVAL_PROFILE"):
+        return theory["total_simulation_time"]
+    return params.get("DURATION", 60)
+
+
+def _closed_loop_rps(params, theory, times):
+    """
+    The closed-loop model's rate at the given times: users ramp linearly to
+    THREADS over RAMP_UP (the same curve calculate_closed_loop_values
+    integrates) at 1 / cycle time each, capped at the predicted max RPS.
+    """
+    threads = params.get("THREADS", 1)
+    ramp_up = params.get("RAMP_UP", 0)
+    users = threads * np.clip(times / ramp_up, 0.0, 1.0) if ramp_up > 0 else np.full(times.shape, float(threads))
+    return np.minimum(users / theory["cycle_time_sec"], theory["max_rps"])
+
+
+def theoretical_rps_curve(params, theory, resolution=1.0):
+    """
+    Theoretical RPS over time for a test case: the closed-loop model's rate
+    (see _closed_loop_rps), or for an open-model case (ARRIVAL_PROFILE) its
+    target arrival rate. The curve ends at the scheduler stop; no tear-down
+    follows it in a real run.
+    :return: (time_series, rps_series)
+    """
+    stop = scheduler_stop_sec(params, theory)
+    if params.get("ARRIVAL_PROFILE"):
+        time_series, rps_series = arrival_rate_series(compile_profile(params["ARRIVAL_PROFILE"]), resolution)
+        running = time_series < stop
+        return time_series[running], rps_series[running]
+    time_series = np.arange(int(np.ceil(stop / resolution))) * resolution
+    time_series = time_series[time_series < stop]
+    return time_series, _closed_loop_rps(params, theory, time_series)
+
+
+def theoretical_per_second(params, theory):
+    """Mean theoretical RPS of each one-second bucket, bucket 0 = test start."""
+    if params.get("ARRIVAL_PROFILE"):
+        time_series, rps_series = theoretical_rps_curve(params, theory, resolution=1.0 / SUBSAMPLES_PER_SECOND)
+        seconds = -(-time_series.size // SUBSAMPLES_PER_SECOND)
+        padded = np.pad(rps_series, (0, seconds * SUBSAMPLES_PER_SECOND - rps_series.size))
+        return padded.reshape(seconds, SUBSAMPLES_PER_SECOND).mean(axis=1)
+    # midpoints of each sub-interval, so a ramp's seconds average to what the model integrates
+    stop = scheduler_stop_sec(params, theory)
+    seconds = int(np.ceil(stop))
+    times = (np.arange(seconds * SUBSAMPLES_PER_SECOND) + 0.5) / SUBSAMPLES_PER_SECOND
+    rps = np.where(times < stop, _closed_loop_rps(params, theory, times), 0.0)
+    return rps.reshape(seconds, SUBSAMPLES_PER_SECOND).mean(axis=1)
+
+
+def _first_reach(series, level):
+    hits = np.flatnonzero(series >= level)
+    return int(hits[0]) if hits.size else None
+
+
+def detect_drift(theoretical, actual, allowance=DRIFT_ALLOWANCE, threshold=DRIFT_THRESHOLD):
+    """
+    One-sided CUSUM on the relative shortfall of actual vs theoretical RPS.
+    Page's recursion g[t] = max(0, g[t-1] + x[t] - allowance) equals
+    S[t] - min(0, min(S[:t+1])) with S = cumsum(x - allowance), so the whole
+    statistic is two cumulative passes instead of a Python loop.
+    :return: (change_point, alarm) second indices, or (None, None) when actual never falls away.
+    """
+    active = theoretical > 0
+    shortfall = np.zeros(theoretical.size)
+    shortfall[active] = np.clip((theoretical[active] - actual[active]) / theoretical[active], -1.0, 1.0)
+    cumulative = np.cumsum(shortfall - allowance)
+    running_min = np.minimum(np.minimum.accumulate(cumulative), 0.0)
+    statistic = cumulative - running_min
+    alarms = np.flatnonzero(statistic > threshold)
+    if not alarms.size:
+        return None, None
+    alarm = int(alarms[0])
+    # the drift started right after the statistic was last at zero
+    resets = np.flatnonzero(statistic[:alarm + 1] <= 0)
+    change_point = int(resets[-1]) + 1 if resets.size else 0
+    return change_point, alarm
+
+
+def compare_with_theory(params, theory, actual, window_sec=DEFAULT_WINDOW_SEC,
+                        allowance=DRIFT_ALLOWANCE, threshold=DRIFT_THRESHOLD):
+    """
+    Lines up the theoretical per-second curve with the per-second buckets of
+    a JTL analysis (bucket 0 = first sample = test start) and computes, in
+    vectorized passes over the bucket arrays:
+    - per-window efficiency (actual / theoretical requests in each window),
+    - the change point where actual throughput first falls away from theory,
+      looking only at seconds before the scheduler stop (the run winds down after it),
+    - ramp-up lag (seconds between theory and actual reaching 90% of the plateau),
+    - the tail of samples after the scheduler stop (DURATION, ramp-up included).
+    :param actual: analyze_jtl result with rps_per_second.
+    """
+    theoretical = theoretical_per_second(params, theory)
+    observed = np.asarray(actual["rps_per_second"], dtype=np.float64)
+    seconds = max(theoretical.size, observed.size)
+    theoretical = np.pad(theoretical, (0, seconds - theoretical.size))
+    observed = np.pad(observed, (0, seconds - observed.size))
+
+    window_starts = np.arange(0, seconds, window_sec)
+    theory_windows = np.add.reduceat(theoretical, window_starts)
+    actual_windows = np.add.reduceat(observed, window_starts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        window_efficiency = np.where(theory_windows > 0, actual_windows / theory_windows * 100, np.nan)
+
+    scheduler_stop = scheduler_stop_sec(params, theory)
+    running = int(np.ceil(scheduler_stop))
+    change_point, alarm = detect_drift(theoretical[:running], observed[:running], allowance, threshold)
+
+    plateau = theoretical.max() if seconds else 0.0
+    theory_ramp = _first_reach(theoretical, RAMP_LEVEL * plateau) if plateau > 0 else None
+    actual_ramp = _first_reach(observed, RAMP_LEVEL * plateau) if plateau > 0 else None
+    active_seconds = np.flatnonzero(observed > 0)
+    last_active = int(active_seconds[-1]) + 1 if active_seconds.size else 0
+
+    return {
+        "seconds": np.arange(seconds),
+        "theoretical_rps": theoretical,
+        "actual_rps": observed,
+        "window_sec": window_sec,
+        "window_start_sec": window_starts,
+        "window_theoretical_requests": theory_windows,
+        "window_actual_requests": actual_windows,
+        "window_efficiency_pct": window_efficiency,
+        "overall_efficiency_pct": observed.sum() / theoretical.sum() * 100 if theoretical.sum() > 0 else None,
+        "change_point_sec": change_point,
+        "drift_alarm_sec": alarm,
+        "ramp_up_lag_sec": actual_ramp - theory_ramp if theory_ramp is not None and actual_ramp is not None else None,
+        "tail_sec": max(last_active - scheduler_stop, 0),
+    }
+
+
+def print_drift_summary(drift):
+    efficiency = drift["window_efficiency_pct"]
+    print(f"\n📉 Windowed efficiency ({drift['window_sec']} s windows): "
+          f"min {np.nanmin(efficiency):.1f}%, median {np.nanmedian(efficiency):.1f}%"
+          if np.isfinite(efficiency).any() else "\n📉 No theoretical load to compare with.")
+    if drift["overall_efficiency_pct"] is not None:
+        print(f"📐 Requests vs theoretical curve: {drift['overall_efficiency_pct']:.2f}%")
+    if drift["ramp_up_lag_sec"] is not None:
+        print(f"⏳ Ramp-up lag: {drift['ramp_up_lag_sec']} sec")
+    else:
+        print("⏳ Actual throughput never reached 90% of the theoretical plateau.")
+    if drift["change_point_sec"] is not None:
+        print(f"⚠️ Actual throughput falls away from theory at t={drift['change_point_sec']}s "
+              f"(detected at t={drift['drift_alarm_sec']}s)")
+    else:
+        print("✅ No drift away from the theoretical curve detected.")
+    if drift["tail_sec"]:
+        print(f"🐌 Samples kept arriving {drift['tail_sec']} sec after the scheduler stop.")
+
+
+def write_window_csv(drift, output_path):
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(output_path, "w", newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(WINDOW_CSV_COLUMNS)
+        writer.writerows(zip(drift["window_start_sec"], np.round(drift["window_theoretical_requests"], 2),
+                             drift["window_actual_requests"].astype(np.int64),
+                             np.round(drift["window_efficiency_pct"], 2)))
+
+
+def drift_chart_spec(drift, name="theory_vs_actual_rps"):
+    """chart_render spec of theoretical vs actual RPS per second, marking the change point."""
+    spec = {
+        "name": name,
+        "kind": "line",
+        "title": "Theoretical vs. Actual RPS per Second",
+        "xlabel": "Time since test start (seconds)",
+        "ylabel": "Requests per Second",
+        "figsize": (12, 6),
+        "series": [
+            {"x": drift["seconds"], "y": drift["theoretical_rps"], "label": "Theoretical RPS", "color": "blue"},
+            {"x": drift["seconds"], "y": drift["actual_rps"], "label": "Actual RPS", "color": "green"},
+        ],
+    }
+    if drift["change_point_sec"] is not None:
+        spec["vlines"] = [{"x": drift["change_point_sec"], "color": "r", "linestyle": ":", "label": "Drift start"}]
+    return spec
@@ -1,4 +1,13 @@
-import matplotlib.pyplot as plt
+import argparse
+import os
+
+# numpy, pandas และ matplotlib ถูก import ภายในฟังก์ชันที่ใช้เท่านั้น เพื่อให้คำสั่ง calc เริ่มทำงานได้เร็ว
+
+# เวลาขั้นต่ำที่ JMeter ใช้ประมวลผล 1 Request เมื่อไม่มี think time (Stress Test Mode)
+MIN_PROCESSING_TIME_MS = 10 # 10 ms = 0.01 seconds
+
+# ชื่อคอลัมน์ของไฟล์ scenario grid (ใช้ชื่อเดียวกับ key ใน testcases/*.yaml)
+SCENARIO_COLUMNS = ["THREADS", "RAMP_UP", "DURATION", "THINK_TIME"]
 
 def calculate_theoretical_values(threads, ramp_up, duration, think_time_ms):
     # ปรับปรุงการจัดการ think_time:
@@ -10,25 +19,25 @@ def calculate_theoretical_values(threads, ramp_up, duration, think_time_ms):
         # เมื่อ think_time_ms เป็น 0 (Stress Test Mode)
         # กำหนดเวลาขั้นต่ำที่ JMeter ใช้ในการประมวลผล 1 Request (เช่น 10ms หรือ 5ms)
         # ค่านี้จะสะท้อนถึง Overhead ของ JMeter และการตอบสนองที่เร็วที่สุดจาก Server
-        min_processing_time_ms = 10 # 10 ms = 0.01 seconds
-        interval_per_user = min_processing_time_ms / 1000.0
+        interval_per_user = MIN_PROCESSING_TIME_MS / 1000.0
 
     # RPS สูงสุดที่ทำได้ (เมื่อมีผู้ใช้งานเต็มจำนวนและไม่มีเวลาคิดเพิ่มเติม)
     max_rps = threads / interval_per_user
     
-    # จำนวน requests ในช่วง ramp-up (โดยประมาณ)
-    # ใช้ค่าเฉลี่ยของ user ในช่วง ramp-up (threads / 2)
-    requests_during_ramp_up = (threads / 2) / interval_per_user * ramp_up
+    # duration นับจากเริ่ม Test และรวม ramp-up แล้ว (เหมือน scheduler ของ JMeter และ jmeter_sim)
+    # จำนวน requests ในช่วง ramp-up (โดยประมาณ): user เพิ่มแบบเส้นตรง ถ้า duration สั้นกว่า ramp-up จะถูกตัดกลางทาง
+    ramping = min(ramp_up, duration)
+    requests_during_ramp_up = threads * ramping ** 2 / (2 * ramp_up) / interval_per_user if ramp_up > 0 else 0.0
     
-    # จำนวน requests ในช่วง duration
-    requests_during_duration = (threads / interval_per_user) * duration
+    # จำนวน requests ในช่วงที่ user ครบแล้ว (หลัง ramp-up จนถึง duration)
+    requests_during_duration = (threads / interval_per_user) * max(duration - ramp_up, 0)
     
     total_requests = requests_during_ramp_up + requests_during_duration
 
     # ค่าอื่นๆ ที่เกี่ยวข้อง
     load_intensity = max_rps # อัตราโหลดสูงสุด (RPS)
     ramp_up_gradient = threads / ramp_up if ramp_up > 0 else threads # อัตราการเพิ่มผู้ใช้งานต่อวินาที
-    total_simulation_time = ramp_up + duration # ระยะเวลารวมของ Test (ramp-up + duration)
+    total_simulation_time = duration # ระยะเวลารวมของ Test (duration รวม ramp-up แล้ว)
 
     return {
         "max_rps": max_rps,
@@ -40,117 +49,525 @@ def calculate_theoretical_values(threads, ramp_up, duration, think_time_ms):
     }
 
 
-def plot_traffic_pattern(threads, ramp_up, duration, think_time_ms):
+def calculate_theoretical_values_batch(threads, ramp_up, duration, think_time_ms,
+                                       min_processing_time_ms=MIN_PROCESSING_TIME_MS):
+    """
+    Vectorized calculate_theoretical_values: every argument may be a scalar or
+    a NumPy array (broadcast together), and every metric comes back as an array.
+    As there, duration counts from the test start with the ramp-up included.
+    Scenarios with think_time_ms <= 0 use min_processing_time_ms as the interval.
+    """
+    import numpy as np
+
+    threads = np.asarray(threads, dtype=np.float64)
+    ramp_up = np.asarray(ramp_up, dtype=np.float64)
+    duration = np.asarray(duration, dtype=np.float64)
+    think_time_ms = np.asarray(think_time_ms, dtype=np.float64)
+    threads, ramp_up, duration, think_time_ms = np.broadcast_arrays(threads, ramp_up, duration, think_time_ms)
+
+    # เหมือน calculate_theoretical_values: think time <= 0 ใช้ค่าขั้นต่ำแทน
+    interval_per_user = np.where(think_time_ms > 0, think_time_ms, min_processing_time_ms) / 1000.0
+
+    max_rps = threads / interval_per_user
+    ramping = np.minimum(ramp_up, duration)
+    requests_during_ramp_up = np.divide(threads * ramping ** 2, 2 * ramp_up * interval_per_user,
+                                        out=np.zeros_like(threads), where=ramp_up > 0)
+    requests_during_duration = max_rps * np.maximum(duration - ramp_up, 0)
+    ramp_up_gradient = np.divide(threads, ramp_up, out=threads.copy(), where=ramp_up > 0)
+
+    return {
+        "max_rps": max_rps,
+        "total_requests_approx": requests_during_ramp_up + requests_during_duration,
+        "interval_per_user": interval_per_user,
+        "load_intensity": max_rps,
+        "ramp_up_gradient": ramp_up_gradient,
+        "total_simulation_time": duration
+    }
+
+
+def calculate_closed_loop_values(threads, ramp_up, duration, think_time_ms,
+                                 response_time_ms=MIN_PROCESSING_TIME_MS,
+                                 server_capacity_rps=None, generator_capacity_rps=None, generators=1):
+    """
+    Closed-loop throughput model (Little's law for a closed system).
+    Every thread waits think_time_ms and then for the server's response before
+    its next request, so one thread cycles every think + response seconds and
+    X = min(threads / (think + response), server capacity, generator capacity).
+    When a capacity caps X, Little's law gives the response time the threads
+    will actually see: R = threads / X - think.
+    :param response_time_ms: Mean server response time at light load (fixed value or fitted from a JTL).
+    :param server_capacity_rps: Maximum RPS the target can serve (None = unlimited).
+    :param generator_capacity_rps: Maximum RPS one load generator can send (None = unlimited).
+    :param generators: Number of load generators (JMeter engines) sharing the threads;
+                       together they can send generators * generator_capacity_rps.
+    :return: dict with the same keys as calculate_theoretical_values plus the model details.
+    """
+    think_sec = max(think_time_ms, 0) / 1000.0
+    response_sec = max(response_time_ms, 0) / 1000.0
+    cycle_time = think_sec + response_sec
+    if cycle_time <= 0:
+        # ไม่มีทั้ง think time และ response time: ใช้ค่าขั้นต่ำเหมือนโมเดลเดิม
+        cycle_time = MIN_PROCESSING_TIME_MS / 1000.0
+
+    # อัตราที่ thread ทั้งหมดสร้างได้ และข้อจำกัดของ server / load generator
+    limits = {"threads": threads / cycle_time}
+    if server_capacity_rps:
+        limits["server"] = server_capacity_rps
+    if generator_capacity_rps:
+        limits["generator"] = generator_capacity_rps * max(generators, 1)
+    bottleneck = min(limits, key=limits.get)
+    max_rps = limits[bottleneck]
+    effective_response_time = threads / max_rps - think_sec if max_rps > 0 else response_sec
+
+    # duration นับจากเริ่ม Test และรวม ramp-up แล้ว (เหมือน scheduler ของ JMeter และ jmeter_sim)
+    # ช่วง ramp-up: อัตรา = min(users(t) / cycle_time, max_rps) โดย users(t) เพิ่มแบบเส้นตรง
+    if ramp_up > 0 and threads > 0:
+        ramping = min(ramp_up, duration) # ถ้า duration สั้นกว่า ramp-up จะหยุดกลางทาง
+        saturation_time = max_rps * cycle_time / threads * ramp_up # เวลาที่ rate ชนเพดาน
+        if saturation_time >= ramping:
+            requests_during_ramp_up = threads * ramping ** 2 / (2 * ramp_up) / cycle_time
+        else:
+            requests_during_ramp_up = max_rps * saturation_time / 2 + max_rps * (ramping - saturation_time)
+    else:
+        requests_during_ramp_up = 0.0
+    requests_during_duration = max_rps * max(duration - ramp_up, 0)
+
+    return {
+        "max_rps": max_rps,
+        "total_requests_approx": requests_during_ramp_up + requests_during_duration,
+        "interval_per_user": threads / max_rps if max_rps > 0 else cycle_time,
+        "load_intensity": max_rps,
+        "ramp_up_gradient": threads / ramp_up if ramp_up > 0 else threads,
+        # รวมเวลาที่ request สุดท้ายยังค้างอยู่หลัง scheduler หยุด
+        "total_simulation_time": duration + effective_response_time,
+        "unconstrained_rps": limits["threads"],
+        "cycle_time_sec": cycle_time,
+        "effective_response_time_ms": effective_response_time * 1000.0,
+        "generators": max(generators, 1),
+        "bottleneck": bottleneck
+    }
+
+
+def response_time_from_jtl(jtl_path):
+    """
+    Fits the closed-loop model's response time from a previous run:
+    returns the mean latency (ms) of the samples in the JTL, or None if it has none.
+    """
+    from jtl_cache import analyze_jtl_cached
+
+    result = analyze_jtl_cached(jtl_path)
+    return result.get("avg_latency_ms")
+
+
+def sweep_scenarios(scenarios, min_processing_time_ms=MIN_PROCESSING_TIME_MS):
+    """
+    Runs calculate_theoretical_values_batch over a table of scenarios.
+    :param scenarios: DataFrame (or dict of arrays) with THREADS, RAMP_UP, DURATION and THINK_TIME columns.
+    :return: DataFrame with the scenario columns followed by one column per metric.
+    """
+    import pandas as pd
+
+    table = pd.DataFrame(scenarios)
+    missing = [c for c in SCENARIO_COLUMNS if c not in table.columns]
+    if missing:
+        raise ValueError(f"Scenario table is missing columns: {', '.join(missing)}")
+
+    metrics = calculate_theoretical_values_batch(
+        threads=table["THREADS"].to_numpy(),
+        ramp_up=table["RAMP_UP"].to_numpy(),
+        duration=table["DURATION"].to_numpy(),
+        think_time_ms=table["THINK_TIME"].to_numpy(),
+        min_processing_time_ms=min_processing_time_ms
+    )
+    result = table.copy()
+    for key, values in metrics.items():
+        result[key] = values
+    return result
+
+
+def load_scenario_grid(path):
+    """
+    Loads a scenario grid file.
+    - .csv: one scenario per row with the SCENARIO_COLUMNS headers.
+    - .yaml/.yml: each key holds a value or a list of values, and every
+      combination is swept (e.g. THREADS: [100, 500], THINK_TIME: [0, 500]).
+    """
+    import numpy as np
+    import pandas as pd
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return pd.read_csv(path)
+    if extension in (".yaml", ".yml"):
+        import yaml
+
+        with open(path, "r") as f:
+            grid = yaml.safe_load(f) or {}
+        axes = {}
+        for key in SCENARIO_COLUMNS:
+            if key not in grid:
+                raise ValueError(f"Scenario grid {path} has no {key} entry.")
+            values = grid[key]
+            axes[key] = values if isinstance(values, list) else [values]
+        # cartesian product ของทุกค่า โดยสร้างเป็น array ครั้งเดียว
+        mesh = np.meshgrid(*[np.asarray(v, dtype=np.float64) for v in axes.values()], indexing="ij")
+        return pd.DataFrame({key: m.ravel() for key, m in zip(axes, mesh)})
+    raise ValueError(f"Unsupported scenario grid format: {path} (use .csv or .yaml)")
+
+
+def run_sweep(grid_path, output_path, jmx_dir=None, template_path=None):
+    """
+    CLI sweep mode: reads a scenario grid, computes every scenario and writes a CSV results table.
+    With jmx_dir, also renders one JMeter plan per scenario from template_path.
+    """
+    scenarios = load_scenario_grid(grid_path)
+    print(f"📐 Sweeping {len(scenarios)} scenarios from {grid_path}...")
+    result = sweep_scenarios(scenarios)
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    result.to_csv(output_path, index=False)
+    print(f"✅ Sweep results written to {output_path}")
+    if jmx_dir:
+        from jmx_engine import render_plans
+
+        rows = scenarios[SCENARIO_COLUMNS].to_dict("records")
+        paths = render_plans(template_path, rows, jmx_dir)
+        print(f"✅ {len(paths)} JMeter plans written to {jmx_dir}")
+    return result
+
+
+DEFAULT_TIME_RESOLUTION = 0.5 # ความละเอียดของเวลาในการพล็อต (วินาที)
+
+
+def traffic_pattern_series(threads, ramp_up, duration, think_time_ms, resolution=DEFAULT_TIME_RESOLUTION):
+    """
+    Theoretical load curve as arrays, computed in one vectorized pass.
+    Users ramp linearly to `threads` over ramp_up and hold until `duration`
+    seconds after the start (ramp-up included, like JMeter's scheduler), then
+    tear down symmetrically over another ramp_up for the plot.
+    :param resolution: Time step in seconds.
+    :return: (time_series, user_series, rps_series) NumPy arrays.
+    """
+    import numpy as np
+
+    if resolution <= 0:
+        raise ValueError("resolution must be greater than 0.")
+
     # ใช้ Logic เดียวกันกับ calculate_theoretical_values สำหรับ think_time
     if think_time_ms > 0:
         think_time_sec_for_plot = think_time_ms / 1000.0
     else:
-        min_processing_time_ms = 10 # ต้องสอดคล้องกับ calculate_theoretical_values
-        think_time_sec_for_plot = min_processing_time_ms / 1000.0
-    
-    # กำหนดช่วงเวลาที่การทดสอบทำงาน (รวม ramp-up และ duration)
+        think_time_sec_for_plot = MIN_PROCESSING_TIME_MS / 1000.0 # ต้องสอดคล้องกับ calculate_theoretical_values
+
+    # กำหนดช่วงเวลาที่การทดสอบทำงาน (duration รวม ramp-up แล้ว)
     # และเพิ่มเวลาสำหรับช่วง tear-down เพื่อให้กราฟลดลงถึง 0
     tear_down_time = ramp_up # กำหนด tear-down time ให้เท่ากับ ramp-up time เพื่อให้สมมาตร
-    total_simulation_time_for_plot = ramp_up + duration + tear_down_time
-
-    time_series = []
-    rps_series = []
-    user_series = []
-
-    time_resolution = 0.5 # ความละเอียดของเวลาในการพล็อต (วินาที)
-    total_steps = int(total_simulation_time_for_plot / time_resolution) + 1
-
-    for t in range(total_steps):
-        current_time = t * time_resolution
-
-        active_users = 0
-        if current_time <= ramp_up:
-            # ช่วง Ramp-up: ผู้ใช้งานเพิ่มขึ้นจาก 0 ถึง Threads
-            active_users = int(threads * (current_time / ramp_up)) if ramp_up > 0 else threads
-        elif current_time <= ramp_up + duration:
-            # ช่วงคงที่: ผู้ใช้งานคงที่ที่จำนวน Threads สูงสุด
-            active_users = threads
-        elif current_time <= ramp_up + duration + tear_down_time:
-            # ช่วง Tear-down: ผู้ใช้งานลดลงจาก Threads ถึง 0
-            time_in_tear_down = current_time - (ramp_up + duration)
-            active_users = int(threads * (1 - (time_in_tear_down / tear_down_time))) if tear_down_time > 0 else 0
-            active_users = max(0, active_users) # ให้แน่ใจว่าไม่ติดลบ
-        else:
-            # หลังจากการทดสอบสิ้นสุด: ผู้ใช้งานเป็น 0
-            active_users = 0
-
-        # คำนวณ RPS จาก Active Users และ Think Time ที่ปรับปรุงแล้ว
-        rps = active_users / think_time_sec_for_plot
-        
-        time_series.append(current_time)
-        rps_series.append(rps)
-        user_series.append(active_users)
-
-    # Plot traffic pattern (Requests per second)
-    plt.figure(figsize=(12, 6))
-    plt.plot(time_series, rps_series, label="Estimated Req/sec", linewidth=2, color='blue')
-    plt.xlabel("Time (seconds)", fontsize=12)
-    plt.ylabel("Requests/sec", fontsize=12)
-    plt.title("JMeter Theoretical Traffic Pattern (RPS Over Time)", fontsize=14)
-    plt.grid(True, linestyle='--', alpha=0.7)
-    plt.legend(fontsize=10)
-    plt.axvline(x=ramp_up, color='r', linestyle=':', label='End Ramp-up')
-    plt.axvline(x=ramp_up + duration, color='g', linestyle=':', label='End Duration')
-    plt.tight_layout()
-    plt.show()
-
-    # Plot concurrency curve (Active Users)
-    plt.figure(figsize=(12, 6))
-    plt.plot(time_series, user_series, label="Active Users", color='orange', linewidth=2)
-    plt.xlabel("Time (seconds)", fontsize=12)
-    plt.ylabel("Active Users", fontsize=12)
-    plt.title("JMeter Concurrency Curve (Users Over Time)", fontsize=14)
-    plt.grid(True, linestyle='--', alpha=0.7)
-    plt.legend(fontsize=10)
-    plt.axvline(x=ramp_up, color='r', linestyle=':', label='End Ramp-up')
-    plt.axvline(x=ramp_up + duration, color='g', linestyle=':', label='End Duration')
-    plt.tight_layout()
-    plt.show()
-
-
-def main():
-    print("=== JMeter Traffic Pattern Calculator ===")
-
-    threads = int(input("Number of Threads (Users): "))
-    ramp_up = float(input("Ramp-up Time (seconds): "))
-    mode = input("Choose mode (1 = loop count, 2 = duration in sec): ")
-
-    test_duration = 0
-    if mode == '1':
-        loop_count = int(input("Loop Count per Thread: "))
-        print("Note: For 'Loop Count' mode, actual duration can vary. Please provide an estimated duration for plotting.")
-        test_duration = float(input("Estimated Test Duration (seconds) for plotting: "))
+    total_simulation_time_for_plot = duration + tear_down_time
+    total_steps = int(total_simulation_time_for_plot / resolution) + 1
+
+    time_series = np.arange(total_steps) * resolution
+    end_of_hold = duration
+    # จำนวน user ตอน scheduler หยุด (ถ้า duration สั้นกว่า ramp-up จะยังไม่ครบ threads)
+    peak_users = np.trunc(threads * min(duration / ramp_up, 1.0)) if ramp_up > 0 else threads
+
+    # ช่วง Ramp-up: ผู้ใช้งานเพิ่มขึ้นจาก 0 ถึง Threads
+    if ramp_up > 0:
+        ramping = np.trunc(threads * (time_series / ramp_up))
     else:
-        test_duration = float(input("Test Duration (seconds): "))
+        ramping = np.full(total_steps, float(threads))
+    # ช่วง Tear-down: ผู้ใช้งานลดลงจาก Threads ถึง 0
+    if tear_down_time > 0:
+        tearing_down = np.maximum(np.trunc(peak_users * (1 - (time_series - end_of_hold) / tear_down_time)), 0)
+    else:
+        tearing_down = np.zeros(total_steps)
+
+    user_series = np.select(
+        [time_series <= min(ramp_up, end_of_hold), time_series <= end_of_hold,
+         time_series <= end_of_hold + tear_down_time],
+        [ramping, threads, tearing_down],
+        default=0
+    ).astype(np.int64)
+
+    # คำนวณ RPS จาก Active Users และ Think Time ที่ปรับปรุงแล้ว
+    rps_series = user_series / think_time_sec_for_plot
+    return time_series, user_series, rps_series
+
+
+def decimate_series(time_series, *series, max_points=2000):
+    """
+    Reduces curves to about max_points points before rendering.
+    The time axis is cut into max_points / 2 buckets and each bucket keeps the
+    points where the first extra series reaches its min and max, so spikes survive.
+    :return: (time_series, *series) at the kept indices; unchanged if already small enough.
+    """
+    import numpy as np
+
+    n = len(time_series)
+    if max_points is None or n <= max_points:
+        return (time_series,) + series
+    key = np.asarray(series[0] if series else time_series)
+    buckets = max(max_points // 2, 1)
+    size = -(-n // buckets) # ceil division
+    padded = np.pad(key, (0, buckets * size - n), mode="edge").reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    keep = np.concatenate(([0, n - 1], offsets + padded.argmin(axis=1), offsets + padded.argmax(axis=1)))
+    keep = np.unique(np.minimum(keep, n - 1))
+    return (np.asarray(time_series)[keep],) + tuple(np.asarray(s)[keep] for s in series)
+
+
+def traffic_pattern_specs(threads, ramp_up, duration, think_time_ms,
+                          resolution=DEFAULT_TIME_RESOLUTION, max_points=None):
+    """
+    Chart specs (see chart_render) of the theoretical RPS and concurrency curves.
+    :param resolution: Time step of the generated curve in seconds.
+    :param max_points: Decimate each curve to about this many points before plotting (None = keep all).
+    """
+    time_series, user_series, rps_series = traffic_pattern_series(
+        threads, ramp_up, duration, think_time_ms, resolution=resolution
+    )
+    if max_points is not None:
+        time_series, rps_series, user_series = decimate_series(time_series, rps_series, user_series,
+                                                               max_points=max_points)
+    phase_lines = [
+        {"x": ramp_up, "color": "r", "linestyle": ":", "label": "End Ramp-up"},
+        {"x": duration, "color": "g", "linestyle": ":", "label": "End Duration"},
+    ]
+    return [
+        {
+            "name": "theoretical_traffic_pattern",
+            "kind": "line",
+            "title": "JMeter Theoretical Traffic Pattern (RPS Over Time)",
+            "xlabel": "Time (seconds)",
+            "ylabel": "Requests/sec",
+            "figsize": (12, 6),
+            "series": [{"x": time_series, "y": rps_series, "label": "Estimated Req/sec", "color": "blue", "linewidth": 2}],
+            "vlines": phase_lines,
+        },
+        {
+            "name": "theoretical_concurrency_curve",
+            "kind": "line",
+            "title": "JMeter Concurrency Curve (Users Over Time)",
+            "xlabel": "Time (seconds)",
+            "ylabel": "Active Users",
+            "figsize": (12, 6),
+            "series": [{"x": time_series, "y": user_series, "label": "Active Users", "color": "orange", "linewidth": 2}],
+            "vlines": phase_lines,
+        },
+    ]
+
+
+def plot_traffic_pattern(threads, ramp_up, duration, think_time_ms,
+                         resolution=DEFAULT_TIME_RESOLUTION, max_points=None, show=True, output_dir=None,
+                         formats=("png",)):
+    """
+    Plots the theoretical RPS and concurrency curves.
+    :param resolution: Time step of the generated curve in seconds.
+    :param max_points: Decimate each curve to about this many points before plotting (None = keep all).
+    :param show: Open the figures in a window; set False to render headless.
+    :param output_dir: If given, both charts are saved there (headless, Agg) in each of `formats`.
+    """
+    import chart_render
+
+    specs = traffic_pattern_specs(threads, ramp_up, duration, think_time_ms, resolution, max_points)
+    if output_dir:
+        chart_render.render_charts(specs, output_dir, formats)
+    if show:
+        chart_render.show_charts(specs)
 
-    think_time_ms = float(input("Think Time per request (ms): "))
+
+def _load_args(args):
+    """THREADS/RAMP_UP/DURATION/THINK_TIME from --testcase, overridden by explicit options."""
+    params = {}
+    if args.testcase:
+        import yaml
+
+        with open(args.testcase, "r") as f:
+            params = yaml.safe_load(f) or {}
+    for key, value in (("THREADS", args.threads), ("RAMP_UP", args.ramp_up),
+                       ("DURATION", args.duration), ("THINK_TIME", args.think_time)):
+        if value is not None:
+            params[key] = value
+    if "THREADS" not in params:
+        raise SystemExit("❌ --threads (or --testcase) is required.")
+    return params
+
+
+def _cmd_calc(args):
+    params = _load_args(args)
+    threads, ramp_up = params["THREADS"], params.get("RAMP_UP", 0)
+    duration, think_time_ms = params.get("DURATION", 60), params.get("THINK_TIME", 0)
     if think_time_ms <= 0:
         print("⚠️ No think time specified. Interpreted as 0 ms (stress test mode).")
 
-    result = calculate_theoretical_values(
-        threads=threads,
-        ramp_up=ramp_up,
-        duration=test_duration,
-        think_time_ms=think_time_ms
-    )
+    if args.response_time is None and args.server_capacity is None and args.generator_capacity is None:
+        result = calculate_theoretical_values(threads, ramp_up, duration, think_time_ms)
+    else:
+        result = calculate_closed_loop_values(
+            threads, ramp_up, duration, think_time_ms,
+            response_time_ms=args.response_time if args.response_time is not None else MIN_PROCESSING_TIME_MS,
+            server_capacity_rps=args.server_capacity,
+            generator_capacity_rps=args.generator_capacity,
+            generators=args.generators
+        )
 
     print("\n=== Theoretical Load Summary ===")
     for k, v in result.items():
         # ปรับการแสดงผลสำหรับ float ให้เป็น 2 ตำแหน่ง
         print(f"{k}: {v:.2f}" if isinstance(v, float) else f"{k}: {v}")
 
+
+def _cmd_plot(args):
+    params = _load_args(args)
     plot_traffic_pattern(
-        threads=threads,
-        ramp_up=ramp_up,
-        duration=test_duration,
-        think_time_ms=think_time_ms
+        threads=params["THREADS"],
+        ramp_up=params.get("RAMP_UP", 0),
+        duration=params.get("DURATION", 60),
+        think_time_ms=params.get("THINK_TIME", 0),
+        resolution=args.resolution,
+        max_points=args.max_points,
+        show=args.show,
+        output_dir=args.output_dir,
+        formats=tuple(args.format)
     )
+    print(f"✅ Graphs saved to {args.output_dir}")
+
+
+def _cmd_arrival(args):
+    import yaml
+
+    from arrival_profiles import arrival_specs, open_model_plan_params, open_model_values_from_params
+
+    with open(args.testcase, "r") as f:
+        params = yaml.safe_load(f) or {}
+    if not params.get("ARRIVAL_PROFILE"):
+        raise SystemExit(f"❌ {args.testcase} has no ARRIVAL_PROFILE.")
+    if args.arrivals:
+        params["ARRIVALS"] = args.arrivals
+    if args.percentile is not None:
+        params["CONCURRENCY_PERCENTILE"] = args.percentile
+    response_time_ms = args.response_time if args.response_time is not None else params.get("RESPONSE_TIME",
+                                                                                              MIN_PROCESSING_TIME_MS)
+    try:
+        result = open_model_values_from_params(params, response_time_ms)
+    except ValueError as e:
+        raise SystemExit(f"❌ {e}")
+
+    print("\n=== Open Model (Arrival Rate) Summary ===")
+    for k, v in result.items():
+        print(f"{k}: {v:.2f}" if isinstance(v, float) else f"{k}: {v}")
+
+    if args.jmx:
+        from jmx_engine import render_jmx, template_params
+
+        render_jmx(args.template, args.jmx, template_params(args.template, open_model_plan_params(params, result)))
+        print(f"✅ JMeter plan ({result['shaping_rows']} shaping timer rows) written to {args.jmx}")
+    if args.output_dir:
+        import chart_render
+
+        specs = arrival_specs(params["ARRIVAL_PROFILE"], result, resolution=args.resolution, max_points=args.max_points)
+        chart_render.render_charts(specs, args.output_dir, tuple(args.format))
+        print(f"✅ Graphs saved to {args.output_dir}")
+
+
+def _cmd_sweep(args):
+    run_sweep(args.grid, args.output, args.jmx_dir, args.template)
+
+
+def _cmd_run(args):
+    from run_test import YAML_TESTCASES_DIR, run_yaml_test_case
+
+    yaml_path = args.testcase
+    if not os.path.exists(yaml_path) and not os.path.dirname(yaml_path):
+        yaml_path = os.path.join(YAML_TESTCASES_DIR, yaml_path) # e.g. "light.yaml"
+    record = run_yaml_test_case(yaml_path, args.output_dir, args.profile, args.load_generator)
+    if record is None or record["error"]:
+        raise SystemExit(1)
+
+
+def _cmd_analyze(args):
+    from run_test import analyze_jtl, print_actual_results
+
+    actual = analyze_jtl(args.jtl, chunk_rows=args.chunk_rows, workers=args.workers, use_cache=not args.no_cache)
+    if actual is None:
+        raise SystemExit(1)
+    print_actual_results(actual)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="JMeter Traffic Pattern Calculator")
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+    commands.required = True
+
+    load = argparse.ArgumentParser(add_help=False)
+    load.add_argument("--testcase", help="take the load from a test case YAML (options below override it)")
+    load.add_argument("-t", "--threads", type=int, help="number of threads (users)")
+    load.add_argument("-r", "--ramp-up", type=float, help="ramp-up time in seconds (default: 0)")
+    load.add_argument("-d", "--duration", type=float, help="test duration in seconds, ramp-up included (default: 60)")
+    load.add_argument("-k", "--think-time", type=float, help="think time per request in ms (default: 0 = stress mode)")
+
+    calc = commands.add_parser("calc", parents=[load], help="print the theoretical load summary")
+    calc.add_argument("--response-time", type=float,
+                      help="server response time in ms; switches to the closed-loop model")
+    calc.add_argument("--server-capacity", type=float, help="closed-loop model: server capacity in req/s")
+    calc.add_argument("--generator-capacity", type=float, help="closed-loop model: req/s one load generator can send")
+    calc.add_argument("--generators", type=int, default=1, help="closed-loop model: number of load generators")
+    calc.set_defaults(func=_cmd_calc)
+
+    plot = commands.add_parser("plot", parents=[load], help="render the theoretical traffic and concurrency graphs")
+    plot.add_argument("--output-dir", default="graphs")
+    plot.add_argument("--format", nargs="+", choices=("png", "svg"), default=["png"])
+    plot.add_argument("--resolution", type=float, default=DEFAULT_TIME_RESOLUTION, help="curve time step in seconds")
+    plot.add_argument("--max-points", type=int, help="decimate each curve to about this many points")
+    plot.add_argument("--show", action="store_true", help="also open the graphs in a window")
+    plot.set_defaults(func=_cmd_plot)
+
+    arrival = commands.add_parser("arrival", help="open model: threads and JMeter plan for an ARRIVAL_PROFILE test case")
+    arrival.add_argument("testcase", help="test case YAML with an ARRIVAL_PROFILE (e.g. testcases/open_spike.yaml)")
+    arrival.add_argument("--response-time", type=float,
+                         help=f"expected response time in ms (default: RESPONSE_TIME, else {MIN_PROCESSING_TIME_MS})")
+    arrival.add_argument("--arrivals", choices=("poisson", "uniform"), help="arrival process, overrides ARRIVALS")
+    arrival.add_argument("--percentile", type=float, help="concurrency percentile the threads must cover (default: 99)")
+    arrival.add_argument("--jmx", help="write the JMeter plan (Throughput Shaping Timer schedule) to this path")
+    arrival.add_argument("--template", default=os.path.join("jmx_template", "open_model_template.jmx"))
+    arrival.add_argument("--output-dir", help="render the arrival rate and thread graphs into this directory")
+    arrival.add_argument("--format", nargs="+", choices=("png", "svg"), default=["png"])
+    arrival.add_argument("--resolution", type=float, default=1.0, help="curve time step in seconds")
+    arrival.add_argument("--max-points", type=int, default=2000, help="decimate each curve to about this many points")
+    arrival.set_defaults(func=_cmd_arrival)
+
+    sweep = commands.add_parser("sweep", help="compute every scenario of a grid file (.csv or .yaml)")
+    sweep.add_argument("grid")
+    sweep.add_argument("--output", default=os.path.join("results", "sweep_results.csv"),
+                       help="results table (default: results/sweep_results.csv)")
+    sweep.add_argument("--jmx-dir", help="also render one .jmx plan per scenario into this directory")
+    sweep.add_argument("--template", default=os.path.join("jmx_template", "test_template.jmx"),
+                       help="JMX template used by --jmx-dir (default: jmx_template/test_template.jmx)")
+    sweep.set_defaults(func=_cmd_sweep)
+
+    run = commands.add_parser("run", help="run a test case with JMeter and compare it with theory")
+    run.add_argument("testcase", help="test case YAML (a bare name is looked up in testcases/)")
+    run.add_argument("--output-dir", default="results")
+    run.add_argument("--profile", help="JMeter tuning profile (default, throughput, stress), overrides PROFILE in the YAML")
+    run.add_argument("--load-generator", choices=("jmeter", "python"),
+                     help="python runs the built-in asyncio engine instead of JMeter, overrides LOAD_GENERATOR")
+    run.set_defaults(func=_cmd_run)
+
+    analyze = commands.add_parser("analyze", help="analyze an existing JTL")
+    analyze.add_argument("jtl")
+    analyze.add_argument("--workers", type=int, default=1, help="parallel parser processes (0 = every core)")
+    analyze.add_argument("--chunk-rows", type=int, help="rows parsed per chunk")
+    analyze.add_argument("--no-cache", action="store_true", help="don't read or write the columnar cache")
+    analyze.set_defaults(func=_cmd_analyze)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if getattr(args, "workers", 1) == 0:
+        args.workers = None
+    args.func(args)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,155 @@
+import json
+import os
+import re
+import shutil
+
+# --- Global Constants ---
+DEFAULT_PROFILE = "default"
+OUTPUT_FORMATS = ("csv", "xml") # JMeter's SaveService writes only these two; analysis needs csv
+# every JTL column JMeter can save -> the saveservice property that switches it
+SAVE_SERVICE_FIELDS = {
+    "timeStamp": "timestamp_format", # "ms" to keep, "none" to drop
+    "elapsed": "time",
+    "label": "label",
+    "responseCode": "response_code",
+    "responseMessage": "response_message",
+    "threadName": "thread_name",
+    "dataType": "data_type",
+    "success": "successful",
+    "failureMessage": "assertion_results_failure_message",
+    "bytes": "bytes",
+    "sentBytes": "sent_bytes",
+    "grpThreads": "thread_counts", # also allThreads
+    "URL": "url",
+    "Latency": "latency",
+    "IdleTime": "idle_time",
+    "Connect": "connect_time",
+}
+ANALYZED_FIELDS = ["timeStamp", "elapsed", "label", "responseCode", "success"] # what jtl_analysis reads, plus the code
+LISTENER_CLASSES = ("ResultCollector", "BackendListener", "Summariser")
+
+# Named profiles. heap / gc_algo / jvm_args go to the launcher through the
+# HEAP, GC_ALGO and JVM_ARGS environment variables that jmeter(.bat) honours;
+# None keeps JMeter's own default.
+PROFILES = {
+    "default": {
+        "heap": None,
+        "gc_algo": None,
+        "jvm_args": None,
+        "jtl_fields": None, # None = JMeter's default save configuration
+        "output_format": "csv",
+        "summariser_interval": None,
+        "disable_listeners": False,
+        "properties": {},
+    },
+    "throughput": {
+        "heap": "-Xms2g -Xmx2g -XX:MaxMetaspaceSize=256m",
+        "gc_algo": "-XX:+UseG1GC -XX:MaxGCPauseMillis=100 -XX:G1ReservePercent=20",
+        "jvm_args": "-XX:+AlwaysPreTouch -Djava.net.preferIPv4Stack=true",
+        "jtl_fields": ANALYZED_FIELDS,
+        "output_format": "csv",
+        "summariser_interval": 5,
+        "disable_listeners": True,
+        "properties": {"httpclient.reset_state_on_thread_group_iteration": "false"},
+    },
+    "stress": {
+        "heap": "-Xms4g -Xmx4g -XX:MaxMetaspaceSize=256m",
+        "gc_algo": "-XX:+UseParallelGC",
+        "jvm_args": "-XX:+AlwaysPreTouch -Xss256k -Djava.net.preferIPv4Stack=true",
+        "jtl_fields": ANALYZED_FIELDS,
+        "output_format": "csv",
+        "summariser_interval": 10,
+        "disable_listeners": True,
+        "properties": {"httpclient.reset_state_on_thread_group_iteration": "false"},
+    },
+}
+
+
+def resolve_profile(spec=None):
+    """
+    Returns the full profile for a test case's PROFILE key: None (default),
+    a profile name, or a mapping with an optional `base` name whose entries
+    override that profile (keys are case-insensitive).
+    """
+    if spec is None:
+        spec = DEFAULT_PROFILE
+    if isinstance(spec, str):
+        spec = {"base": spec}
+    spec = {str(key).lower(): value for key, value in spec.items()}
+    base = spec.pop("base", DEFAULT_PROFILE)
+    if base not in PROFILES:
+        raise ValueError(f"Unknown JMeter profile '{base}' (choose from {', '.join(PROFILES)})")
+    unknown = set(spec) - set(PROFILES[base])
+    if unknown:
+        raise ValueError(f"Unknown JMeter profile setting(s): {', '.join(sorted(unknown))}")
+    profile = dict(PROFILES[base], **spec)
+    profile["name"] = base if not spec else f"{base}+custom"
+    if profile["output_format"] not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported JTL output format '{profile['output_format']}' "
+                         f"(choose from {', '.join(OUTPUT_FORMATS)})")
+    if profile["jtl_fields"] is not None:
+        missing = [f for f in ("timeStamp", "elapsed", "success") if f not in profile["jtl_fields"]]
+        if missing:
+            raise ValueError(f"jtl_fields must keep {', '.join(missing)} for the analysis")
+    return profile
+
+
+def resolve_launcher(configured_path=None):
+    """
+    Finds the JMeter launcher for this platform: the JMETER_BIN environment
+    variable, then configured_path if it exists, then $JMETER_HOME/bin, then
+    jmeter on the PATH. Falls back to configured_path so the caller reports it.
+    """
+    script = "jmeter.bat" if os.name == "nt" else "jmeter"
+    candidates = [os.environ.get("JMETER_BIN"), configured_path]
+    if os.environ.get("JMETER_HOME"):
+        candidates.append(os.path.join(os.environ["JMETER_HOME"], "bin", script))
+    for candidate in candidates:
+        if candidate and os.path.isfile(candidate):
+            return candidate
+    return shutil.which(script) or shutil.which("jmeter") or configured_path
+
+
+def jmeter_properties(profile):
+    """-J properties (name -> value) applying the profile's save configuration and summariser."""
+    props = {"jmeter.save.saveservice.output_format": profile["output_format"]}
+    if profile["jtl_fields"] is not None:
+        keep = set(profile["jtl_fields"])
+        for field, prop in SAVE_SERVICE_FIELDS.items():
+            if field == "timeStamp":
+                props["jmeter.save.saveservice.timestamp_format"] = "ms" if field in keep else "none"
+            else:
+                props[f"jmeter.save.saveservice.{prop}"] = "true" if field in keep else "false"
+        props["jmeter.save.saveservice.print_field_names"] = "true"
+    if profile["summariser_interval"]:
+        props["summariser.name"] = "summary"
+        props["summariser.interval"] = str(int(profile["summariser_interval"]))
+        props["summariser.out"] = "true"
+    props.update({str(k): str(v) for k, v in (profile.get("properties") or {}).items()})
+    return props
+
+
+def jmeter_arguments(profile):
+    """Command line arguments for the profile (-Jname=value for every property)."""
+    return [f"-J{name}={value}" for name, value in jmeter_properties(profile).items()]
+
+
+def jmeter_environment(profile, base_env=None):
+    """Launcher environment with the profile's HEAP, GC_ALGO and JVM_ARGS."""
+    env = dict(os.environ if base_env is None else base_env)
+    for key, variable in (("heap", "HEAP"), ("gc_algo", "GC_ALGO"), ("jvm_args", "JVM_ARGS")):
+        if profile.get(key):
+            env[variable] = profile[key]
+    return env
+
+
+def disable_listeners(plan_text):
+    """Marks every listener element of a rendered plan enabled="false"."""
+    pattern = re.compile(r'(<(?:%s)\b[^>]*\benabled=")true(")' % "|".join(LISTENER_CLASSES))
+    return pattern.sub(r"\1false\2", plan_text)
+
+
+def write_profile(profile, output_path):
+    """Records the profile a run used, next to its results."""
+    with open(output_path, "w") as f:
+        json.dump(profile, f, indent=2)
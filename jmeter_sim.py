@@ -0,0 +1,194 @@
+import argparse
+import math
+import os
+
+import numpy as np
+
+# --- Global Constants ---
+MIN_ITERATION_MS = 1.0 # floor for think + response of one loop, so a thread always advances
+BLOCK_SAMPLES = 1_000_000 # samples generated per vectorized step (bounds memory)
+
+
+def _response_time_sampler(response_time_ms):
+    """
+    Normalizes the response time model to a function (rng, shape) -> ms array.
+    Accepts a fixed number, an array of observed latencies (resampled with
+    replacement, e.g. the cached elapsed column of a previous JTL) or a callable.
+    """
+    if callable(response_time_ms):
+        return response_time_ms
+    if np.isscalar(response_time_ms):
+        value = float(response_time_ms)
+        return lambda rng, shape: np.full(shape, value)
+    samples = np.asarray(response_time_ms)
+    if samples.size == 0:
+        raise ValueError("response_time_ms sample array is empty.")
+    return lambda rng, shape: samples[rng.integers(0, samples.size, size=shape)].astype(np.float64)
+
+
+def response_times_from_jtl(jtl_path):
+    """Observed latencies (ms) of a previous run, memory-mapped from the JTL's columnar cache."""
+    from jtl_cache import load_jtl_columns
+
+    columns, _ = load_jtl_columns(jtl_path)
+    return columns["elapsed"]
+
+
+def simulate_thread_group(threads, ramp_up, duration, think_time_ms, response_time_ms,
+                          loops=None, seed=None):
+    """
+    Simulates a JMeter ThreadGroup like the ones in jmx_template/ and returns
+    the per-second load it generates, in the same shape as the JTL analysis.
+
+    Semantics follow JMeter:
+    - thread i (0-based) starts at i * ramp_up / threads seconds;
+    - each loop iteration runs the ConstantTimer (think time) and then the sampler,
+      so a sample starts at think time after the previous one finished;
+    - with the scheduler (loops=None, test_template.jmx) every thread stops at
+      `duration` seconds after the test start, which includes the ramp-up; a
+      sample already in flight completes, a pending timer is cut short;
+    - with loops=N (test_template2.jmx) each thread runs N iterations and there is no cutoff.
+
+    The timeline is generated for all active threads at once, a block of
+    iterations at a time, so memory stays bounded by BLOCK_SAMPLES.
+
+    :param response_time_ms: fixed ms, array of observed latencies to resample, or callable(rng, shape).
+    :return: dict with rps_per_second, concurrency_per_second, bucket_start_sec (0 = test start),
+             total_requests, duration_sec (first to last sample start) and thread start/finish times.
+    """
+    if threads <= 0:
+        raise ValueError("threads must be greater than 0.")
+    if loops is None and duration <= 0:
+        raise ValueError("duration must be greater than 0 when the scheduler is used (loops=None).")
+    rng = np.random.default_rng(seed)
+    sample_response = _response_time_sampler(response_time_ms)
+    think = max(think_time_ms, 0) / 1000.0
+    end_time = float(duration) if loops is None else math.inf
+
+    starts = np.arange(threads) * (ramp_up / threads)
+    clock = starts.copy() # when each thread begins its next iteration (timer start)
+    finish = np.full(threads, np.nan)
+    iterations_done = np.zeros(threads, dtype=np.int64)
+    active = np.arange(threads)
+
+    per_second = np.zeros(int(math.ceil(end_time)) + 1 if loops is None else 1, dtype=np.int64)
+    first_sample = math.inf
+    last_sample = -math.inf
+
+    while active.size:
+        if loops is None:
+            block = max(1, min(BLOCK_SAMPLES // active.size,
+                               int((end_time - clock[active].min()) / max(think, MIN_ITERATION_MS / 1000.0)) + 1))
+        else:
+            block = max(1, min(BLOCK_SAMPLES // active.size, int((loops - iterations_done[active]).max())))
+
+        response = sample_response(rng, (active.size, block)) / 1000.0
+        cycle = np.maximum(think + response, MIN_ITERATION_MS / 1000.0)
+        cycle_end = np.cumsum(cycle, axis=1) # relative end of each iteration
+        sample_start = clock[active, None] + (cycle_end - cycle) + (cycle - response)
+
+        valid = sample_start < end_time
+        if loops is not None:
+            valid &= (iterations_done[active, None] + np.arange(1, block + 1)) <= loops
+        counts = valid.sum(axis=1) # valid is a prefix of each row
+
+        if valid.any():
+            started = sample_start[valid]
+            first_sample = min(first_sample, float(started.min()))
+            last_sample = max(last_sample, float(started.max()))
+            seconds = np.floor(started).astype(np.int64)
+            binned = np.bincount(seconds)
+            if binned.size > per_second.size:
+                per_second = np.pad(per_second, (0, binned.size - per_second.size))
+            per_second[:binned.size] += binned
+
+        # threads whose whole block was valid keep going; the rest are done
+        row = np.arange(active.size)
+        finished = counts < block
+        last_index = np.maximum(counts - 1, 0)
+        done_at = np.where(counts > 0, clock[active] + cycle_end[row, last_index], clock[active])
+        clock[active] = np.where(finished, done_at, clock[active] + cycle_end[:, -1])
+        iterations_done[active] += counts
+        if loops is None:
+            # the thread stops at the cutoff while waiting in the timer, or when its last sample returns
+            finish[active[finished]] = np.maximum(done_at[finished], end_time)
+        else:
+            finish[active[finished]] = done_at[finished]
+        still_running = ~finished
+        if loops is not None:
+            reached = iterations_done[active] >= loops
+            finish[active[still_running & reached]] = clock[active[still_running & reached]]
+            still_running &= ~reached
+        active = active[still_running]
+
+    last_second = int(math.ceil(np.nanmax(finish)))
+    per_second = np.pad(per_second, (0, max(0, last_second + 1 - per_second.size)))[:last_second + 1]
+    # concurrency sampled at each second boundary: started and not yet finished
+    grid = np.arange(per_second.size, dtype=np.float64)
+    concurrency = (np.searchsorted(np.sort(starts), grid, side="right")
+                   - np.searchsorted(np.sort(finish), grid, side="right"))
+
+    total = int(per_second.sum())
+    return {
+        "bucket_start_sec": 0,
+        "rps_per_second": per_second,
+        "concurrency_per_second": concurrency,
+        "total_requests": total,
+        "duration_sec": last_sample - first_sample if total > 1 else 0.0,
+        "thread_start_sec": starts,
+        "thread_finish_sec": finish,
+    }
+
+
+def simulate_test_case(params, response_time_ms, seed=None):
+    """Runs simulate_thread_group with the THREADS/RAMP_UP/DURATION/THINK_TIME(/LOOPS) keys of a test case YAML."""
+    return simulate_thread_group(
+        threads=int(params.get("THREADS", 1)),
+        ramp_up=params.get("RAMP_UP", 0),
+        duration=params.get("DURATION", 60),
+        think_time_ms=params.get("THINK_TIME", 0),
+        response_time_ms=response_time_ms,
+        loops=params.get("LOOPS"),
+        seed=seed
+    )
+
+
+def write_simulation_csv(result, output_path):
+    """Writes the per-second simulated load as second,requests,concurrency rows."""
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    table = np.column_stack((
+        np.arange(result["rps_per_second"].size) + result["bucket_start_sec"],
+        result["rps_per_second"],
+        result["concurrency_per_second"],
+    ))
+    np.savetxt(output_path, table, fmt="%d", delimiter=",", header="second,requests,concurrency", comments="")
+
+
+def main():
+    import yaml
+
+    parser = argparse.ArgumentParser(description="Discrete-event simulation of a JMeter thread group test case")
+    parser.add_argument("testcase", help="test case YAML (e.g. testcases/stress.yaml)")
+    response = parser.add_mutually_exclusive_group()
+    response.add_argument("--response-time", type=float, default=10.0, help="fixed response time in ms (default: 10)")
+    response.add_argument("--response-from-jtl", metavar="JTL", help="resample response times observed in a previous JTL")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", default=os.path.join("results", "simulated_load.csv"))
+    args = parser.parse_args()
+
+    with open(args.testcase, "r") as f:
+        params = yaml.safe_load(f)
+    response_time_ms = response_times_from_jtl(args.response_from_jtl) if args.response_from_jtl else args.response_time
+
+    result = simulate_test_case(params, response_time_ms, seed=args.seed)
+    print(f"🧮 Simulated requests: {result['total_requests']}")
+    print(f"⏱️ Simulated duration: {result['duration_sec']:.2f} sec")
+    print(f"📊 Peak per-second throughput: {int(result['rps_per_second'].max())} req/s")
+    write_simulation_csv(result, args.output)
+    print(f"✅ Per-second load written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import os
+import re
+import xml.etree.ElementTree as ET
+from html import escape
+
+# --- Global Constants ---
+PLACEHOLDER_PATTERN = re.compile(r"\$\{([A-Za-z_][A-Za-z0-9_]*)\}")
+# test case keys read by the runners and models rather than the plan; template_params
+# rejects any other upper-case key the template doesn't use, so a typo can't go unnoticed
+RUNNER_KEYS = frozenset({
+    "NAME", "THREADS", "RAMP_UP", "DURATION", "THINK_TIME", "LOOPS",
+    "RESPONSE_TIME", "RESPONSE_TIME_FROM_JTL", "SERVER_CAPACITY", "GENERATOR_CAPACITY",
+    "ARRIVAL_PROFILE", "ARRIVALS", "CONCURRENCY_PERCENTILE",
+    "PROFILE", "LOAD_GENERATOR", "ENGINES", "REMOTE_HOSTS", "EXCLUSIVE", "ABORT_ERROR_PCT",
+    "TARGET_HOST", "TARGET_PORT", "TARGET_PROCESS", "TARGET_PIDS", "RESOURCE_INTERVAL",
+})
+
+_template_cache = {}
+
+
+class JmxTemplateError(ValueError):
+    """Raised when a template is not valid XML, a placeholder has no value or a test case key is unknown."""
+
+
+class JmxFragment(str):
+    """A parameter value inserted verbatim (e.g. generated XML elements) instead of being escaped as text."""
+
+
+def _format_value(value):
+    if isinstance(value, JmxFragment):
+        return value
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float) and value.is_integer():
+        value = int(value) # 100.0 threads from a sweep grid must render as 100
+    return escape(str(value), quote=False) # &, < and > only, like xml.sax.saxutils.escape
+
+
+class CompiledTemplate:
+    """
+    A JMX template parsed once into an element tree. Every ${NAME} found in an
+    element's text or attributes is a placeholder, except JMeter's own user
+    defined variables (Argument.name entries such as TARGET_HOST) and
+    functions like ${__P(...)}, which stay for JMeter to resolve unless a
+    parameter overrides them. The source is pre-split at the placeholders,
+    so rendering is a single join.
+    """
+
+    def __init__(self, path, source, mtime_ns=None):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        try:
+            root = ET.fromstring(source.encode("utf-8"))
+        except ET.ParseError as e:
+            raise JmxTemplateError(f"{path} is not valid XML: {e}") from None
+
+        found = set()
+        variables = set()
+        for element in root.iter():
+            for text in [element.text or ""] + list(element.attrib.values()):
+                found.update(PLACEHOLDER_PATTERN.findall(text))
+            if element.get("name") == "Argument.name" and element.text:
+                variables.add(element.text.strip())
+        found = {name for name in found if not name.startswith("__")}
+        self.variables = found & variables # optional: JMeter has a default for them
+        self.placeholders = found - variables # required
+        self.parameters = self.placeholders | self.variables
+        self._warned = set()
+
+        self.segments = []
+        self.slots = []
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(source):
+            if match.group(1) not in found:
+                continue # e.g. inside a comment, which isn't part of the tree
+            self.segments.append(source[position:match.start()])
+            self.slots.append(match.group(1))
+            position = match.end()
+        self.segments.append(source[position:])
+
+    def render(self, params, warn_unused=True):
+        """
+        Returns the plan with every placeholder replaced (keys are matched case-insensitively).
+        A placeholder without a value raises JmxTemplateError. Parameters the template
+        doesn't use are ignored, with a warning (once per set of keys) when warn_unused is set;
+        pass template_params(...) to leave out the keys meant for the runner.
+        """
+        values = {str(key).upper(): value for key, value in params.items()}
+        missing = self.placeholders - values.keys()
+        if missing:
+            raise JmxTemplateError(f"{self.path}: no value for placeholder(s) {', '.join(sorted(missing))}")
+        if warn_unused:
+            extra = frozenset(values.keys() - self.parameters)
+            if extra and extra not in self._warned:
+                self._warned.add(extra)
+                print(f"⚠️ {self.path}: parameter(s) {', '.join(sorted(extra))} match no placeholder "
+                      f"in the template and are ignored")
+
+        rendered = {name: _format_value(values[name]) for name in self.placeholders | (self.variables & values.keys())}
+        parts = [self.segments[0]]
+        for name, segment in zip(self.slots, self.segments[1:]):
+            parts.append(rendered.get(name, f"${{{name}}}"))
+            parts.append(segment)
+        return "".join(parts)
+
+
+def load_template(template_path):
+    """Compiled template for a path, reused until the file's mtime or size changes."""
+    stat = os.stat(template_path)
+    key = os.path.abspath(template_path)
+    cached = _template_cache.get(key)
+    if cached is not None and cached[0] == (stat.st_mtime_ns, stat.st_size):
+        return cached[1]
+    with open(template_path, "r", encoding="utf-8") as f:
+        template = CompiledTemplate(template_path, f.read(), stat.st_mtime_ns)
+    _template_cache[key] = ((stat.st_mtime_ns, stat.st_size), template)
+    return template
+
+
+def template_params(template_path, params):
+    """
+    The part of a test case's params the template uses (its placeholders and JMeter variables).
+    An upper-case key that is neither one of them nor in RUNNER_KEYS (e.g. THINK_TIM for
+    THINK_TIME) raises JmxTemplateError instead of being dropped.
+    """
+    parameters = load_template(template_path).parameters
+    unknown = {str(key) for key in params if str(key).isupper()} - parameters - RUNNER_KEYS
+    if unknown:
+        raise JmxTemplateError(f"{template_path}: unknown test case key(s) {', '.join(sorted(unknown))}; "
+                               f"not a placeholder of the template nor a runner key (misspelled?)")
+    return {key: value for key, value in params.items() if str(key).upper() in parameters}
+
+
+def render_jmx(template_path, output_path, params, warn_unused=True, transform=None):
+    """Renders one plan from a template and writes it to output_path, passing it through transform(text) if given."""
+    text = load_template(template_path).render(params, warn_unused)
+    if transform is not None:
+        text = transform(text)
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return output_path
+
+
+def render_plans(template_path, scenarios, output_dir, name_pattern="scenario_{index:04d}.jmx", warn_unused=True):
+    """
+    Renders one plan per scenario (dicts of placeholder values, e.g. the rows
+    of a sweep) into output_dir. All scenarios are validated before any file
+    is written. Returns the written paths.
+    """
+    template = load_template(template_path)
+    texts = [template.render(params, warn_unused) for params in scenarios]
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for index, text in enumerate(texts):
+        path = os.path.join(output_dir, name_pattern.format(index=index))
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        paths.append(path)
+    return paths
@@ -0,0 +1,521 @@
+import io
+import itertools
+import math
+import mmap
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError: # optional: falls back to pandas' chunked reader
+    pa = None
+    pa_csv = None
+
+# --- Global Constants ---
+JTL_COLUMNS = ["timeStamp", "elapsed", "success", "label"]
+DEFAULT_CHUNK_ROWS = 500_000
+LATENCY_RELATIVE_ACCURACY = 0.01 # 1% relative error on reported percentiles
+LATENCY_MAX_MS = 10_000_000 # ~2.8 hours, anything slower lands in the last bucket
+REPORTED_PERCENTILES = (50, 90, 99)
+PARALLEL_RANGE_BYTES = 64 * 1024 * 1024 # byte range handed to one worker at a time
+MAX_TIMESTAMP_SKEW_SEC = 7 * 24 * 3600 # a row this far from its chunk's median is corrupt, not late
+MAX_RUN_SPAN_SEC = 31 * 24 * 3600 # rows that would stretch the run's buckets beyond this span are skipped
+# epoch ms outside [2000-01-01, 2200-01-01) can't come from a JMeter run (e.g. timeStamp 0)
+MIN_VALID_TIMESTAMP_MS = 946_684_800_000
+MAX_VALID_TIMESTAMP_MS = 7_258_118_400_000
+
+
+class LatencySketch:
+    """
+    Mergeable, fixed-size latency histogram with logarithmic buckets.
+    Every value v > 0 falls in bucket ceil(log_gamma(v)), so any quantile is
+    reported within LATENCY_RELATIVE_ACCURACY of the true value, and two
+    sketches merge by adding their bucket counts.
+    """
+
+    def __init__(self, relative_accuracy=LATENCY_RELATIVE_ACCURACY, max_value_ms=LATENCY_MAX_MS):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        # bucket 0 holds zero latencies (common for sub-millisecond samples)
+        self.num_buckets = int(math.ceil(math.log(max_value_ms) / self.log_gamma)) + 2
+        self.counts = np.zeros(self.num_buckets, dtype=np.int64)
+
+    def update(self, values):
+        """Adds an array of latencies (ms) to the sketch."""
+        values = np.asarray(values, dtype=np.float64)
+        if values.size == 0:
+            return
+        index = np.zeros(values.shape, dtype=np.int64)
+        positive = values > 0
+        # values in (0, 1] map to bucket 1, larger values to ceil(log_gamma(v)) + 1
+        index[positive] = np.ceil(np.log(np.maximum(values[positive], 1.0)) / self.log_gamma).astype(np.int64) + 1
+        np.clip(index, 0, self.num_buckets - 1, out=index)
+        self.counts += np.bincount(index, minlength=self.num_buckets)
+
+    def merge(self, other):
+        """Adds the counts of another sketch built with the same accuracy."""
+        if other.num_buckets != self.num_buckets or other.gamma != self.gamma:
+            raise ValueError("Cannot merge latency sketches with different accuracy settings.")
+        self.counts += other.counts
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+    def bucket_values(self):
+        """Representative latency (ms) for each bucket."""
+        index = np.arange(self.num_buckets, dtype=np.float64)
+        values = 2 * self.gamma ** (index - 1) / (self.gamma + 1)
+        values[0] = 0.0
+        values[1] = 1.0
+        return values
+
+    def quantile(self, q):
+        """Returns the q-th quantile (0 <= q <= 1) in ms, or None if the sketch is empty."""
+        total = self.count
+        if total == 0:
+            return None
+        rank = q * (total - 1)
+        bucket = int(np.searchsorted(np.cumsum(self.counts), rank, side="right"))
+        return float(self.bucket_values()[min(bucket, self.num_buckets - 1)])
+
+    def mean(self):
+        """Approximate mean latency (ms), or None if the sketch is empty."""
+        total = self.count
+        if total == 0:
+            return None
+        return float((self.counts * self.bucket_values()).sum() / total)
+
+
+class JtlAggregate:
+    """
+    Partial result of a JTL scan: counts, true min/max timestamps, per-second
+    request and error buckets, per-label totals and a latency sketch.
+    Aggregates built from different parts of a file can be merged.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.min_ts = None
+        self.max_ts = None
+        self.bucket_origin = None # epoch second of per_second[0]
+        self.per_second = np.zeros(0, dtype=np.int64)
+        self.per_second_errors = np.zeros(0, dtype=np.int64)
+        self.labels = {}
+        self.latency = LatencySketch()
+
+    def _add_buckets(self, origin, counts, errors):
+        """Adds per-second arrays starting at epoch second `origin`, growing our range as needed."""
+        if counts.size == 0:
+            return
+        if self.bucket_origin is None:
+            self.bucket_origin = origin
+            self.per_second = counts.astype(np.int64)
+            self.per_second_errors = errors.astype(np.int64)
+            return
+        new_origin = min(self.bucket_origin, origin)
+        new_end = max(self.bucket_origin + self.per_second.size, origin + counts.size)
+        if new_end - new_origin > MAX_RUN_SPAN_SEC + 1: # update and accepts keep rows within the span
+            raise ValueError(f"JTL timestamps span {(new_end - new_origin) / 86400:.0f} days "
+                             f"(more than {MAX_RUN_SPAN_SEC // 86400}); the file looks corrupt.")
+        if new_origin != self.bucket_origin or new_end != self.bucket_origin + self.per_second.size:
+            grown = np.zeros(new_end - new_origin, dtype=np.int64)
+            grown_errors = np.zeros(new_end - new_origin, dtype=np.int64)
+            offset = self.bucket_origin - new_origin
+            grown[offset:offset + self.per_second.size] = self.per_second
+            grown_errors[offset:offset + self.per_second.size] = self.per_second_errors
+            self.bucket_origin, self.per_second, self.per_second_errors = new_origin, grown, grown_errors
+        offset = origin - self.bucket_origin
+        self.per_second[offset:offset + counts.size] += counts
+        self.per_second_errors[offset:offset + counts.size] += errors
+
+    def _fits(self, min_ts, max_ts):
+        """True when samples from min_ts to max_ts keep the run within MAX_RUN_SPAN_SEC."""
+        if self.min_ts is None:
+            return max_ts - min_ts < MAX_RUN_SPAN_SEC * 1000
+        return max(self.max_ts, max_ts) - min(self.min_ts, min_ts) < MAX_RUN_SPAN_SEC * 1000
+
+    def _sane_rows(self, timestamps, chunk_min, chunk_max):
+        """
+        Mask of the rows worth counting, or None when all are: timestamps a
+        JMeter run can produce, within MAX_TIMESTAMP_SKEW_SEC of the chunk's
+        median, and not stretching the run counted so far beyond MAX_RUN_SPAN_SEC.
+        Each check only runs when the chunk's min/max say it can fail.
+        """
+        sane = None
+        if chunk_min < MIN_VALID_TIMESTAMP_MS or chunk_max >= MAX_VALID_TIMESTAMP_MS:
+            sane = (timestamps >= MIN_VALID_TIMESTAMP_MS) & (timestamps < MAX_VALID_TIMESTAMP_MS)
+        if chunk_max - chunk_min > MAX_TIMESTAMP_SKEW_SEC * 1000:
+            valid = timestamps if sane is None else timestamps[sane]
+            if valid.size:
+                near = np.abs(timestamps - np.median(valid)) <= MAX_TIMESTAMP_SKEW_SEC * 1000
+                sane = near if sane is None else sane & near
+        if not self._fits(chunk_min, chunk_max) and self.min_ts is not None:
+            # anchored to the run counted so far, so a chunk made entirely of bad timestamps is skipped too
+            inside = ((timestamps > self.max_ts - MAX_RUN_SPAN_SEC * 1000)
+                      & (timestamps < self.min_ts + MAX_RUN_SPAN_SEC * 1000))
+            sane = inside if sane is None else sane & inside
+        return sane
+
+    def update(self, timestamps, elapsed, success, labels=None):
+        """
+        Adds one chunk of parsed samples.
+        :param timestamps: int64 array of sample start times (epoch ms).
+        :param elapsed: array of sample latencies (ms).
+        :param success: bool array, True for successful samples.
+        :param labels: optional (codes, categories) pair of dictionary-encoded sampler labels.
+        Rows with corrupt timestamps (see _sane_rows) are skipped with a warning.
+        :return: the (timestamps, elapsed, success, labels) rows actually counted.
+        """
+        if timestamps.size == 0:
+            return timestamps, elapsed, success, labels
+        chunk_min, chunk_max = int(timestamps.min()), int(timestamps.max())
+        sane = self._sane_rows(timestamps, chunk_min, chunk_max)
+        if sane is not None and not sane.all():
+            print(f"⚠️ Skipping {int((~sane).sum())} rows with timestamps far outside the run.")
+            timestamps, elapsed, success = timestamps[sane], elapsed[sane], success[sane]
+            if labels is not None:
+                labels = (labels[0][sane], labels[1])
+            if timestamps.size == 0:
+                return timestamps, elapsed, success, labels
+            chunk_min, chunk_max = int(timestamps.min()), int(timestamps.max())
+        if not self._fits(chunk_min, chunk_max):
+            # a first chunk spread over more than a month: nothing to anchor to, skip it whole
+            print(f"⚠️ Skipping {int(timestamps.size)} rows with timestamps far outside the run.")
+            return timestamps[:0], elapsed[:0], success[:0], (labels[0][:0], labels[1]) if labels is not None else None
+
+        n = int(timestamps.size)
+        failed = ~success
+        self.count += n
+        self.errors += int(failed.sum())
+
+        self.min_ts = chunk_min if self.min_ts is None else min(self.min_ts, chunk_min)
+        self.max_ts = chunk_max if self.max_ts is None else max(self.max_ts, chunk_max)
+
+        seconds = timestamps // 1000
+        origin = chunk_min // 1000
+        offsets = seconds - origin
+        self._add_buckets(
+            origin,
+            np.bincount(offsets),
+            np.bincount(offsets, weights=failed, minlength=int(offsets.max()) + 1).astype(np.int64)
+        )
+        self.latency.update(elapsed)
+
+        if labels is not None:
+            codes, categories = labels
+            valid = codes >= 0
+            label_counts = np.bincount(codes[valid], minlength=len(categories))
+            label_errors = np.bincount(codes[valid], weights=failed[valid], minlength=len(categories))
+            for name, requests, errors in zip(categories, label_counts, label_errors):
+                if requests == 0:
+                    continue
+                entry = self.labels.setdefault(str(name), {"requests": 0, "errors": 0})
+                entry["requests"] += int(requests)
+                entry["errors"] += int(errors)
+        return timestamps, elapsed, success, labels
+
+    def accepts(self, other):
+        """True when other can be merged without stretching the run beyond MAX_RUN_SPAN_SEC."""
+        return other.count == 0 or self._fits(other.min_ts, other.max_ts)
+
+    def merge(self, other):
+        """Folds another partial aggregate into this one (see accepts)."""
+        if other.count == 0:
+            return self
+        self.count += other.count
+        self.errors += other.errors
+        self.min_ts = other.min_ts if self.min_ts is None else min(self.min_ts, other.min_ts)
+        self.max_ts = other.max_ts if self.max_ts is None else max(self.max_ts, other.max_ts)
+        self._add_buckets(other.bucket_origin, other.per_second, other.per_second_errors)
+        self.latency.merge(other.latency)
+        for name, entry in other.labels.items():
+            mine = self.labels.setdefault(name, {"requests": 0, "errors": 0})
+            mine["requests"] += entry["requests"]
+            mine["errors"] += entry["errors"]
+        return self
+
+    def result(self):
+        """Builds the analysis dict returned by analyze_jtl."""
+        if self.count == 0:
+            return {
+                "actual_requests": 0,
+                "duration_sec": 0.0,
+                "actual_rps": 0.0
+            }
+
+        duration_ms = self.max_ts - self.min_ts
+        duration_sec = duration_ms / 1000.0 if duration_ms > 0 else 0.001
+
+        result = {
+            "actual_requests": self.count,
+            "duration_sec": duration_sec,
+            "actual_rps": self.count / duration_sec,
+            "first_timestamp_ms": self.min_ts,
+            "last_timestamp_ms": self.max_ts,
+            "error_count": self.errors,
+            "error_rate_pct": self.errors / self.count * 100,
+        }
+        for p in REPORTED_PERCENTILES:
+            result[f"p{p}_latency_ms"] = self.latency.quantile(p / 100.0)
+        result["avg_latency_ms"] = self.latency.mean()
+        result["bucket_start_sec"] = self.bucket_origin
+        result["rps_per_second"] = self.per_second
+        result["errors_per_second"] = self.per_second_errors
+        result["labels"] = self.labels
+        return result
+
+
+def _read_header(jtl_path):
+    """Returns the list of column names from the JTL's first line."""
+    with open(jtl_path, "r", newline='', encoding='utf-8') as f:
+        return f.readline().rstrip("\r\n").split(",")
+
+
+def _parse_pandas_chunk(chunk):
+    """Turns one pandas chunk into (timestamps, elapsed, success, labels) arrays, dropping malformed rows."""
+    ts = chunk["timeStamp"]
+    elapsed = chunk["elapsed"] if "elapsed" in chunk else None
+    if ts.dtype.kind not in "iu":
+        ts = pd.to_numeric(ts, errors="coerce")
+    valid = ts.notna().to_numpy()
+    if elapsed is not None and elapsed.dtype.kind not in "iu":
+        elapsed = pd.to_numeric(elapsed, errors="coerce")
+        valid &= elapsed.notna().to_numpy()
+    if not valid.all():
+        print(f"⚠️ Skipping {int((~valid).sum())} rows with invalid timestamp/elapsed values.")
+        chunk = chunk[valid]
+        ts = ts[valid]
+        elapsed = elapsed[valid] if elapsed is not None else None
+
+    timestamps = ts.to_numpy(dtype=np.int64)
+    elapsed = elapsed.to_numpy(dtype=np.float64) if elapsed is not None else np.zeros(timestamps.size)
+    if "success" in chunk:
+        success = chunk["success"]
+        if success.dtype != bool:
+            # mixed/garbled values: anything other than "true" counts as a failure
+            success = success.astype(str).str.lower() == "true"
+        success = success.to_numpy(dtype=bool)
+    else:
+        success = np.ones(timestamps.size, dtype=bool)
+    labels = None
+    if "label" in chunk:
+        categorical = chunk["label"].astype("category").array
+        labels = (np.asarray(categorical.codes), list(categorical.categories))
+    return timestamps, elapsed, success, labels
+
+
+def _iter_pandas_chunks(source, usecols, chunk_rows, column_names=None):
+    reader = pd.read_csv(
+        source,
+        header=None if column_names else "infer",
+        names=column_names,
+        usecols=usecols,
+        dtype={"label": "category"},
+        chunksize=chunk_rows,
+        engine="c",
+        on_bad_lines="skip",
+        encoding="utf-8",
+    )
+    with reader:
+        for chunk in reader:
+            yield _parse_pandas_chunk(chunk)
+
+
+def _iter_arrow_chunks(source, usecols, chunk_rows, column_names=None, use_threads=True):
+    # pyarrow parses whole blocks of bytes on all cores; ~150 bytes per JTL row on average
+    reader = pa_csv.open_csv(
+        source,
+        read_options=pa_csv.ReadOptions(
+            block_size=max(chunk_rows * 150, 1 << 20),
+            column_names=column_names,
+            use_threads=use_threads,
+        ),
+        parse_options=pa_csv.ParseOptions(invalid_row_handler=lambda row: "skip"),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=usecols,
+            column_types={
+                "timeStamp": pa.int64(),
+                "elapsed": pa.int64(),
+                "success": pa.bool_(),
+                "label": pa.dictionary(pa.int32(), pa.string()),
+            },
+        ),
+    )
+    for batch in reader:
+        timestamps = batch.column("timeStamp").to_numpy(zero_copy_only=False)
+        if "elapsed" in usecols:
+            elapsed = batch.column("elapsed").to_numpy(zero_copy_only=False).astype(np.float64)
+        else:
+            elapsed = np.zeros(timestamps.size)
+        if "success" in usecols:
+            success = batch.column("success").to_numpy(zero_copy_only=False).astype(bool)
+        else:
+            success = np.ones(timestamps.size, dtype=bool)
+        labels = None
+        if "label" in usecols:
+            column = batch.column("label")
+            labels = (column.indices.to_numpy(zero_copy_only=False), column.dictionary.to_pylist())
+        yield timestamps, elapsed, success, labels
+
+
+def _analyzed_columns(header):
+    if "timeStamp" not in header:
+        raise ValueError("'timeStamp' column not found in JTL header.")
+    return [c for c in JTL_COLUMNS if c in header]
+
+
+def iter_jtl_chunks(jtl_path, chunk_rows=DEFAULT_CHUNK_ROWS, use_arrow=None):
+    """
+    Streams a CSV JTL in chunks of about `chunk_rows` rows, yielding
+    (timestamps, elapsed, success, labels) arrays for the analyzed columns only.
+    labels is a (codes, categories) pair. Uses the multi-threaded pyarrow CSV
+    reader when it is installed, pandas' chunked C parser otherwise.
+    """
+    usecols = _analyzed_columns(_read_header(jtl_path))
+    if use_arrow is None:
+        use_arrow = pa_csv is not None
+    if use_arrow:
+        return _iter_arrow_chunks(jtl_path, usecols, chunk_rows)
+    return _iter_pandas_chunks(jtl_path, usecols, chunk_rows)
+
+
+def _aggregate_chunks(make_chunks, sink=None):
+    """
+    Folds the chunks from make_chunks(use_arrow) into a JtlAggregate, also
+    handing the rows it counted (corrupt ones left out) to sink.append when a sink is given.
+    pyarrow refuses columns with unparsable values; in that case the source
+    is re-read with the pandas path, which coerces and skips bad rows.
+    """
+    aggregate = JtlAggregate()
+    try:
+        for chunk in make_chunks(None):
+            counted = aggregate.update(*chunk)
+            if sink is not None:
+                sink.append(counted)
+    except Exception as e:
+        if pa is None or not isinstance(e, pa.ArrowInvalid):
+            raise
+        print(f"⚠️ Fast JTL reader rejected the data ({e}). Retrying with the pandas reader...")
+        aggregate = JtlAggregate()
+        if sink is not None:
+            sink.reset()
+        for chunk in make_chunks(False):
+            counted = aggregate.update(*chunk)
+            if sink is not None:
+                sink.append(counted)
+    return aggregate
+
+
+class _ChunkList(list):
+    """In-memory chunk sink used by parallel workers to ship parsed columns back."""
+
+    def reset(self):
+        self.clear()
+
+
+def split_byte_ranges(jtl_path, parts):
+    """
+    Splits the data rows of a JTL (everything after the header line) into
+    `parts` newline-aligned (start, end) byte ranges. Assumes no field contains
+    an embedded newline, which holds for JMeter's CSV output.
+    """
+    size = os.path.getsize(jtl_path)
+    with open(jtl_path, "rb") as f:
+        f.readline()
+        data_start = f.tell()
+        if size <= data_start:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            boundaries = [data_start]
+            step = (size - data_start) / parts
+            for i in range(1, parts):
+                cut = mm.find(b"\n", max(int(data_start + i * step), boundaries[-1]))
+                if cut == -1:
+                    break
+                if cut + 1 > boundaries[-1]:
+                    boundaries.append(cut + 1)
+            boundaries.append(size)
+    return [(a, b) for a, b in zip(boundaries, boundaries[1:]) if b > a]
+
+
+def _aggregate_byte_range(jtl_path, start, end, header, chunk_rows, keep_chunks=False):
+    """
+    Worker: parses the rows in [start, end) of the JTL into a partial JtlAggregate.
+    Returns (aggregate, parsed chunks) when keep_chunks is set, (aggregate, None) otherwise.
+    """
+    usecols = _analyzed_columns(header)
+    with open(jtl_path, "rb") as f:
+        # the mapping and the views over it are released when the worker call returns
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)[start:end]
+
+    def make_chunks(use_arrow):
+        if use_arrow is None and pa_csv is not None:
+            # zero-copy view of the mapped range; each worker parses on its own core
+            return _iter_arrow_chunks(pa.BufferReader(pa.py_buffer(view)), usecols, chunk_rows,
+                                      column_names=header, use_threads=False)
+        return _iter_pandas_chunks(io.BytesIO(view), usecols, chunk_rows, column_names=header)
+
+    chunks = _ChunkList() if keep_chunks else None
+    return _aggregate_chunks(make_chunks, chunks), chunks
+
+
+def aggregate_jtl(jtl_path, chunk_rows=DEFAULT_CHUNK_ROWS, workers=1, sink=None):
+    """
+    Scans a whole JTL in bounded memory and returns its JtlAggregate.
+    With workers > 1 the file is split into newline-aligned byte ranges that are
+    parsed by a process pool straight from an mmap, and the partial aggregates
+    are merged; the result is identical to the serial scan.
+    If given, sink.append receives every parsed (timestamps, elapsed, success,
+    labels) chunk in no particular order, and sink.reset is called if parsing restarts.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        return _aggregate_chunks(lambda use_arrow: iter_jtl_chunks(jtl_path, chunk_rows, use_arrow), sink)
+
+    header = _read_header(jtl_path)
+    _analyzed_columns(header)
+    # more ranges than workers keeps each worker's memory bounded and balances the load
+    size = os.path.getsize(jtl_path)
+    parts = max(workers, math.ceil(size / PARALLEL_RANGE_BYTES))
+    ranges = split_byte_ranges(jtl_path, parts)
+
+    aggregate = JtlAggregate()
+    pending = iter(ranges)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # at most `workers` ranges in flight, and each result is dropped once merged and sunk,
+        # so the parent holds a few ranges' columns at a time rather than the whole file
+        running = set()
+        for start, end in itertools.islice(pending, workers):
+            running.add(pool.submit(_aggregate_byte_range, jtl_path, start, end, header, chunk_rows, sink is not None))
+        while running:
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                partial, chunks = future.result()
+                if aggregate.accepts(partial):
+                    aggregate.merge(partial)
+                    for chunk in chunks or ():
+                        sink.append(chunk)
+                else:
+                    print(f"⚠️ Skipping {partial.count} rows with timestamps far outside the run.")
+                del partial, chunks
+                for start, end in itertools.islice(pending, 1):
+                    running.add(pool.submit(_aggregate_byte_range, jtl_path, start, end, header, chunk_rows,
+                                            sink is not None))
+            del done
+    return aggregate
+
+
+def analyze_jtl_stream(jtl_path, chunk_rows=DEFAULT_CHUNK_ROWS, workers=1):
+    """Streaming analysis of a JTL file; see JtlAggregate.result for the returned keys."""
+    if not os.path.exists(jtl_path):
+        raise FileNotFoundError(jtl_path)
+    return aggregate_jtl(jtl_path, chunk_rows, workers).result()
@@ -0,0 +1,216 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+from jtl_analysis import DEFAULT_CHUNK_ROWS, JtlAggregate, aggregate_jtl
+
+# --- Global Constants ---
+CACHE_SUFFIX = ".cache"
+CACHE_VERSION = 1
+CACHE_META_FILE = "meta.json"
+# column name -> on-disk dtype; each column is a raw little-endian array file
+CACHE_COLUMNS = {
+    "timeStamp": np.dtype("<i8"),
+    "elapsed": np.dtype("<i4"),
+    "success": np.dtype("u1"),
+    "label": np.dtype("<i4"), # index into meta["labels"], -1 for a missing label
+}
+HASH_SAMPLE_BYTES = 64 * 1024
+HASH_SAMPLE_COUNT = 16
+
+
+def cache_dir_for(jtl_path):
+    """Sidecar cache directory for a JTL, e.g. results/result.jtl.cache/."""
+    return jtl_path + CACHE_SUFFIX
+
+
+def jtl_fingerprint(jtl_path):
+    """
+    Identifies the current content of a JTL by size, mtime and a sampled hash.
+    The hash covers the head, the tail and evenly spaced blocks of the file,
+    so checking it costs a few reads instead of a full scan.
+    """
+    stat = os.stat(jtl_path)
+    digest = hashlib.blake2b(digest_size=16)
+    with open(jtl_path, "rb") as f:
+        span = max(stat.st_size - HASH_SAMPLE_BYTES, 0)
+        for i in range(HASH_SAMPLE_COUNT + 1):
+            f.seek(span * i // HASH_SAMPLE_COUNT)
+            digest.update(f.read(HASH_SAMPLE_BYTES))
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sampled_hash": digest.hexdigest(),
+    }
+
+
+class ColumnarCacheWriter:
+    """
+    Chunk sink for aggregate_jtl that appends parsed columns to raw array
+    files in a temporary directory, dictionary-encoding labels globally.
+    commit() atomically moves the finished cache into place.
+    """
+
+    def __init__(self, jtl_path):
+        self.jtl_path = jtl_path
+        self.final_dir = cache_dir_for(jtl_path)
+        self.tmp_dir = self.final_dir + ".tmp"
+        self.labels = {}
+        self.rows = 0
+        self._files = {}
+        self.reset()
+
+    def _close_files(self):
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+
+    def reset(self):
+        """Discards anything written so far."""
+        self._close_files()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        os.makedirs(self.tmp_dir)
+        self.labels = {}
+        self.rows = 0
+        self._files = {name: open(os.path.join(self.tmp_dir, name + ".bin"), "wb") for name in CACHE_COLUMNS}
+
+    def append(self, chunk):
+        timestamps, elapsed, success, labels = chunk
+        if labels is not None:
+            codes, categories = labels
+            # map this chunk's local label codes onto the global dictionary
+            mapping = np.array([self.labels.setdefault(str(name), len(self.labels)) for name in categories] + [-1],
+                               dtype=np.int32)
+            label_codes = mapping[np.where(codes >= 0, codes, len(categories))]
+        else:
+            label_codes = np.full(timestamps.size, -1, dtype=np.int32)
+        columns = {
+            "timeStamp": timestamps,
+            "elapsed": elapsed,
+            "success": success,
+            "label": label_codes,
+        }
+        for name, dtype in CACHE_COLUMNS.items():
+            self._files[name].write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+        self.rows += int(timestamps.size)
+
+    def commit(self, fingerprint):
+        """Writes the metadata and swaps the new cache in for any old one."""
+        self._close_files()
+        meta = {
+            "version": CACHE_VERSION,
+            "source": fingerprint,
+            "rows": self.rows,
+            "columns": {name: dtype.str for name, dtype in CACHE_COLUMNS.items()},
+            "labels": sorted(self.labels, key=self.labels.get),
+        }
+        with open(os.path.join(self.tmp_dir, CACHE_META_FILE), "w") as f:
+            json.dump(meta, f)
+        shutil.rmtree(self.final_dir, ignore_errors=True)
+        os.replace(self.tmp_dir, self.final_dir)
+
+    def abort(self):
+        self._close_files()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+
+def _read_meta(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, CACHE_META_FILE), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_cache_valid(jtl_path):
+    """True when the sidecar cache exists and was built from the JTL's current content."""
+    meta = _read_meta(cache_dir_for(jtl_path))
+    if meta is None or meta.get("version") != CACHE_VERSION:
+        return False
+    source = meta["source"]
+    stat = os.stat(jtl_path)
+    if source["size"] != stat.st_size or source["mtime_ns"] != stat.st_mtime_ns:
+        return False
+    return source == jtl_fingerprint(jtl_path)
+
+
+def build_cache(jtl_path, chunk_rows=DEFAULT_CHUNK_ROWS, workers=1):
+    """
+    Parses the JTL once, writing the columnar cache while aggregating.
+    Returns the JtlAggregate of the scan.
+    """
+    fingerprint = jtl_fingerprint(jtl_path)
+    writer = ColumnarCacheWriter(jtl_path)
+    try:
+        aggregate = aggregate_jtl(jtl_path, chunk_rows, workers, sink=writer)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.commit(fingerprint)
+    return aggregate
+
+
+def load_cache(jtl_path):
+    """
+    Memory-maps the cached columns of a JTL without reading them.
+    Returns (columns, labels) where columns maps column name to a read-only
+    np.memmap and labels is the label dictionary, or None if there is no valid cache.
+    """
+    if not is_cache_valid(jtl_path):
+        return None
+    cache_dir = cache_dir_for(jtl_path)
+    meta = _read_meta(cache_dir)
+    columns = {}
+    for name, dtype in meta["columns"].items():
+        path = os.path.join(cache_dir, name + ".bin")
+        if meta["rows"] == 0:
+            columns[name] = np.zeros(0, dtype=dtype)
+        else:
+            columns[name] = np.memmap(path, dtype=np.dtype(dtype), mode="r", shape=(meta["rows"],))
+    return columns, meta["labels"]
+
+
+def load_jtl_columns(jtl_path, chunk_rows=DEFAULT_CHUNK_ROWS, workers=1):
+    """Returns the cached (columns, labels) of a JTL, building the cache first if it is missing or stale."""
+    cached = load_cache(jtl_path)
+    if cached is None:
+        build_cache(jtl_path, chunk_rows, workers)
+        cached = load_cache(jtl_path)
+    return cached
+
+
+def aggregate_columns(columns, labels, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Builds a JtlAggregate from cached columns, slice by slice to keep memory bounded."""
+    aggregate = JtlAggregate()
+    rows = columns["timeStamp"].shape[0]
+    for start in range(0, rows, chunk_rows):
+        stop = min(start + chunk_rows, rows)
+        aggregate.update(
+            np.asarray(columns["timeStamp"][start:stop]),
+            np.asarray(columns["elapsed"][start:stop]),
+            np.asarray(columns["success"][start:stop]).view(bool),
+            (np.asarray(columns["label"][start:stop]), labels),
+        )
+    return aggregate
+
+
+def analyze_jtl_cached(jtl_path, chunk_rows=DEFAULT_CHUNK_ROWS, workers=1, use_cache=True):
+    """
+    Same result as analyze_jtl_stream, answered from the sidecar cache when it
+    is valid. Otherwise the JTL is parsed and the cache is written on the way.
+    """
+    if not os.path.exists(jtl_path):
+        raise FileNotFoundError(jtl_path)
+    if use_cache:
+        cached = load_cache(jtl_path)
+        if cached is not None:
+            print(f"⚡ Using columnar cache {cache_dir_for(jtl_path)}")
+            return aggregate_columns(*cached, chunk_rows=chunk_rows).result()
+        try:
+            return build_cache(jtl_path, chunk_rows, workers).result()
+        except OSError as e:
+            print(f"⚠️ Could not write JTL cache ({e}). Analyzing without it.")
+    return aggregate_jtl(jtl_path, chunk_rows, workers).result()
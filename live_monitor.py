@@ -0,0 +1,168 @@
+import csv
+import os
+import re
+import threading
+
+import numpy as np
+
+# --- Global Constants ---
+# e.g. "summary +  29531 in 00:00:08 = 3740.0/s Avg:     8 Min:     0 Max:   119 Err: 23141 (78.36%) Active: 854 Started: 854 Finished: 0"
+SUMMARISER_PATTERN = re.compile(
+    r"summary \+\s*(?P<samples>\d+) in (?P<hours>\d+):(?P<minutes>\d\d):(?P<seconds>\d\d)"
+    r" =\s*(?P<rps>[\d.]+)/s Avg:\s*(?P<avg>\d+) Min:\s*(?P<min>\d+) Max:\s*(?P<max>\d+)"
+    r" Err:\s*(?P<errors>\d+) \((?P<error_pct>[\d.]+)%\)"
+    r"(?: Active: (?P<active>\d+) Started: (?P<started>\d+) Finished: (?P<finished>\d+))?"
+)
+LIVE_CSV_COLUMNS = [
+    "elapsed_sec", "interval_sec", "samples", "rps", "theoretical_rps", "efficiency_pct",
+    "avg_ms", "max_ms", "error_pct", "active_threads", "started_threads", "finished_threads",
+]
+MIN_ABORT_SAMPLES = 100 # don't abort on an error rate computed from a handful of samples
+
+
+class RunAborted(Exception):
+    """Raised when a live run is stopped early because it crossed an abort threshold."""
+
+
+def parse_summariser_line(line):
+    """
+    Parses one incremental "summary +" line of JMeter's Summariser.
+    Returns a dict of its numbers, or None for any other line (including the
+    cumulative "summary =" lines).
+    """
+    match = SUMMARISER_PATTERN.search(line)
+    if not match:
+        return None
+    values = match.groupdict()
+    interval = int(values["hours"]) * 3600 + int(values["minutes"]) * 60 + int(values["seconds"])
+    return {
+        "samples": int(values["samples"]),
+        "interval_sec": interval,
+        "rps": float(values["rps"]),
+        "avg_ms": int(values["avg"]),
+        "min_ms": int(values["min"]),
+        "max_ms": int(values["max"]),
+        "errors": int(values["errors"]),
+        "error_pct": float(values["error_pct"]),
+        "active_threads": int(values["active"]) if values["active"] is not None else None,
+        "started_threads": int(values["started"]) if values["started"] is not None else None,
+        "finished_threads": int(values["finished"]) if values["finished"] is not None else None,
+    }
+
+
+class LiveRunMonitor:
+    """
+    Consumes JMeter output line by line while a run is in progress.
+    Every Summariser interval becomes a point of a live time series (RPS,
+    error %, active threads) that is compared with the theoretical curve,
+    appended to a CSV for dashboards and printed. check_abort() reports when
+    the error rate crosses max_error_pct.
+    """
+
+    def __init__(self, theory_time=None, theory_rps=None, max_error_pct=None, csv_path=None, name=None):
+        """
+        :param theory_time: Seconds since test start of the theoretical curve points.
+        :param theory_rps: Theoretical RPS at those points.
+        :param max_error_pct: Abort when an interval's error % exceeds this (None = never abort).
+        :param csv_path: Live time series CSV, rewritten from scratch for each run.
+        :param name: Prefix for printed points, e.g. the engine name in a distributed run.
+        """
+        self.name = name
+        self.theory_time = np.asarray(theory_time, dtype=np.float64) if theory_time is not None else None
+        self.theory_rps = np.asarray(theory_rps, dtype=np.float64) if theory_rps is not None else None
+        self.max_error_pct = max_error_pct
+        self.csv_path = csv_path
+        self.series = []
+        self.elapsed_sec = 0.0
+        self.abort_reason = None
+        if csv_path:
+            csv_dir = os.path.dirname(csv_path)
+            if csv_dir:
+                os.makedirs(csv_dir, exist_ok=True)
+            with open(csv_path, "w", newline='') as f:
+                csv.writer(f).writerow(LIVE_CSV_COLUMNS)
+
+    def theoretical_rps(self, start, end):
+        """Mean theoretical RPS over [start, end] seconds since test start."""
+        if self.theory_time is None or end <= start:
+            return None
+        grid = np.linspace(start, end, 32)
+        return float(np.interp(grid, self.theory_time, self.theory_rps, right=0.0).mean())
+
+    def on_line(self, line):
+        """Feeds one output line; returns the new time series point if it was a Summariser line."""
+        point = parse_summariser_line(line)
+        if point is None:
+            return None
+        start = self.elapsed_sec
+        self.elapsed_sec += point["interval_sec"]
+        point["elapsed_sec"] = self.elapsed_sec
+        theory = self.theoretical_rps(start, self.elapsed_sec)
+        point["theoretical_rps"] = theory
+        point["efficiency_pct"] = point["rps"] / theory * 100 if theory else None
+        self.series.append(point)
+
+        if self.csv_path:
+            with open(self.csv_path, "a", newline='') as f:
+                csv.writer(f).writerow([point.get(c) for c in LIVE_CSV_COLUMNS])
+
+        prefix = f"[{self.name}] " if self.name else ""
+        message = (f"📡 {prefix}t={self.elapsed_sec:>5.0f}s  {point['rps']:>9.1f} req/s"
+                   f"  err {point['error_pct']:5.2f}%  active {point['active_threads']}")
+        if theory:
+            message += f"  theory {theory:.1f} req/s ({point['efficiency_pct']:.1f}%)"
+        print(message)
+
+        if (self.max_error_pct is not None and point["samples"] >= MIN_ABORT_SAMPLES
+                and point["error_pct"] > self.max_error_pct):
+            self.abort_reason = (f"error rate {point['error_pct']:.2f}% exceeded {self.max_error_pct:.2f}% "
+                                 f"at t={self.elapsed_sec:.0f}s")
+        return point
+
+    def check_abort(self):
+        """Returns the reason the run should stop now, or None."""
+        return self.abort_reason
+
+
+def tail_file(path, on_line, stop_event, poll_interval=0.5):
+    """
+    Follows a growing text file (like `tail -F`), calling on_line for every
+    complete new line until stop_event is set. Lines already in the file when
+    tailing starts are skipped; a file that appears later, or is truncated and
+    rewritten (JMeter recreates its log on start), is read from the beginning.
+    """
+    handle = None
+    pending = ""
+    skip_existing = os.path.exists(path)
+    try:
+        while not stop_event.is_set():
+            if handle is None:
+                try:
+                    handle = open(path, "r", encoding="utf-8", errors="replace")
+                except OSError:
+                    stop_event.wait(poll_interval)
+                    continue
+                if skip_existing:
+                    handle.seek(0, os.SEEK_END)
+            if os.fstat(handle.fileno()).st_size < handle.tell():
+                handle.seek(0)
+                pending = ""
+            chunk = handle.read()
+            if not chunk:
+                stop_event.wait(poll_interval)
+                continue
+            pending += chunk
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                on_line(line.rstrip("\r"))
+    finally:
+        if handle is not None:
+            handle.close()
+
+
+def start_log_tail(path, on_line, poll_interval=0.5):
+    """Starts tail_file in a daemon thread; returns the stop event to end it."""
+    stop_event = threading.Event()
+    thread = threading.Thread(target=tail_file, args=(path, on_line, stop_event, poll_interval), daemon=True)
+    thread.start()
+    return stop_event
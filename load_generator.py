@@ -0,0 +1,557 @@
+import argparse
+import asyncio
+import math
+import multiprocessing
+import os
+import queue
+import re
+import ssl
+import time
+import xml.etree.ElementTree as ET
+
+try:
+    import uvloop # optional: faster event loop when installed
+except ImportError:
+    uvloop = None
+
+from jtl_merge import merge_jtl_files
+from live_monitor import RunAborted
+
+# --- Global Constants ---
+# JMeter's default CSV save configuration, so analyze_jtl, jtl_merge and the plots read the output unchanged
+JTL_COLUMNS = [
+    "timeStamp", "elapsed", "label", "responseCode", "responseMessage", "threadName", "dataType", "success",
+    "failureMessage", "bytes", "sentBytes", "grpThreads", "allThreads", "URL", "Latency", "IdleTime", "Connect",
+]
+THREADS_PER_WORKER = 2000 # virtual users one event loop process handles before another worker is added
+STATS_INTERVAL_SEC = 1.0 # how often workers report counters to the parent
+DEFAULT_SUMMARISER_INTERVAL = 30 # JMeter's default summariser.interval
+START_DELAY_SEC = 1.0 # workers are started first, then all begin at the same wall clock time
+ROW_BUFFER = 4096 # JTL rows buffered per worker between writes
+DEFAULT_CONNECT_TIMEOUT_SEC = 10.0
+DEFAULT_RESPONSE_TIMEOUT_SEC = 60.0
+STOP_GRACE_SEC = 10 # how long workers get to finish in-flight samples after a stop
+VARIABLE_PATTERN = re.compile(r"\$\{([A-Za-z_][A-Za-z0-9_]*)\}")
+
+
+class LoadGeneratorError(Exception):
+    """Raised when the plan can't be run by the Python engine or its workers fail."""
+
+# --- Plan ---
+
+def plan_request(jmx_path):
+    """
+    Reads what the Python engine sends from a rendered JMeter plan: the first
+    enabled HTTP sampler (label, method, protocol, host, port, path, timeouts),
+    with ${VAR} references resolved from the plan's user defined variables,
+    and the thread group name used for JMeter-style thread names.
+    """
+    try:
+        root = ET.parse(jmx_path).getroot()
+    except (OSError, ET.ParseError) as e:
+        raise LoadGeneratorError(f"Cannot read plan {jmx_path}: {e}") from None
+
+    variables = {}
+    for argument in root.iter("elementProp"):
+        if argument.get("elementType") != "Argument":
+            continue
+        props = {p.get("name"): (p.text or "") for p in argument.findall("stringProp")}
+        if "Argument.name" in props:
+            variables[props["Argument.name"]] = props.get("Argument.value", "")
+
+    def resolve(text):
+        return VARIABLE_PATTERN.sub(lambda m: variables.get(m.group(1), m.group(0)), text or "").strip()
+
+    sampler = next((s for s in root.iter("HTTPSamplerProxy") if s.get("enabled", "true") == "true"), None)
+    if sampler is None:
+        raise LoadGeneratorError(f"{jmx_path} has no enabled HTTP sampler to run.")
+    props = {p.get("name"): resolve(p.text) for p in sampler if p.get("name")}
+    protocol = (props.get("HTTPSampler.protocol") or "http").lower()
+    if protocol not in ("http", "https"):
+        raise LoadGeneratorError(f"Unsupported protocol '{protocol}' in {jmx_path}")
+    host = props.get("HTTPSampler.domain")
+    if not host or "${" in host:
+        raise LoadGeneratorError(f"Sampler host '{host}' in {jmx_path} is not resolved; set TARGET_HOST.")
+    port = props.get("HTTPSampler.port") or ("443" if protocol == "https" else "80")
+    connect_timeout = props.get("HTTPSampler.connect_timeout")
+    response_timeout = props.get("HTTPSampler.response_timeout")
+    thread_group = next(root.iter("ThreadGroup"), None)
+    return {
+        "label": sampler.get("testname") or "HTTP Request",
+        "method": (props.get("HTTPSampler.method") or "GET").upper(),
+        "protocol": protocol,
+        "host": host,
+        "port": int(port),
+        "path": props.get("HTTPSampler.path") or "/",
+        "keep_alive": props.get("HTTPSampler.use_keepalive", "true") != "false",
+        "connect_timeout_sec": int(connect_timeout) / 1000.0 if connect_timeout else DEFAULT_CONNECT_TIMEOUT_SEC,
+        "response_timeout_sec": int(response_timeout) / 1000.0 if response_timeout else DEFAULT_RESPONSE_TIMEOUT_SEC,
+        "thread_group": thread_group.get("testname") if thread_group is not None else "Thread Group",
+    }
+
+
+def worker_count(params, cpu_count=None):
+    """Worker processes for a test case: ENGINES if set, else one per THREADS_PER_WORKER threads, at most one per core."""
+    threads = int(params.get("THREADS", 1))
+    if params.get("ENGINES"):
+        return max(1, min(int(params["ENGINES"]), threads))
+    cpu_count = cpu_count or os.cpu_count() or 1
+    return max(1, min(cpu_count, math.ceil(threads / THREADS_PER_WORKER), threads))
+
+
+def workload(params):
+    """The closed-loop workload of a test case YAML, with JMeter's thread group semantics."""
+    loops = params.get("LOOPS")
+    return {
+        "threads": int(params.get("THREADS", 1)),
+        "ramp_up": float(params.get("RAMP_UP", 0)),
+        # the scheduler's duration counts from the thread group start, ramp-up included
+        "duration": None if loops is not None else float(params.get("DURATION", 60)),
+        "loops": int(loops) if loops is not None else None,
+        "think_sec": max(float(params.get("THINK_TIME", 0)), 0) / 1000.0,
+    }
+
+# --- HTTP client ---
+
+class ConnectionPool:
+    """
+    Keep-alive connections to the target shared by the virtual users of one
+    worker. A user takes the most recently used idle connection or opens a new
+    one, and returns it after a complete response unless the server closes it.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.ssl_context = ssl.create_default_context() if request["protocol"] == "https" else None
+        self.idle = []
+
+    async def acquire(self):
+        """Returns (reader, writer, connect_ms, reused)."""
+        while self.idle:
+            reader, writer = self.idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer, 0, True
+            writer.close()
+        start = time.perf_counter()
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.request["host"], self.request["port"], ssl=self.ssl_context),
+            self.request["connect_timeout_sec"])
+        return reader, writer, int((time.perf_counter() - start) * 1000), False
+
+    def release(self, reader, writer, keep):
+        if keep and self.request["keep_alive"]:
+            self.idle.append((reader, writer))
+        else:
+            writer.close()
+
+    def close(self):
+        for _, writer in self.idle:
+            writer.close()
+        self.idle.clear()
+
+
+def build_request(request):
+    host = request["host"] if request["port"] in (80, 443) else f"{request['host']}:{request['port']}"
+    return (f"{request['method']} {request['path']} HTTP/1.1\r\n"
+            f"Host: {host}\r\n"
+            "User-Agent: jmeter-theory-calc\r\n"
+            f"Connection: {'keep-alive' if request['keep_alive'] else 'close'}\r\n"
+            "Content-Length: 0\r\n"
+            "\r\n").encode("ascii")
+
+
+async def read_response(reader):
+    """
+    Reads one HTTP/1.1 response. Returns (status, reason, size_bytes, keep_alive, latency_time)
+    where latency_time is the perf_counter when the response head arrived.
+    """
+    head = await reader.readuntil(b"\r\n\r\n")
+    latency_time = time.perf_counter()
+    lines = head[:-4].split(b"\r\n")
+    parts = lines[0].decode("latin-1").split(" ", 2)
+    status = int(parts[1])
+    reason = parts[2].strip() if len(parts) > 2 else ""
+    keep_alive = parts[0] == "HTTP/1.1"
+    length = None
+    chunked = False
+    for line in lines[1:]:
+        name, _, value = line.partition(b":")
+        name = name.strip().lower()
+        if name == b"content-length":
+            length = int(value.strip())
+        elif name == b"transfer-encoding":
+            chunked = b"chunked" in value.lower()
+        elif name == b"connection":
+            token = value.strip().lower()
+            keep_alive = token != b"close" and (keep_alive or token == b"keep-alive")
+
+    size = len(head)
+    if chunked:
+        while True:
+            chunk_head = await reader.readuntil(b"\r\n")
+            chunk_size = int(chunk_head.split(b";")[0], 16)
+            await reader.readexactly(chunk_size + 2)
+            size += len(chunk_head) + chunk_size + 2
+            if chunk_size == 0:
+                break
+    elif length is not None:
+        await reader.readexactly(length)
+        size += length
+    elif status >= 200 and status not in (204, 304):
+        size += len(await reader.read()) # no framing: the body ends when the server closes
+        keep_alive = False
+    return status, reason, size, keep_alive, latency_time
+
+# --- Worker ---
+
+def _csv_field(value):
+    text = str(value)
+    if any(c in text for c in ',"\n\r'):
+        text = '"' + text.replace('"', '""') + '"'
+    return text
+
+
+class VirtualUsers:
+    """
+    The virtual users of one worker process, run as coroutines on one event
+    loop. Each user follows the JMeter thread group: it starts at its ramp-up
+    offset, then loops ConstantTimer (think time) -> sampler until the
+    scheduler ends (a pending timer is cut short, an in-flight sample
+    completes) or it has run `loops` iterations.
+    """
+
+    def __init__(self, request, load, thread_numbers, jtl_file, start_at):
+        self.request = request
+        self.load = load
+        self.thread_numbers = thread_numbers
+        self.jtl_file = jtl_file
+        self.start_at = start_at
+        self.end_at = start_at + load["duration"] if load["duration"] is not None else math.inf
+        self.pool = ConnectionPool(request)
+        self.payload = build_request(request)
+        self.url = f"{request['protocol']}://{request['host']}:{request['port']}{request['path']}"
+        self.rows = []
+        self.sleeping = set()
+        self.stopping = False
+        self.active = 0
+        self.started = 0
+        self.finished = 0
+        self.reset_interval()
+
+    def reset_interval(self):
+        self.samples = 0
+        self.errors = 0
+        self.elapsed_sum = 0
+        self.elapsed_min = None
+        self.elapsed_max = 0
+
+    def interval_stats(self):
+        stats = (self.samples, self.elapsed_sum, self.elapsed_min or 0, self.elapsed_max, self.errors,
+                 self.active, self.started, self.finished)
+        self.reset_interval()
+        return stats
+
+    def stop(self):
+        """Ends the run like the scheduler does: sleeping users wake and exit, in-flight samples complete."""
+        self.stopping = True
+        for waiter in list(self.sleeping):
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def pause(self, seconds):
+        """asyncio.sleep that stop() can cut short."""
+        if seconds <= 0 or self.stopping:
+            return
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        handle = loop.call_later(seconds, lambda: waiter.done() or waiter.set_result(None))
+        self.sleeping.add(waiter)
+        try:
+            await waiter
+        finally:
+            self.sleeping.discard(waiter)
+            handle.cancel()
+
+    async def sample(self, thread_name):
+        timestamp = int(time.time() * 1000)
+        start = time.perf_counter()
+        connect_ms = 0
+        latency_time = None
+        sent = len(self.payload)
+        try:
+            for attempt in range(2):
+                reader, writer, connect_ms, reused = await self.pool.acquire()
+                try:
+                    writer.write(self.payload)
+                    status, reason, size, keep_alive, latency_time = await asyncio.wait_for(
+                        read_response(reader), self.request["response_timeout_sec"])
+                except (ConnectionError, asyncio.IncompleteReadError) as e:
+                    writer.close()
+                    if reused and attempt == 0:
+                        continue # the server closed an idle keep-alive connection: retry once on a new one
+                    raise e
+                except BaseException:
+                    writer.close()
+                    raise
+                self.pool.release(reader, writer, keep_alive)
+                break
+            success = 200 <= status < 400
+            code, message = str(status), reason
+        except Exception as e:
+            # same shape as JMeter's "Non HTTP response code" samples
+            success, size, sent = False, 0, 0
+            code = f"Non HTTP response code: {type(e).__module__}.{type(e).__name__}"
+            message = f"Non HTTP response message: {e}"
+        end = time.perf_counter()
+        elapsed = int((end - start) * 1000)
+        latency = int((latency_time - start) * 1000) if latency_time is not None else 0
+
+        self.samples += 1
+        self.elapsed_sum += elapsed
+        self.elapsed_min = elapsed if self.elapsed_min is None else min(self.elapsed_min, elapsed)
+        self.elapsed_max = max(self.elapsed_max, elapsed)
+        if not success:
+            self.errors += 1
+        row = (timestamp, elapsed, self.request["label"], code, message, thread_name, "text",
+               "true" if success else "false", "", size, sent, self.active, self.active,
+               self.url, latency, 0, connect_ms)
+        self.rows.append(",".join(_csv_field(v) for v in row) + "\n")
+        if len(self.rows) >= ROW_BUFFER:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            self.jtl_file.write("".join(self.rows))
+            self.rows.clear()
+
+    async def user(self, number):
+        # thread i (0-based) starts at i * ramp_up / threads, like JMeter's ramp-up
+        offset = (number - 1) * self.load["ramp_up"] / self.load["threads"]
+        await self.pause(self.start_at + offset - time.time())
+        if self.stopping or time.time() >= self.end_at:
+            return
+        thread_name = f"{self.request['thread_group']} 1-{number}"
+        self.started += 1
+        self.active += 1
+        iteration = 0
+        try:
+            while self.load["loops"] is None or iteration < self.load["loops"]:
+                await self.pause(min(self.load["think_sec"], self.end_at - time.time()))
+                if self.stopping or time.time() >= self.end_at:
+                    break
+                await self.sample(thread_name)
+                iteration += 1
+        finally:
+            self.active -= 1
+            self.finished += 1
+
+    async def run(self, stop_event, stats_queue, worker_index):
+        async def report():
+            while True:
+                await asyncio.sleep(STATS_INTERVAL_SEC)
+                if stop_event.is_set() and not self.stopping:
+                    self.stop()
+                if time.time() >= self.end_at and not self.stopping:
+                    self.stop()
+                stats_queue.put((worker_index, self.interval_stats()))
+                self.flush()
+
+        reporter = asyncio.ensure_future(report())
+        try:
+            await asyncio.gather(*(self.user(number) for number in self.thread_numbers))
+        finally:
+            reporter.cancel()
+            self.pool.close()
+            self.flush()
+            stats_queue.put((worker_index, self.interval_stats()))
+
+
+def _run_worker(worker_index, request, load, thread_numbers, jtl_path, start_at, stop_event, stats_queue):
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    try:
+        with open(jtl_path, "w", newline='', encoding="utf-8") as f:
+            f.write(",".join(JTL_COLUMNS) + "\n")
+            users = VirtualUsers(request, load, thread_numbers, f, start_at)
+            asyncio.run(users.run(stop_event, stats_queue, worker_index))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stats_queue.put((worker_index, None)) # done
+
+# --- Parent ---
+
+def _format_duration(seconds):
+    seconds = int(round(seconds))
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def summariser_line(kind, totals, seconds, threads=None):
+    """
+    A line in JMeter's Summariser format, so LiveRunMonitor reads the Python engine like JMeter.
+    :param threads: (active, started, finished), printed only on "+" lines as JMeter does.
+    """
+    rate = totals.samples / seconds if seconds > 0 else 0.0
+    avg = int(round(totals.elapsed_sum / totals.samples)) if totals.samples else 0
+    error_pct = totals.errors / totals.samples * 100 if totals.samples else 0.0
+    line = (f"summary {kind} {totals.samples:>6} in {_format_duration(seconds)} = {rate:>6.1f}/s "
+            f"Avg: {avg:>5} Min: {totals.elapsed_min or 0:>5} Max: {totals.elapsed_max:>5} "
+            f"Err: {totals.errors:>5} ({error_pct:.2f}%)")
+    if threads is not None:
+        line += " Active: %d Started: %d Finished: %d" % threads
+    return line
+
+
+class _Totals:
+    """Sample counters of a summariser interval or of the whole run."""
+
+    def __init__(self):
+        self.samples = self.elapsed_sum = self.elapsed_max = self.errors = 0
+        self.elapsed_min = None
+
+    def add(self, samples, elapsed_sum, elapsed_min, elapsed_max, errors):
+        if not samples:
+            return
+        self.samples += samples
+        self.elapsed_sum += elapsed_sum
+        self.elapsed_min = elapsed_min if self.elapsed_min is None else min(self.elapsed_min, elapsed_min)
+        self.elapsed_max = max(self.elapsed_max, elapsed_max)
+        self.errors += errors
+
+
+def run_load(params, jmx_path, jtl_path, timeout_seconds, monitor=None, work_dir=None, workers=None,
+             summariser_interval=None, resource_sampler=None):
+    """
+    Runs a test case's closed-loop workload with the Python engine instead of
+    JMeter: THREADS virtual users spread round-robin over `workers` processes
+    (each an asyncio event loop with pooled keep-alive connections), sending
+    the plan's HTTP request with the test case's RAMP_UP, DURATION (or LOOPS)
+    and THINK_TIME. Each worker writes a JTL-compatible CSV; they are merged
+    into jtl_path in timestamp order.
+    Progress is printed as JMeter Summariser lines, which also feed `monitor`.
+    :param jmx_path: Rendered plan the request is read from (see plan_request).
+    :param workers: Worker processes (None = worker_count(params)).
+    :param summariser_interval: Seconds between summary lines (None = JMeter's default of 30).
+    :param resource_sampler: Optional ResourceSampler; the worker processes are sampled as the generator.
+    :return: merge statistics of the worker JTLs.
+    """
+    request = plan_request(jmx_path)
+    load = workload(params)
+    workers = min(workers or worker_count(params), load["threads"])
+    interval = summariser_interval or DEFAULT_SUMMARISER_INTERVAL
+    work_dir = work_dir or os.path.join(os.path.dirname(jtl_path) or ".", "engines")
+    os.makedirs(work_dir, exist_ok=True)
+    print(f"🐍 Python engine: {load['threads']} virtual users on {workers} worker process(es) -> "
+          f"{request['method']} {request['protocol']}://{request['host']}:{request['port']}{request['path']}")
+
+    start_at = time.time() + START_DELAY_SEC
+    stop_event = multiprocessing.Event()
+    stats_queue = multiprocessing.Queue()
+    processes = []
+    worker_jtls = []
+    for index in range(workers):
+        worker_jtl = os.path.join(work_dir, f"worker_{index + 1}.jtl")
+        numbers = list(range(index + 1, load["threads"] + 1, workers)) # round-robin keeps every worker ramping evenly
+        process = multiprocessing.Process(
+            target=_run_worker,
+            args=(index, request, load, numbers, worker_jtl, start_at, stop_event, stats_queue),
+            daemon=True,
+        )
+        process.start()
+        if resource_sampler is not None:
+            resource_sampler.watch("generator", process.pid)
+        processes.append(process)
+        worker_jtls.append(worker_jtl)
+
+    deadline = time.monotonic() + START_DELAY_SEC + timeout_seconds
+    running = set(range(workers))
+    threads = {}
+    interval_totals, cumulative = _Totals(), _Totals()
+    interval_start = start_at
+    abort_reason = None
+    try:
+        while running:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Python engine did not finish within {timeout_seconds} seconds.")
+            try:
+                index, stats = stats_queue.get(timeout=0.5)
+                if stats is None:
+                    running.discard(index)
+                else:
+                    interval_totals.add(*stats[:5])
+                    threads[index] = stats[5:]
+            except queue.Empty:
+                if not any(p.is_alive() for p in processes):
+                    break # every worker died without reporting
+            now = time.time()
+            if now - interval_start < interval and (running or not interval_totals.samples):
+                continue
+            line = summariser_line("+", interval_totals, now - interval_start,
+                                   tuple(sum(t[i] for t in threads.values()) for i in range(3)))
+            print(line)
+            cumulative.add(interval_totals.samples, interval_totals.elapsed_sum, interval_totals.elapsed_min,
+                           interval_totals.elapsed_max, interval_totals.errors)
+            print(summariser_line("=", cumulative, now - start_at))
+            interval_totals, interval_start = _Totals(), now
+            if monitor is not None and abort_reason is None:
+                monitor.on_line(line)
+                abort_reason = monitor.check_abort()
+                if abort_reason:
+                    print(f"🛑 Aborting Python engine run: {abort_reason}")
+                    stop_event.set()
+                    deadline = min(deadline, time.monotonic() + STOP_GRACE_SEC + STATS_INTERVAL_SEC)
+    finally:
+        stop_event.set()
+        for process in processes:
+            process.join(timeout=STOP_GRACE_SEC)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+
+    failed = [i + 1 for i, p in enumerate(processes) if p.exitcode not in (0, None)]
+    print(f"🔀 Merging {len(worker_jtls)} worker JTLs into {jtl_path}...")
+    stats = merge_jtl_files(worker_jtls, jtl_path)
+    print(f"✅ Merged {stats['rows']} rows ({stats['late_rows']} beyond the reorder window).")
+    if failed:
+        raise LoadGeneratorError(f"Python engine worker(s) {', '.join(map(str, failed))} failed.")
+    if abort_reason:
+        raise RunAborted(abort_reason)
+    print("✅ Python engine run finished.")
+    return stats
+
+
+def main():
+    import yaml
+
+    from jmx_engine import render_jmx, template_params
+
+    parser = argparse.ArgumentParser(description="Run a test case YAML with the Python load generator (no JMeter needed)")
+    parser.add_argument("testcase", help="test case YAML (e.g. testcases/light.yaml)")
+    parser.add_argument("--template", default=os.path.join("jmx_template", "test_template.jmx"),
+                        help="plan the HTTP request is taken from (default: jmx_template/test_template.jmx)")
+    parser.add_argument("--host", help="target host (overrides TARGET_HOST)")
+    parser.add_argument("--port", type=int, help="target port (overrides TARGET_PORT)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: ENGINES, else one per "
+                                                    f"{THREADS_PER_WORKER} threads up to the core count)")
+    parser.add_argument("--summariser-interval", type=int, default=5, help="seconds between summary lines")
+    parser.add_argument("--output-dir", default=os.path.join("results", "python_engine"))
+    args = parser.parse_args()
+
+    with open(args.testcase, "r") as f:
+        params = yaml.safe_load(f)
+    if args.host:
+        params["TARGET_HOST"] = args.host
+    if args.port:
+        params["TARGET_PORT"] = args.port
+    jmx_path = render_jmx(args.template, os.path.join(args.output_dir, "generated_test.jmx"),
+                          template_params(args.template, params))
+    jtl_path = os.path.join(args.output_dir, "result.jtl")
+    load = workload(params)
+    timeout = (load["duration"] or 3600) * 2.5 + 20
+    run_load(params, jmx_path, jtl_path, timeout, work_dir=os.path.join(args.output_dir, "engines"),
+             workers=args.workers, summariser_interval=args.summariser_interval)
+    print(f"📄 JTL written to {jtl_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,22 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import socket
 from http.server import HTTPServer, BaseHTTPRequestHandler
 
+try:
+    import uvloop # optional: faster event loop when installed
+except ImportError:
+    uvloop = None
+
+# --- Global Constants ---
+HOST = "0.0.0.0"
+PORT = 8080
+LISTEN_BACKLOG = 8192 # room for thousands of JMeter threads connecting at once
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential")
+
 class FastMockHandler(BaseHTTPRequestHandler):
     def do_GET(self):
         # send HTTP 200 OK immediately
@@ -13,12 +30,166 @@ class FastMockHandler(BaseHTTPRequestHandler):
         # close log for each request to prevent stdout slow
         return
 
-if __name__ == "__main__":
-    HOST = "0.0.0.0"
-    PORT = 8080
-    print(f"🚀 Mock server listening on http://{HOST}:{PORT} (CTRL+C to stop)")
-    server = HTTPServer((HOST, PORT), FastMockHandler)
+
+def build_response(response_size, keep_alive=True):
+    """Pre-renders the full HTTP/1.1 200 response carrying a response_size-byte body."""
+    body = b"OK"[:response_size] if response_size <= 2 else b"O" * (response_size - 1) + b"K"
+    head = (
+        "HTTP/1.1 200 OK\r\n"
+        "Content-Type: text/plain\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        "\r\n"
+    )
+    return head.encode("ascii") + body
+
+
+def make_latency_sampler(latency_ms=0.0, distribution="fixed", jitter_ms=0.0):
+    """
+    Returns a function giving the injected delay (seconds) for each response.
+    - fixed:       always latency_ms
+    - uniform:     latency_ms +/- jitter_ms
+    - exponential: exponentially distributed with mean latency_ms
+    """
+    if distribution not in LATENCY_DISTRIBUTIONS:
+        raise ValueError(f"Unknown latency distribution '{distribution}' (choose from {', '.join(LATENCY_DISTRIBUTIONS)})")
+    if latency_ms <= 0 and (distribution != "uniform" or jitter_ms <= 0):
+        return None
+    if distribution == "fixed":
+        return lambda: latency_ms / 1000.0
+    if distribution == "uniform":
+        low, high = max(latency_ms - jitter_ms, 0.0), latency_ms + jitter_ms
+        return lambda: random.uniform(low, high) / 1000.0
+    return lambda: random.expovariate(1000.0 / latency_ms)
+
+
+async def handle_connection(reader, writer, response, closing_response, latency_sampler):
+    """Serves requests on one keep-alive connection until the client closes it."""
     try:
-        server.serve_forever()
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            lines = head.split(b"\r\n")
+            version = lines[0].rsplit(b" ", 1)[-1]
+            keep_alive = version == b"HTTP/1.1"
+            body_length = 0
+            for line in lines[1:]:
+                name, _, value = line.partition(b":")
+                name = name.strip().lower()
+                if name == b"connection":
+                    token = value.strip().lower()
+                    keep_alive = token != b"close" and (keep_alive or token == b"keep-alive")
+                elif name == b"content-length":
+                    body_length = int(value.strip() or 0)
+            if body_length:
+                await reader.readexactly(body_length)
+            if latency_sampler is not None:
+                await asyncio.sleep(latency_sampler())
+            writer.write(response if keep_alive else closing_response)
+            if not keep_alive:
+                break
+            if writer.transport.get_write_buffer_size() > 65536:
+                await writer.drain()
+        await writer.drain()
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_asyncio(host, port, response_size=2, latency_sampler=None, reuse_port=False, ready=None):
+    """Runs one asyncio server process until cancelled."""
+    response = build_response(response_size)
+    closing_response = build_response(response_size, keep_alive=False)
+
+    async def on_connect(reader, writer):
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        await handle_connection(reader, writer, response, closing_response, latency_sampler)
+
+    server = await asyncio.start_server(on_connect, host, port, backlog=LISTEN_BACKLOG, reuse_port=reuse_port)
+    if ready is not None:
+        ready.set()
+    async with server:
+        await server.serve_forever()
+
+
+def _run_worker(host, port, response_size, latency_ms, distribution, jitter_ms, reuse_port, ready=None):
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    sampler = make_latency_sampler(latency_ms, distribution, jitter_ms)
+    try:
+        asyncio.run(serve_asyncio(host, port, response_size, sampler, reuse_port=reuse_port, ready=ready))
     except KeyboardInterrupt:
-        print("\n🛑 Server stopped")
\ No newline at end of file
+        pass
+
+
+def start_workers(host=HOST, port=PORT, workers=1, response_size=2, latency_ms=0.0,
+                  distribution="fixed", jitter_ms=0.0):
+    """
+    Starts `workers` asyncio server processes sharing the port through
+    SO_REUSEPORT, so the kernel spreads connections across them.
+    Returns the processes once all of them are listening.
+    """
+    reuse_port = workers > 1
+    if reuse_port and not hasattr(socket, "SO_REUSEPORT"):
+        print("⚠️ SO_REUSEPORT is not available on this platform. Falling back to a single worker.")
+        workers, reuse_port = 1, False
+
+    processes = []
+    for _ in range(workers):
+        ready = multiprocessing.Event()
+        process = multiprocessing.Process(
+            target=_run_worker,
+            args=(host, port, response_size, latency_ms, distribution, jitter_ms, reuse_port, ready),
+            daemon=True,
+        )
+        process.start()
+        if not ready.wait(timeout=10):
+            for p in processes + [process]:
+                p.terminate()
+            raise RuntimeError(f"Mock server worker failed to listen on {host}:{port}")
+        processes.append(process)
+    return processes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock HTTP target for JMeter tests")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--mode", choices=("asyncio", "simple"), default="asyncio",
+                        help="asyncio: keep-alive multi-process server (default); simple: original single-threaded HTTPServer")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="asyncio server processes sharing the port via SO_REUSEPORT (default: CPU count)")
+    parser.add_argument("--response-size", type=int, default=2, help="response body size in bytes (default: 2)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="injected latency per response in ms")
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="fixed",
+                        help="latency distribution (default: fixed)")
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0, help="+/- range for the uniform distribution")
+    args = parser.parse_args()
+
+    if args.mode == "simple":
+        print(f"🚀 Mock server listening on http://{args.host}:{args.port} (CTRL+C to stop)")
+        server = HTTPServer((args.host, args.port), FastMockHandler)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\n🛑 Server stopped")
+        return
+
+    make_latency_sampler(args.latency_ms, args.latency_dist, args.latency_jitter_ms) # validate before forking
+    processes = start_workers(args.host, args.port, args.workers, args.response_size,
+                              args.latency_ms, args.latency_dist, args.latency_jitter_ms)
+    loop_name = "uvloop" if uvloop is not None else "asyncio"
+    print(f"🚀 Mock server listening on http://{args.host}:{args.port} "
+          f"({len(processes)} {loop_name} worker(s), CTRL+C to stop)")
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        print("\n🛑 Server stopped")
+
+if __name__ == "__main__":
+    main()
@@ -1,121 +1,210 @@
-import pandas as pd
-import matplotlib.pyplot as plt
+import argparse
+import glob
 import os
 
+import chart_render
+
 # --- Configuration ---
 CSV_FILE_PATH = 'Jmeter_Experiment_Results.csv'
+JTL_FILE_PATH = os.path.join('results', 'result.jtl')
 OUTPUT_DIR = 'graphs'
 
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
 # --- Load Data ---
-try:
-    df = pd.read_csv(CSV_FILE_PATH)
-    print(f"Data loaded successfully from {CSV_FILE_PATH}")
+
+def load_experiment_results(csv_path=CSV_FILE_PATH):
+    """Loads the experiment results table (pandas is imported only here)."""
+    import pandas as pd
+
+    df = pd.read_csv(csv_path)
+    print(f"Data loaded successfully from {csv_path}")
     print(df.head())
-except FileNotFoundError:
-    print(f"Error: {CSV_FILE_PATH} not found. Please ensure the CSV file is in the correct directory.")
-    exit()
-except Exception as e:
-    print(f"Error loading CSV file: {e}")
-    exit()
+    return df
 
-# --- Plotting Functions ---
+# --- Chart Specs ---
 
-def plot_rps_comparison(data_frame, output_path, use_log_scale=True): # add parameter use_log_scale
+def rps_comparison_spec(data_frame, use_log_scale=True):
     """
     กราฟเปรียบเทียบ RPS (Actual vs. Theoretical) เป็น Bar Chart
     พร้อมตัวเลือกใช้ Logarithmic Scale สำหรับแกน Y
     """
-    fig, ax = plt.subplots(figsize=(10, 6))
-    
-    test_cases = data_frame['TestCase']
-    theoretical_rps = data_frame['TheoreticalMaxRPS']
-    actual_rps = data_frame['ActualRPS']
-
-    bar_width = 0.35
-    index = range(len(test_cases))
-
-    bar1 = ax.bar([i - bar_width/2 for i in index], theoretical_rps, bar_width, label='Theoretical Max RPS', color='skyblue')
-    bar2 = ax.bar([i + bar_width/2 for i in index], actual_rps, bar_width, label='Actual RPS', color='lightcoral')
-
-    ax.set_xlabel('Test Case', fontsize=12)
-    ax.set_ylabel('Requests per Second (RPS)', fontsize=12)
-    ax.set_title('Comparison of Theoretical vs. Actual RPS', fontsize=14)
-    ax.set_xticks(index)
-    ax.set_xticklabels(test_cases)
-    ax.legend()
-    ax.grid(axis='y', linestyle='--', alpha=0.7)
-    
-    # --- Used Logarithmic Scale ---
-    if use_log_scale:
-        ax.set_yscale('log')
-        #for bar_group in [bar1, bar2]:
-            #for bar in bar_group:
-                #height = bar.get_height()
-                #if height > 0: # ป้องกันค่า 0 ถ้ามี
-                    #ax.text(bar.get_x() + bar.get_width()/2, height, f'{height:.0f}', 
-                            #ha='center', va='bottom', fontsize=8, rotation=45) # ปรับ rotation ให้พอดี
-
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_path, 'rps_comparison_bar_chart_log_scale.png')) # Change File Name
-    plt.show()
+    return {
+        "name": 'rps_comparison_bar_chart_log_scale' if use_log_scale else 'rps_comparison_bar_chart',
+        "kind": "grouped_bar",
+        "title": 'Comparison of Theoretical vs. Actual RPS',
+        "xlabel": 'Test Case',
+        "ylabel": 'Requests per Second (RPS)',
+        "categories": list(data_frame['TestCase']),
+        "series": [
+            {"y": list(data_frame['TheoreticalMaxRPS']), "label": 'Theoretical Max RPS', "color": 'skyblue'},
+            {"y": list(data_frame['ActualRPS']), "label": 'Actual RPS', "color": 'lightcoral'},
+        ],
+        "grid_axis": "y",
+        "log_y": use_log_scale,
+    }
 
-def plot_actual_rps_trend(data_frame, output_path):
-    fig, ax = plt.subplots(figsize=(10, 6))
+def actual_rps_trend_spec(data_frame):
     sorted_df = data_frame.sort_values(by='Threads')
-    ax.plot(sorted_df['TestCase'], sorted_df['ActualRPS'], marker='o', linestyle='-', color='green', label='Actual RPS')
-    ax.set_xlabel('Test Case (Increasing Load)', fontsize=12)
-    ax.set_ylabel('Actual Requests per Second (RPS)', fontsize=12)
-    ax.set_title('Actual RPS Trend Across Different Load Levels', fontsize=14)
-    ax.grid(True, linestyle='--', alpha=0.7)
-    ax.legend()
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_path, 'actual_rps_trend_line_chart.png'))
-    plt.show()
+    return {
+        "name": 'actual_rps_trend_line_chart',
+        "kind": "line",
+        "title": 'Actual RPS Trend Across Different Load Levels',
+        "xlabel": 'Test Case (Increasing Load)',
+        "ylabel": 'Actual Requests per Second (RPS)',
+        "series": [{"x": list(sorted_df['TestCase']), "y": list(sorted_df['ActualRPS']),
+                    "label": 'Actual RPS', "color": 'green', "marker": 'o'}],
+    }
+
+def duration_comparison_spec(data_frame):
+    return {
+        "name": 'duration_comparison_bar_chart',
+        "kind": "grouped_bar",
+        "title": 'Comparison of Theoretical vs. Actual Test Duration',
+        "xlabel": 'Test Case',
+        "ylabel": 'Duration (Seconds)',
+        "categories": list(data_frame['TestCase']),
+        "series": [
+            {"y": list(data_frame['TheoreticalDuration_s']), "label": 'Theoretical Duration', "color": 'lightgreen'},
+            {"y": list(data_frame['ActualDuration_s']), "label": 'Actual Duration', "color": 'salmon'},
+        ],
+        "grid_axis": "y",
+    }
+
+def efficiency_spec(data_frame):
+    colors = ['blue', 'orange', 'red']
+    return {
+        "name": 'efficiency_bar_chart',
+        "kind": "bar",
+        "title": 'Efficiency Across Different Test Cases',
+        "xlabel": 'Test Case',
+        "ylabel": 'Efficiency (%)',
+        "categories": list(data_frame['TestCase']),
+        "series": [{"y": list(data_frame['Efficiency_pct']),
+                    "color": [colors[i % len(colors)] for i in range(len(data_frame))]}],
+        "ylim": (0, 105),
+        "grid_axis": "y",
+        "bar_labels": True,
+    }
+
+def jtl_throughput_spec(jtl_path, name='actual_throughput_over_time'):
+    """
+    Per-second throughput of a single run, split into successful and failed samples.
+    Reads the JTL through its columnar cache, so re-plotting a run doesn't re-parse the CSV.
+    Returns None when the JTL has no samples.
+    """
+    import numpy as np
+    from jtl_cache import aggregate_columns, load_jtl_columns
+
+    # the same per-second buckets (and corrupt-timestamp handling) as analyze_jtl
+    aggregate = aggregate_columns(*load_jtl_columns(jtl_path))
+    if aggregate.count == 0:
+        print(f"No samples in {jtl_path}, skipping throughput chart.")
+        return None
+    total = aggregate.per_second
+    errors = aggregate.per_second_errors
+    elapsed_time = np.arange(total.size)
+    return {
+        "name": name,
+        "kind": "line",
+        "title": 'Actual Throughput Over Time',
+        "xlabel": 'Time since first sample (seconds)',
+        "ylabel": 'Requests per Second',
+        "figsize": (12, 6),
+        "series": [
+            {"x": elapsed_time, "y": total - errors, "label": 'Successful req/s', "color": 'green'},
+            {"x": elapsed_time, "y": errors, "label": 'Failed req/s', "color": 'red'},
+        ],
+    }
+
+def experiment_specs(data_frame):
+    """All charts of the experiment results table."""
+    return [
+        rps_comparison_spec(data_frame, use_log_scale=True),
+        actual_rps_trend_spec(data_frame),
+        duration_comparison_spec(data_frame),
+        efficiency_spec(data_frame),
+    ]
+
+def _run_names(jtl_paths):
+    """
+    One distinct chart name per JTL: its path relative to the JTLs' common
+    directory, e.g. results/batch/<batch>/<case>/result.jtl -> <case> and
+    results/a.jtl, results/b.jtl -> a, b. Collisions get a _2, _3... suffix.
+    """
+    paths = [os.path.splitext(os.path.abspath(path))[0] for path in jtl_paths]
+    common = os.path.commonpath([os.path.dirname(path) for path in paths])
+    parts = [os.path.relpath(path, common).split(os.sep) for path in paths]
+    stems = {p[-1] for p in parts}
+    if len(stems) == 1 and all(len(p) > 1 for p in parts):
+        parts = [p[:-1] for p in parts] # every file is e.g. result.jtl: the directories tell the runs apart
+    names = []
+    seen = {}
+    for name in ("_".join(p) for p in parts):
+        seen[name] = seen.get(name, 0) + 1
+        names.append(name if seen[name] == 1 else f"{name}_{seen[name]}")
+    return names
+
+# --- Plotting Functions (headless, one chart each) ---
+
+def plot_rps_comparison(data_frame, output_path, use_log_scale=True):
+    return chart_render.render_chart(rps_comparison_spec(data_frame, use_log_scale), output_path)
+
+def plot_actual_rps_trend(data_frame, output_path):
+    return chart_render.render_chart(actual_rps_trend_spec(data_frame), output_path)
 
 def plot_duration_comparison(data_frame, output_path):
-    fig, ax = plt.subplots(figsize=(10, 6))
-    test_cases = data_frame['TestCase']
-    theoretical_duration = data_frame['TheoreticalDuration_s']
-    actual_duration = data_frame['ActualDuration_s']
-    bar_width = 0.35
-    index = range(len(test_cases))
-    bar1 = ax.bar([i - bar_width/2 for i in index], theoretical_duration, bar_width, label='Theoretical Duration', color='lightgreen')
-    bar2 = ax.bar([i + bar_width/2 for i in index], actual_duration, bar_width, label='Actual Duration', color='salmon')
-    ax.set_xlabel('Test Case', fontsize=12)
-    ax.set_ylabel('Duration (Seconds)', fontsize=12)
-    ax.set_title('Comparison of Theoretical vs. Actual Test Duration', fontsize=14)
-    ax.set_xticks(index)
-    ax.set_xticklabels(test_cases)
-    ax.legend()
-    ax.grid(axis='y', linestyle='--', alpha=0.7)
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_path, 'duration_comparison_bar_chart.png'))
-    plt.show()
+    return chart_render.render_chart(duration_comparison_spec(data_frame), output_path)
 
 def plot_efficiency_by_test_case(data_frame, output_path):
-    fig, ax = plt.subplots(figsize=(10, 6))
-    test_cases = data_frame['TestCase']
-    efficiency = data_frame['Efficiency_pct']
-    bars = ax.bar(test_cases, efficiency, color=['blue', 'orange', 'red'])
-    for bar in bars:
-        yval = bar.get_height()
-        ax.text(bar.get_x() + bar.get_width()/2, yval + 0.5, round(yval, 2), ha='center', va='bottom', fontsize=9)
-    ax.set_xlabel('Test Case', fontsize=12)
-    ax.set_ylabel('Efficiency (%)', fontsize=12)
-    ax.set_title('Efficiency Across Different Test Cases', fontsize=14)
-    ax.set_ylim(0, 105)
-    ax.grid(axis='y', linestyle='--', alpha=0.7)
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_path, 'efficiency_bar_chart.png'))
-    plt.show()
+    return chart_render.render_chart(efficiency_spec(data_frame), output_path)
+
+def plot_jtl_throughput(jtl_path, output_path):
+    spec = jtl_throughput_spec(jtl_path)
+    return chart_render.render_chart(spec, output_path) if spec else []
 
 # --- Run Plotting ---
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the experiment and run charts (headless)")
+    parser.add_argument("--csv", default=CSV_FILE_PATH, help=f"experiment results table (default: {CSV_FILE_PATH})")
+    parser.add_argument("--jtl", nargs="*", default=None,
+                        help=f"JTLs or glob patterns to chart per run (default: {JTL_FILE_PATH} if present)")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--format", nargs="+", choices=chart_render.CHART_FORMATS, default=["png"])
+    parser.add_argument("--html", metavar="PATH", help="also write every chart into one self-contained HTML report")
+    parser.add_argument("--workers", type=int, default=1, help="render in this many processes")
+    args = parser.parse_args()
+
+    specs = []
+    if os.path.exists(args.csv):
+        specs.extend(experiment_specs(load_experiment_results(args.csv)))
+    else:
+        print(f"Error: {args.csv} not found. Skipping the experiment charts.")
+
+    if args.jtl is None:
+        jtl_paths = [JTL_FILE_PATH] if os.path.exists(JTL_FILE_PATH) and os.path.getsize(JTL_FILE_PATH) > 0 else []
+    else:
+        jtl_paths = set()
+        for pattern in args.jtl:
+            matches = glob.glob(pattern)
+            if not matches:
+                print(f"No JTL matches {pattern}, skipping.")
+            jtl_paths.update(matches)
+        jtl_paths = sorted(jtl_paths)
+    for jtl_path, run_name in zip(jtl_paths, _run_names(jtl_paths)):
+        name = 'actual_throughput_over_time' if len(jtl_paths) == 1 else f'actual_throughput_over_time_{run_name}'
+        spec = jtl_throughput_spec(jtl_path, name)
+        if spec:
+            specs.append(spec)
+
+    if not specs:
+        print("Nothing to plot.")
+        return
+    print(f"\nGenerating {len(specs)} graphs and saving to '{args.output_dir}' directory...")
+    chart_render.render_charts(specs, args.output_dir, args.format, workers=args.workers)
+    if args.html:
+        chart_render.write_html_report(specs, args.html)
+        print(f"HTML report written to {args.html}")
+    print("All graphs generated and saved.")
+
 if __name__ == "__main__":
-    print(f"\nGenerating graphs and saving to '{OUTPUT_DIR}' directory...")
-    plot_rps_comparison(df, OUTPUT_DIR, use_log_scale=True) 
-    plot_actual_rps_trend(df, OUTPUT_DIR)
-    plot_duration_comparison(df, OUTPUT_DIR)
-    plot_efficiency_by_test_case(df, OUTPUT_DIR)
-    print("All graphs generated and saved.")
\ No newline at end of file
+    main()
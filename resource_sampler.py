@@ -0,0 +1,401 @@
+import csv
+import os
+import threading
+import time
+
+import numpy as np
+
+# --- Global Constants ---
+PROC = "/proc"
+DEFAULT_INTERVAL_SEC = 1.0
+ROLES = ("generator", "target")
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+# /proc/net/tcp state codes
+TCP_STATES = {
+    "01": "established", "02": "syn_sent", "03": "syn_recv", "04": "fin_wait1", "05": "fin_wait2",
+    "06": "time_wait", "07": "close", "08": "close_wait", "09": "last_ack", "0A": "listen", "0B": "closing",
+}
+PROCESS_TCP_STATES = ("established", "syn_sent", "close_wait") # per process; anything else counts as tcp_other
+PROCESS_COLUMNS = [
+    "processes", "cpu_pct", "rss_mb", "threads", "open_fds", "fd_limit",
+    "tcp_established", "tcp_syn_sent", "tcp_close_wait", "tcp_other",
+    "ctx_voluntary_per_s", "ctx_involuntary_per_s",
+]
+SYSTEM_COLUMNS = [
+    "system_cpu_pct", "system_tcp_established", "system_tcp_time_wait",
+    "system_tcp_retrans_per_s", "system_listen_overflows_per_s",
+]
+RESOURCE_CSV_COLUMNS = (["epoch_sec"] + [f"{role}_{c}" for role in ROLES for c in PROCESS_COLUMNS]
+                        + SYSTEM_COLUMNS)
+SATURATION_PCT = 90.0 # a role using this share of the machine's cores (or fd limit) is called saturated
+
+
+def proc_available():
+    return os.path.isdir(os.path.join(PROC, "self"))
+
+
+def _read(path):
+    try:
+        with open(path, "r") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _stat_fields(pid):
+    """Fields of /proc/<pid>/stat after the command name (which may contain spaces)."""
+    text = _read(os.path.join(PROC, str(pid), "stat"))
+    if text is None:
+        return None
+    return text[text.rindex(")") + 2:].split()
+
+
+def descendants(pid):
+    """pid and every process below it (JMeter's launcher script starts java as a child)."""
+    found = [pid]
+    index = 0
+    while index < len(found):
+        current = found[index]
+        index += 1
+        for task in os.listdir(os.path.join(PROC, str(current), "task")) if os.path.isdir(
+                os.path.join(PROC, str(current), "task")) else []:
+            children = _read(os.path.join(PROC, str(current), "task", task, "children"))
+            if children:
+                found.extend(int(child) for child in children.split())
+    return found
+
+
+def find_pids(pattern):
+    """PIDs whose command line contains pattern, e.g. "mock_server.py" (this process excluded)."""
+    pids = []
+    for entry in os.listdir(PROC):
+        if not entry.isdigit() or int(entry) == os.getpid():
+            continue
+        cmdline = _read(os.path.join(PROC, entry, "cmdline"))
+        if cmdline and pattern in cmdline.replace("\0", " "):
+            pids.append(int(entry))
+    return pids
+
+
+def tcp_socket_states():
+    """Socket inode -> TCP state name for every IPv4 and IPv6 TCP socket of the network namespace."""
+    states = {}
+    for table in ("tcp", "tcp6"):
+        text = _read(os.path.join(PROC, "net", table))
+        if not text:
+            continue
+        for line in text.splitlines()[1:]:
+            fields = line.split()
+            if len(fields) > 9:
+                states[fields[9]] = TCP_STATES.get(fields[3], "other")
+    return states
+
+
+def _fd_limit(pid):
+    text = _read(os.path.join(PROC, str(pid), "limits")) or ""
+    for line in text.splitlines():
+        if line.startswith("Max open files"):
+            soft = line.split()[3]
+            return int(soft) if soft.isdigit() else None
+    return None
+
+
+def process_counters(pid, socket_states):
+    """Cumulative and instantaneous counters of one process, or None once it has exited."""
+    fields = _stat_fields(pid)
+    if fields is None:
+        return None
+    counters = {
+        "cpu_ticks": int(fields[11]) + int(fields[12]), # utime + stime
+        "threads": int(fields[17]),
+        "rss_bytes": int(fields[21]) * PAGE_SIZE,
+        "ctx_voluntary": 0,
+        "ctx_involuntary": 0,
+        "open_fds": 0,
+        "fd_limit": _fd_limit(pid),
+    }
+    for line in (_read(os.path.join(PROC, str(pid), "status")) or "").splitlines():
+        if line.startswith("voluntary_ctxt_switches"):
+            counters["ctx_voluntary"] = int(line.split()[1])
+        elif line.startswith("nonvoluntary_ctxt_switches"):
+            counters["ctx_involuntary"] = int(line.split()[1])
+    tcp = dict.fromkeys(PROCESS_TCP_STATES + ("other",), 0)
+    fd_dir = os.path.join(PROC, str(pid), "fd")
+    try:
+        fds = os.listdir(fd_dir)
+    except OSError:
+        fds = []
+    counters["open_fds"] = len(fds)
+    for fd in fds:
+        try:
+            target = os.readlink(os.path.join(fd_dir, fd))
+        except OSError:
+            continue
+        if target.startswith("socket:["):
+            state = socket_states.get(target[8:-1])
+            if state is not None:
+                tcp[state if state in tcp else "other"] += 1
+    counters["tcp"] = tcp
+    return counters
+
+
+def system_counters(socket_states):
+    """Machine-wide CPU ticks and the TCP counters that show a struggling network stack."""
+    cpu = (_read(os.path.join(PROC, "stat")) or "cpu 0 0 0 0").splitlines()[0].split()[1:]
+    ticks = [int(v) for v in cpu]
+    idle = ticks[3] + (ticks[4] if len(ticks) > 4 else 0) # idle + iowait
+    counters = {"cpu_total": sum(ticks[:8]), "cpu_idle": idle, "retrans": 0, "listen_overflows": 0}
+    for path, section, key, name in (("snmp", "Tcp:", "RetransSegs", "retrans"),
+                                     ("netstat", "TcpExt:", "ListenOverflows", "listen_overflows")):
+        lines = [line.split() for line in (_read(os.path.join(PROC, "net", path)) or "").splitlines()
+                 if line.startswith(section)]
+        if len(lines) >= 2 and key in lines[0]:
+            counters[name] = int(lines[1][lines[0].index(key)])
+    states = list(socket_states.values())
+    counters["tcp_established"] = states.count("established")
+    counters["tcp_time_wait"] = states.count("time_wait")
+    return counters
+
+
+class ResourceSampler:
+    """
+    Samples the generator and target processes from /proc in a background
+    thread every `interval` seconds: CPU, RSS, threads, open file descriptors
+    (and their limit), the TCP states of their sockets and context switches,
+    plus machine-wide CPU, TIME_WAIT, retransmits and listen queue overflows.
+    A role is every registered root PID together with its descendants, so
+    JMeter's launcher script, the JVM it starts, multi-process mock servers
+    and the python engine's workers are all covered. One row per sample is
+    appended to csv_path as it is taken.
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL_SEC, csv_path=None):
+        self.interval = interval
+        self.csv_path = csv_path
+        self.roots = {role: set() for role in ROLES}
+        self.rows = []
+        self.fd_limits = {role: None for role in ROLES}
+        self._previous = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if csv_path:
+            csv_dir = os.path.dirname(csv_path)
+            if csv_dir:
+                os.makedirs(csv_dir, exist_ok=True)
+            with open(csv_path, "w", newline='') as f:
+                csv.writer(f).writerow(RESOURCE_CSV_COLUMNS)
+
+    def watch(self, role, pid):
+        """Adds a root PID to a role ("generator" or "target")."""
+        if role not in self.roots:
+            raise ValueError(f"Unknown resource role '{role}' (choose from {', '.join(ROLES)})")
+        with self._lock:
+            self.roots[role].add(int(pid))
+
+    def _collect(self):
+        socket_states = tcp_socket_states()
+        with self._lock:
+            roots = {role: set(pids) for role, pids in self.roots.items()}
+        per_role = {}
+        for role, pids in roots.items():
+            processes = {}
+            for root in pids:
+                if not os.path.isdir(os.path.join(PROC, str(root))):
+                    continue
+                for pid in descendants(root):
+                    if pid not in processes:
+                        counters = process_counters(pid, socket_states)
+                        if counters is not None:
+                            processes[pid] = counters
+            per_role[role] = processes
+        return time.time(), per_role, system_counters(socket_states)
+
+    def _row(self, current):
+        now, per_role, system = current
+        previous_time, previous_roles, previous_system = self._previous
+        elapsed = max(now - previous_time, 1e-9)
+        row = [round(now, 3)]
+        for role in ROLES:
+            processes, before = per_role[role], previous_roles[role]
+            # a process that started during the interval counts from zero, one that exited drops out
+            cpu = sum(p["cpu_ticks"] - before.get(pid, {}).get("cpu_ticks", 0) for pid, p in processes.items())
+            voluntary = sum(p["ctx_voluntary"] - before.get(pid, {}).get("ctx_voluntary", 0)
+                            for pid, p in processes.items())
+            involuntary = sum(p["ctx_involuntary"] - before.get(pid, {}).get("ctx_involuntary", 0)
+                              for pid, p in processes.items())
+            limits = [p["fd_limit"] for p in processes.values() if p["fd_limit"]]
+            row += [
+                len(processes),
+                round(cpu / CLOCK_TICKS / elapsed * 100, 1),
+                round(sum(p["rss_bytes"] for p in processes.values()) / 1e6, 1),
+                sum(p["threads"] for p in processes.values()),
+                sum(p["open_fds"] for p in processes.values()),
+                min(limits) if limits else None,
+                *(sum(p["tcp"][state] for p in processes.values()) for state in PROCESS_TCP_STATES + ("other",)),
+                round(voluntary / elapsed, 1),
+                round(involuntary / elapsed, 1),
+            ]
+        total = system["cpu_total"] - previous_system["cpu_total"]
+        busy = total - (system["cpu_idle"] - previous_system["cpu_idle"])
+        row += [
+            round(busy / total * 100, 1) if total > 0 else 0.0,
+            system["tcp_established"],
+            system["tcp_time_wait"],
+            round((system["retrans"] - previous_system["retrans"]) / elapsed, 1),
+            round((system["listen_overflows"] - previous_system["listen_overflows"]) / elapsed, 1),
+        ]
+        return row
+
+    def sample(self):
+        """Takes one sample; the first one only sets the baseline for the rates."""
+        current = self._collect()
+        if self._previous is not None:
+            row = self._row(current)
+            self.rows.append(row)
+            if self.csv_path:
+                with open(self.csv_path, "a", newline='') as f:
+                    csv.writer(f).writerow(row)
+        self._previous = current
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.sample()
+            except Exception as e: # a racing process exit must never stop the run
+                print(f"⚠️ Resource sample failed: {e}")
+            self._stop.wait(max(self.interval - (time.monotonic() - started), 0.0))
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops sampling after one last sample and returns the rows."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            self.sample()
+        return self.rows
+
+    def table(self):
+        """Samples as a dict of NumPy columns keyed like RESOURCE_CSV_COLUMNS."""
+        rows = np.array([[np.nan if v is None else v for v in row] for row in self.rows], dtype=np.float64)
+        rows = rows.reshape(-1, len(RESOURCE_CSV_COLUMNS))
+        return {column: rows[:, i] for i, column in enumerate(RESOURCE_CSV_COLUMNS)}
+
+
+def start_resource_sampler(params, csv_path):
+    """
+    Starts a ResourceSampler for a test case, or returns None when sampling is
+    off (RESOURCE_INTERVAL: 0) or /proc isn't available (e.g. Windows).
+    Optional YAML keys:
+      RESOURCE_INTERVAL - seconds between samples (default 1)
+      TARGET_PIDS       - PIDs of the target (e.g. a local mock_server.py)
+      TARGET_PROCESS    - or a command line substring to find them, e.g. "mock_server.py"
+    The generator PIDs are registered by the runner once JMeter has started.
+    """
+    interval = float(params.get("RESOURCE_INTERVAL", DEFAULT_INTERVAL_SEC))
+    if interval <= 0:
+        return None
+    if not proc_available():
+        print("⚠️ /proc is not available on this platform. Resource sampling is off.")
+        return None
+    sampler = ResourceSampler(interval, csv_path)
+    target_pids = list(params.get("TARGET_PIDS") or [])
+    if params.get("TARGET_PROCESS"):
+        found = find_pids(params["TARGET_PROCESS"])
+        if not found:
+            print(f"⚠️ No process matches TARGET_PROCESS '{params['TARGET_PROCESS']}'. The target is not sampled.")
+        target_pids += found
+    for pid in target_pids:
+        sampler.watch("target", pid)
+    return sampler.start()
+
+
+def align_with_jtl(sampler, actual, output_path=None):
+    """
+    Lines the samples up with the per-second JTL buckets (bucket 0 = first
+    sample second): each second gets the first resource sample taken at or
+    after its end, since a sample's rates cover the interval before it.
+    :return: dict of per-second columns (second, actual_rps, errors, then RESOURCE_CSV_COLUMNS),
+             or None when there are no samples.
+    """
+    table = sampler.table()
+    if not table["epoch_sec"].size or actual is None:
+        return None
+    rps = np.asarray(actual["rps_per_second"])
+    seconds = np.arange(rps.size)
+    bucket_ends = actual["bucket_start_sec"] + seconds + 1
+    index = np.clip(np.searchsorted(table["epoch_sec"], bucket_ends, side="left"), 0, table["epoch_sec"].size - 1)
+    aligned = {"second": seconds, "actual_rps": rps, "errors": np.asarray(actual["errors_per_second"])}
+    aligned.update({column: values[index] for column, values in table.items()})
+    if output_path:
+        with open(output_path, "w", newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(list(aligned))
+            for row in zip(*aligned.values()):
+                # counts back to integers, missing values (e.g. no fd limit) to empty cells
+                writer.writerow(["" if np.isnan(v) else int(v) if float(v).is_integer() else v for v in row])
+    return aligned
+
+
+def summarize_resources(sampler, cores=None):
+    """
+    Peaks and means of the sampled series, and which side ran out of room:
+    a role whose CPU stays near all cores or whose fds near the limit, or a
+    network stack dropping connections (listen overflows) or retransmitting.
+    :return: dict of scalars plus "bottlenecks", a list of findings.
+    """
+    table = sampler.table()
+    if not table["epoch_sec"].size:
+        return None
+    cores = cores or os.cpu_count() or 1
+    summary = {"samples": int(table["epoch_sec"].size), "bottlenecks": []}
+    for role in ROLES:
+        if not np.nansum(table[f"{role}_processes"]):
+            continue
+        cpu = table[f"{role}_cpu_pct"]
+        summary[f"{role}_cpu_pct_mean"] = float(np.nanmean(cpu))
+        summary[f"{role}_cpu_pct_peak"] = float(np.nanmax(cpu))
+        summary[f"{role}_rss_mb_peak"] = float(np.nanmax(table[f"{role}_rss_mb"]))
+        summary[f"{role}_open_fds_peak"] = int(np.nanmax(table[f"{role}_open_fds"]))
+        summary[f"{role}_tcp_established_peak"] = int(np.nanmax(table[f"{role}_tcp_established"]))
+        busy = np.nanmedian(cpu[cpu.size // 4:]) if cpu.size else 0 # skip the ramp-up quarter
+        if busy >= SATURATION_PCT / 100 * cores * 100:
+            summary["bottlenecks"].append(f"{role} CPU-bound ({busy:.0f}% of {cores * 100}% on {cores} cores)")
+        limit = np.nanmin(table[f"{role}_fd_limit"]) if np.isfinite(table[f"{role}_fd_limit"]).any() else None
+        if limit and summary[f"{role}_open_fds_peak"] >= SATURATION_PCT / 100 * limit:
+            summary["bottlenecks"].append(f"{role} near its open file limit ({summary[f'{role}_open_fds_peak']} of {int(limit)})")
+    summary["system_cpu_pct_peak"] = float(np.nanmax(table["system_cpu_pct"]))
+    summary["system_tcp_time_wait_peak"] = int(np.nanmax(table["system_tcp_time_wait"]))
+    summary["listen_overflows"] = float(np.nansum(table["system_listen_overflows_per_s"]
+                                                  * np.diff(table["epoch_sec"], prepend=table["epoch_sec"][0])))
+    summary["retransmits_per_s_peak"] = float(np.nanmax(table["system_tcp_retrans_per_s"]))
+    if summary["listen_overflows"] > 0:
+        summary["bottlenecks"].append("network stack: the target's listen queue overflowed (connections dropped)")
+    if summary["system_cpu_pct_peak"] >= SATURATION_PCT and not any("CPU-bound" in b for b in summary["bottlenecks"]):
+        summary["bottlenecks"].append("machine CPU saturated (generator and target may be sharing it)")
+    return summary
+
+
+def print_resource_summary(summary):
+    if not summary:
+        print("\n🖥️ No resource samples were taken.")
+        return
+    print(f"\n🖥️ Resources ({summary['samples']} samples):")
+    for role in ROLES:
+        if f"{role}_cpu_pct_mean" in summary:
+            print(f"   {role}: CPU mean {summary[f'{role}_cpu_pct_mean']:.0f}% / peak {summary[f'{role}_cpu_pct_peak']:.0f}%,"
+                  f" RSS peak {summary[f'{role}_rss_mb_peak']:.0f} MB, fds peak {summary[f'{role}_open_fds_peak']},"
+                  f" TCP established peak {summary[f'{role}_tcp_established_peak']}")
+    print(f"   system: CPU peak {summary['system_cpu_pct_peak']:.0f}%, TIME_WAIT peak {summary['system_tcp_time_wait_peak']},"
+          f" retransmits peak {summary['retransmits_per_s_peak']:.0f}/s, listen overflows {summary['listen_overflows']:.0f}")
+    for finding in summary["bottlenecks"]:
+        print(f"⚠️ Bottleneck: {finding}")
+    if not summary["bottlenecks"]:
+        print("✅ Neither generator nor target ran out of CPU, file descriptors or listen queue.")
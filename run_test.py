@@ -1,24 +1,40 @@
 import os
+import queue
 import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+
 import yaml
-import csv
 # from datetime import datetime # Not strictly needed for the current analysis, but useful for timestamps if needed
 
 # Ensure jmeter_calc.py is in the same directory or accessible via Python path
 try:
-    from jmeter_calc import calculate_theoretical_values, plot_traffic_pattern
+    from jmeter_calc import (MIN_PROCESSING_TIME_MS, calculate_closed_loop_values,
+                             plot_traffic_pattern, response_time_from_jtl)
 except ImportError:
     print("❌ Error: jmeter_calc.py not found. Please ensure it's in the same directory or Python path.")
     print("This script requires jmeter_calc.py for theoretical calculations and plotting.")
     exit(1) # Exit if essential module is missing
 
+from jtl_merge import merge_jtl_files
+from jmx_engine import render_jmx, template_params
+from jmeter_profiles import (disable_listeners, jmeter_arguments, jmeter_environment, resolve_launcher,
+                             resolve_profile, write_profile)
+# numpy-backed modules (drift_analysis, arrival_profiles, live_monitor, load_generator,
+# resource_sampler) are imported inside the functions that use them, so importing run_test stays light
+
 # --- Global Constants ---
-JMETER_BAT_PATH = r"C:\JMeter\apache-jmeter-5.6.3\bin\jmeter.bat"
+JMETER_BAT_PATH = r"C:\JMeter\apache-jmeter-5.6.3\bin\jmeter.bat" # used when JMETER_BIN, JMETER_HOME and PATH don't provide one
 JMX_TEMPLATE = "jmx_template/test_template.jmx"
+OPEN_MODEL_TEMPLATE = "jmx_template/open_model_template.jmx" # used instead of JMX_TEMPLATE for ARRIVAL_PROFILE cases
 RESULTS_DIR = "results"
 JMX_OUTPUT_PATH = os.path.join(RESULTS_DIR, "generated_test.jmx")
 JTL_OUTPUT_PATH = os.path.join(RESULTS_DIR, "result.jtl")
+OUTPUT_TAIL_LINES = 200 # JMeter output lines kept in memory for error reports
 YAML_TESTCASES_DIR = "testcases"
+LOAD_GENERATORS = ("jmeter", "python") # python: the built-in asyncio engine of load_generator.py, no JVM needed
 
 # --- Utility Functions (unchanged from your last version) ---
 
@@ -28,166 +44,412 @@ def load_yaml(filepath):
     with open(filepath, "r") as f:
         return yaml.safe_load(f)
 
-def generate_jmx(template_path, output_path, params):
-    """Generates a .jmx file from a template by replacing placeholders."""
+def generate_jmx(template_path, output_path, params, profile=None):
+    """
+    Generates a .jmx file from a template by replacing placeholders.
+    The template is compiled once and cached (see jmx_engine); only the params
+    the template uses are passed, and a placeholder without a value raises JmxTemplateError.
+    A profile with disable_listeners turns off the plan's listeners.
+    """
     print(f"📁 Generating .jmx file from {template_path} to {output_path}...")
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(template_path, "r") as f:
-        template = f.read()
-    for key, value in params.items():
-        placeholder = f"${{{key.upper()}}}"
-        template = template.replace(placeholder, str(value))
-    with open(output_path, "w") as f:
-        f.write(template)
+    transform = disable_listeners if profile and profile["disable_listeners"] else None
+    render_jmx(template_path, output_path, template_params(template_path, params), transform=transform)
     print("✅ .jmx file generated successfully.")
 
-def run_jmeter(jmx_path, jtl_path, timeout_seconds): # Removed default value here to ensure it's always passed dynamically
+def _stop_process(process, grace_seconds=10):
+    """Asks JMeter to stop, then kills it if it doesn't exit within grace_seconds."""
+    if process.poll() is not None:
+        return
+    process.terminate()
+    try:
+        process.wait(timeout=grace_seconds)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+def run_jmeter(jmx_path, jtl_path, timeout_seconds, monitor=None, log_path=None, extra_args=None, profile=None,
+               resource_sampler=None, stop_event=None): # Removed default value here to ensure it's always passed dynamically
     """
     Runs JMeter in non-GUI mode with robust error handling and timeout.
+    Output is streamed line by line instead of buffered until exit; only the
+    last OUTPUT_TAIL_LINES lines are kept for error reports.
     :param jmx_path: Path to the .jmx test plan.
     :param jtl_path: Path to the .jtl results file.
     :param timeout_seconds: Maximum seconds to wait for JMeter to complete.
+    :param monitor: Optional LiveRunMonitor fed with every output line; the run is
+                    stopped early (RunAborted) when it reports an abort reason.
+    :param log_path: Optional jmeter.log path (-j); its WARN/ERROR lines are tailed live.
+    :param extra_args: Additional JMeter command line arguments (e.g. ["-R", "host1,host2"]).
+    :param profile: Resolved JMeter profile (jmeter_profiles) whose -J properties and
+                    HEAP/GC_ALGO/JVM_ARGS environment are applied to the launcher.
+    :param resource_sampler: Optional ResourceSampler; the JMeter process (and the JVM
+                             its launcher starts) is sampled as the generator.
+    :param stop_event: Optional threading.Event; once set, the run is stopped (RunAborted)
+                       within a second, e.g. when another engine of the same test failed.
     """
+    from live_monitor import RunAborted, start_log_tail
+
     print(f"🚀 Running JMeter test plan: {jmx_path}")
     print(f"Results will be saved to: {jtl_path}")
 
+    launcher = resolve_launcher(JMETER_BAT_PATH)
     cmd = [
-        JMETER_BAT_PATH,
+        launcher,
         "-n",
         "-t", jmx_path,
         "-l", jtl_path
     ]
+    if log_path:
+        cmd += ["-j", log_path]
+    if profile:
+        cmd += jmeter_arguments(profile)
+    if extra_args:
+        cmd += list(extra_args)
+    env = jmeter_environment(profile) if profile else None
+
+    output_tail = deque(maxlen=OUTPUT_TAIL_LINES)
+    lines = queue.Queue()
+    stop_tail = None
+
+    def pump_output(stream):
+        for line in stream:
+            lines.put(line.rstrip("\r\n"))
+        lines.put(None)
+
+    try:
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                   text=True, bufsize=1, errors="replace", env=env)
+    except FileNotFoundError:
+        print(f"❌ JMeter executable not found at {launcher}.")
+        print("Please set JMETER_BIN or JMETER_HOME, put jmeter on the PATH, or verify JMETER_BAT_PATH in the script.")
+        raise
+    if resource_sampler is not None:
+        resource_sampler.watch("generator", process.pid)
 
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True, timeout=timeout_seconds)
+        threading.Thread(target=pump_output, args=(process.stdout,), daemon=True).start()
+        if log_path:
+            stop_tail = start_log_tail(
+                log_path,
+                lambda line: print(f"📝 {line}") if (" WARN " in line or " ERROR " in line) else None
+            )
+
+        deadline = time.monotonic() + timeout_seconds
+        finished_output = False
+        while not finished_output:
+            if stop_event is not None and stop_event.is_set():
+                print(f"🛑 Stopping JMeter run {jmx_path}: another engine of this test failed.")
+                _stop_process(process)
+                raise RunAborted("stopped because another engine of this test failed")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                _stop_process(process)
+                raise subprocess.TimeoutExpired(cmd, timeout_seconds, output="\n".join(output_tail))
+            try:
+                line = lines.get(timeout=min(remaining, 1.0))
+            except queue.Empty:
+                continue
+            if line is None:
+                finished_output = True
+                continue
+            output_tail.append(line)
+            if monitor is not None:
+                monitor.on_line(line)
+                reason = monitor.check_abort()
+                if reason:
+                    print(f"🛑 Aborting JMeter run: {reason}")
+                    _stop_process(process)
+                    raise RunAborted(reason)
+
+        returncode = process.wait(timeout=max(deadline - time.monotonic(), 1))
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, cmd, output="\n".join(output_tail))
         print("✅ JMeter test executed successfully.")
-        if result.stderr:
-            print("JMeter stderr (warnings/info):")
-            print(result.stderr)
     except subprocess.CalledProcessError as e:
         print(f"❌ JMeter execution failed with error code {e.returncode}.")
-        print("--- JMeter STDOUT ---")
-        print(e.stdout)
-        print("--- JMeter STDERR ---")
-        print(e.stderr)
+        print(f"--- JMeter OUTPUT (last {OUTPUT_TAIL_LINES} lines) ---")
+        print(e.output)
         raise
     except subprocess.TimeoutExpired:
+        _stop_process(process)
         print(f"❌ JMeter test timed out after {timeout_seconds} seconds.")
         print("This often means the JMeter process did not terminate as expected.")
         print("Please check Task Manager for lingering 'java.exe' processes.")
         raise
-    except FileNotFoundError:
-        print(f"❌ JMeter executable not found at {JMETER_BAT_PATH}.")
-        print("Please verify the JMETER_BAT_PATH in the script.")
+    except RunAborted:
         raise
     except Exception as e:
+        _stop_process(process)
         print(f"An unexpected error occurred during JMeter execution: {e}")
         raise
+    finally:
+        if stop_tail is not None:
+            stop_tail.set()
+
+def predict_theoretical_values(params, generators=1):
+    """
+    Closed-loop theoretical prediction for a test case.
+    Optional YAML keys feed the model:
+      RESPONSE_TIME           - server response time in ms
+      RESPONSE_TIME_FROM_JTL  - fit the response time from a previous run's JTL instead
+      SERVER_CAPACITY         - maximum RPS the target can serve
+      GENERATOR_CAPACITY      - maximum RPS one JMeter generator can send
+    Without them the response time defaults to MIN_PROCESSING_TIME_MS and nothing caps throughput.
+    An open-model case (ARRIVAL_PROFILE) gets the open-model values instead: the
+    arrival rate is given, and Little's law sizes the threads from the response time.
+    :param generators: Number of JMeter engines sharing the threads (scales GENERATOR_CAPACITY).
+    """
+    response_time_ms = params.get("RESPONSE_TIME")
+    if response_time_ms is None and params.get("RESPONSE_TIME_FROM_JTL"):
+        response_time_ms = response_time_from_jtl(params["RESPONSE_TIME_FROM_JTL"])
+        if response_time_ms is not None:
+            print(f"Fitted response time from {params['RESPONSE_TIME_FROM_JTL']}: {response_time_ms:.2f} ms")
+    if response_time_ms is None:
+        response_time_ms = MIN_PROCESSING_TIME_MS
+
+    if params.get("ARRIVAL_PROFILE"):
+        from arrival_profiles import open_model_values_from_params
+        return open_model_values_from_params(params, response_time_ms)
+    return calculate_closed_loop_values(
+        threads=params.get("THREADS", 1),
+        ramp_up=params.get("RAMP_UP", 0),
+        duration=params.get("DURATION", 60),
+        think_time_ms=params.get("THINK_TIME", 0),
+        response_time_ms=response_time_ms,
+        server_capacity_rps=params.get("SERVER_CAPACITY"),
+        generator_capacity_rps=params.get("GENERATOR_CAPACITY"),
+        generators=generators
+    )
+
+def build_live_monitor(params, theory, csv_path, share=1.0, name=None):
+    """
+    LiveRunMonitor comparing against the theoretical curve: users over time at
+    the model's per-user rate, capped at the predicted max RPS. `share` scales
+    the curve for an engine that runs only part of the threads.
+    """
+    from drift_analysis import theoretical_rps_curve
+    from live_monitor import LiveRunMonitor
+
+    time_series, theory_rps_series = theoretical_rps_curve(params, theory)
+    theory_rps_series = theory_rps_series * share
+    return LiveRunMonitor(time_series, theory_rps_series, max_error_pct=params.get("ABORT_ERROR_PCT"),
+                          csv_path=csv_path, name=name)
+
+def split_threads(threads, engines):
+    """Splits a thread count across engines as evenly as possible, e.g. 10 over 3 -> [4, 3, 3]."""
+    base, remainder = divmod(int(threads), engines)
+    return [base + (1 if i < remainder else 0) for i in range(engines) if base + (1 if i < remainder else 0) > 0]
+
+def run_distributed(params, theory, jtl_path, timeout_seconds, engines=1, remote_hosts=None,
+                    template_path=JMX_TEMPLATE, work_dir=None, profile=None, resource_sampler=None):
+    """
+    Runs one test case on several JMeter engines at the same time and leaves a
+    single time-ordered JTL at jtl_path.
+    - remote_hosts: JMeter's own distributed mode (-R). Every remote server runs
+      the same plan, so each gets ceil(THREADS / hosts) threads, and the
+      controller collects all samples into jtl_path itself.
+    - otherwise: `engines` local JMeter processes, each with its share of THREADS,
+      its own plan, JTL and log under work_dir; their JTLs are k-way merged.
+      The first engine to fail stops the others; what they wrote is still merged
+      before its error is re-raised.
+    :return: merge statistics (rows, late_rows, skipped_rows), or None for remote runs.
+    """
+    threads = int(params.get("THREADS", 1))
+    work_dir = work_dir or os.path.join(os.path.dirname(jtl_path) or ".", "engines")
+
+    if remote_hosts:
+        per_host = -(-threads // len(remote_hosts)) # ceil
+        if per_host * len(remote_hosts) != threads:
+            print(f"⚠️ {threads} threads don't split evenly over {len(remote_hosts)} hosts; "
+                  f"each runs {per_host} ({per_host * len(remote_hosts)} total).")
+        jmx_path = os.path.join(work_dir, "remote_test.jmx")
+        generate_jmx(template_path, jmx_path, dict(params, THREADS=per_host), profile)
+        monitor = build_live_monitor(params, theory, os.path.join(work_dir, "live_summary.csv"))
+        run_jmeter(jmx_path, jtl_path, timeout_seconds, monitor=monitor,
+                   log_path=os.path.join(work_dir, "jmeter.log"),
+                   extra_args=["-R", ",".join(remote_hosts)], profile=profile, resource_sampler=resource_sampler)
+        return None
+
+    shares = split_threads(threads, engines)
+    print(f"🌐 Distributing {threads} threads over {len(shares)} local JMeter engines: {shares}")
+    engine_jtls = []
+    jobs = []
+    for i, engine_threads in enumerate(shares, start=1):
+        engine_dir = os.path.join(work_dir, f"engine_{i}")
+        jmx_path = os.path.join(engine_dir, "test.jmx")
+        engine_jtl = os.path.join(engine_dir, "result.jtl")
+        if os.path.exists(engine_jtl):
+            os.remove(engine_jtl)
+        generate_jmx(template_path, jmx_path, dict(params, THREADS=engine_threads), profile)
+        monitor = build_live_monitor(params, theory, os.path.join(engine_dir, "live_summary.csv"),
+                                     share=engine_threads / threads, name=f"engine {i}")
+        engine_jtls.append(engine_jtl)
+        jobs.append((jmx_path, engine_jtl, monitor, os.path.join(engine_dir, "jmeter.log")))
+
+    # the first engine to fail (abort, error or timeout) stops the others instead of leaving them to their timeout
+    stop_engines = threading.Event()
+    error = None
+    with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+        pending = {pool.submit(run_jmeter, jmx, jtl, timeout_seconds, monitor=monitor, log_path=log, profile=profile,
+                               resource_sampler=resource_sampler, stop_event=stop_engines)
+                   for jmx, jtl, monitor, log in jobs}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_EXCEPTION)
+            for future in done:
+                if future.exception() is not None and error is None:
+                    error = future.exception()
+                    stop_engines.set()
+
+    print(f"🔀 Merging {len(engine_jtls)} engine JTLs into {jtl_path}...")
+    try:
+        stats = merge_jtl_files(engine_jtls, jtl_path)
+    except FileNotFoundError:
+        if error is not None:
+            raise error from None # no engine wrote a sample before the failure
+        raise
+    print(f"✅ Merged {stats['rows']} rows ({stats['late_rows']} beyond the reorder window).")
+    if error is not None:
+        raise error
+    return stats
 
-def analyze_jtl(jtl_path):
-    """Analyzes the .jtl results file."""
+def analyze_jtl(jtl_path, chunk_rows=None, workers=1, use_cache=True):
+    """
+    Analyzes the .jtl results file with the streaming, chunked analyzer.
+    Memory use is bounded by chunk_rows regardless of the file size, and the
+    run window is taken from the true min/max timestamps since JMeter writes
+    rows in completion order, not start order.
+    :param jtl_path: Path to the .jtl results file.
+    :param chunk_rows: Rows parsed per chunk (None = jtl_analysis.DEFAULT_CHUNK_ROWS).
+    :param workers: Processes parsing newline-aligned byte ranges in parallel (None = every core).
+    :param use_cache: Answer from / write the columnar sidecar cache (<jtl>.cache/).
+    """
     print(f"📈 Analyzing actual results from {jtl_path}...")
     if not os.path.exists(jtl_path) or os.path.getsize(jtl_path) == 0:
         print("⚠️ JTL file not found or is empty. Skipping analysis.")
         return None
 
-    count = 0
-    first_ts = None
-    last_ts = None
+    # pandas/pyarrow are only loaded once there is something to analyze
+    from jtl_analysis import DEFAULT_CHUNK_ROWS
+    from jtl_cache import analyze_jtl_cached
 
     try:
-        with open(jtl_path, "r", newline='', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            header = next(reader)
-            try:
-                ts_col_index = header.index("timeStamp")
-            except ValueError:
-                print("❌ 'timeStamp' column not found in JTL header. Cannot analyze.")
-                return None
-
-            for row in reader:
-                if not row or len(row) <= ts_col_index:
-                    continue
-                try:
-                    ts = int(row[ts_col_index])
-                    if first_ts is None:
-                        first_ts = ts
-                    last_ts = ts
-                    count += 1
-                except ValueError:
-                    print(f"⚠️ Skipping invalid timestamp in row: {row}")
-                    continue
+        result = analyze_jtl_cached(jtl_path, chunk_rows=chunk_rows or DEFAULT_CHUNK_ROWS,
+                                    workers=workers, use_cache=use_cache)
+    except ValueError as e:
+        print(f"❌ {e} Cannot analyze.")
+        return None
     except Exception as e:
         print(f"❌ Error reading or parsing JTL file: {e}")
         return None
 
-    if first_ts is None or last_ts is None or count == 0:
+    if result["actual_requests"] == 0:
         print("⚠️ No valid test data found in JTL file for analysis.")
-        return {
-            "actual_requests": 0,
-            "duration_sec": 0.0,
-            "actual_rps": 0.0
-        }
-
-    duration_ms = last_ts - first_ts
-    duration_sec = duration_ms / 1000.0 if duration_ms > 0 else 0.001
-
-    actual_rps = count / duration_sec if duration_sec > 0 else 0.0
 
-    return {
-        "actual_requests": count,
-        "duration_sec": duration_sec,
-        "actual_rps": actual_rps
-    }
+    return result
 
 # --- Main Execution Flow ---
 
-def main():
-    print("=== JMeter Calculator & Test Runner ===")
-    
-    yaml_file = input(f"Enter test case YAML (e.g. light.yaml, from '{YAML_TESTCASES_DIR}' directory): ").strip()
-    yaml_path = os.path.join(YAML_TESTCASES_DIR, yaml_file)
-
-    if not os.path.exists(yaml_path):
-        print(f"❌ YAML file not found at: {yaml_path}")
-        print("Please ensure the YAML file exists in the 'testcases' directory.")
-        return
-
+def print_actual_results(actual):
+    """Prints the measured metrics of an analyze_jtl result."""
+    print(f"\n✅ Actual RPS: {actual['actual_rps']:.2f}")
+    print(f"📦 Actual Total Requests: {actual['actual_requests']}")
+    print(f"⏱️ Actual Duration: {actual['duration_sec']:.2f} sec")
+    if actual["actual_requests"] > 0:
+        print(f"❗ Error Rate: {actual['error_rate_pct']:.2f}% ({actual['error_count']} errors)")
+        print(f"🐢 Latency p50/p90/p99: {actual['p50_latency_ms']:.0f} / "
+              f"{actual['p90_latency_ms']:.0f} / {actual['p99_latency_ms']:.0f} ms")
+        print(f"📊 Peak per-second throughput: {int(actual['rps_per_second'].max())} req/s")
+
+def run_test_case(params, output_dir=RESULTS_DIR, template_path=JMX_TEMPLATE, name=None):
+    """
+    Runs one test case end to end without prompting: theory, JMeter run(s),
+    JTL analysis and efficiency. All files of the run live in output_dir.
+    :param params: Test case parameters (the YAML dict).
+    :param name: Optional label prefixed to live output, useful when runs share a console.
+    :return: dict with params, theory, actual (None if analysis failed), efficiency_pct,
+             drift (windowed comparison with the theoretical curve, see drift_analysis),
+             profile (name of the JMeter profile applied, from the PROFILE key),
+             load_generator ("jmeter" or "python", from the LOAD_GENERATOR key),
+             resources (peak/mean usage of generator and target and the suspected bottleneck,
+             see resource_sampler; None when sampling is off),
+             status ("completed", "aborted" or "failed"), error (why the run failed) and output_dir.
+    """
+    from arrival_profiles import open_model_plan_params
+    from drift_analysis import compare_with_theory, print_drift_summary, write_window_csv
+    from live_monitor import RunAborted
+    from load_generator import run_load, worker_count
+    from resource_sampler import align_with_jtl, print_resource_summary, start_resource_sampler, summarize_resources
+
+    jmx_path = os.path.join(output_dir, "generated_test.jmx")
+    jtl_path = os.path.join(output_dir, "result.jtl")
+    record = {"params": params, "theory": None, "actual": None, "efficiency_pct": None, "drift": None,
+              "profile": None, "load_generator": None, "resources": None, "status": "failed", "error": None,
+              "output_dir": output_dir}
+
+    load_generator = str(params.get("LOAD_GENERATOR", "jmeter")).lower()
+    remote_hosts = params.get("REMOTE_HOSTS") or []
     try:
-        params = load_yaml(yaml_path)
-    except Exception as e:
-        print(f"❌ Error loading YAML file: {e}")
-        return
+        profile = resolve_profile(params.get("PROFILE"))
+        if load_generator not in LOAD_GENERATORS:
+            raise ValueError(f"Unknown LOAD_GENERATOR '{load_generator}' (choose from {', '.join(LOAD_GENERATORS)})")
+        if load_generator == "python" and remote_hosts:
+            raise ValueError("REMOTE_HOSTS needs JMeter's distributed mode; the python load generator runs locally.")
+        if params.get("ARRIVAL_PROFILE") and (load_generator == "python" or remote_hosts
+                                              or int(params.get("ENGINES", 1)) > 1):
+            raise ValueError("ARRIVAL_PROFILE cases run on a single JMeter engine "
+                             "(the shaping timer schedule is per engine).")
+    except ValueError as e:
+        print(f"❌ {e}")
+        record["error"] = str(e)
+        return record
+    record["profile"] = profile["name"]
+    record["load_generator"] = load_generator
 
     print("\n📊 Predicting theoretical values from calculator...\n")
-    theory = calculate_theoretical_values(
-        threads=params.get("THREADS", 1),
-        ramp_up=params.get("RAMP_UP", 0),
-        duration=params.get("DURATION", 60),
-        think_time_ms=params.get("THINK_TIME", 0)
-    )
+    # ENGINES: N splits THREADS over N local JMeter processes (or python engine workers); REMOTE_HOSTS uses JMeter's -R mode
+    if load_generator == "python":
+        generators = worker_count(params)
+    else:
+        generators = len(remote_hosts) if remote_hosts else int(params.get("ENGINES", 1))
+    try:
+        theory = predict_theoretical_values(params, generators=generators)
+    except ValueError as e:
+        print(f"❌ {e}")
+        record["error"] = str(e)
+        return record
+    record["theory"] = theory
 
     for key, val in theory.items():
-        print(f"{key.replace('_', ' ').title()}: {val:.2f}")
+        print(f"{key.replace('_', ' ').title()}: {val:.2f}" if isinstance(val, (int, float)) else
+              f"{key.replace('_', ' ').title()}: {val}")
 
-    os.makedirs(RESULTS_DIR, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
+    if load_generator == "python":
+        print(f"🐍 Load generator: python ({generators} worker process(es)); JVM settings of the profile don't apply")
+    else:
+        print(f"⚙️ JMeter profile: {profile['name']}")
+    write_profile(profile, os.path.join(output_dir, "jmeter_profile.json"))
 
-    if os.path.exists(JTL_OUTPUT_PATH):
+    if os.path.exists(jtl_path):
         try:
-            os.remove(JTL_OUTPUT_PATH)
-            print(f"🗑️ Removed old .jtl file: {JTL_OUTPUT_PATH}")
+            os.remove(jtl_path)
+            print(f"🗑️ Removed old .jtl file: {jtl_path}")
         except OSError as e:
             print(f"⚠️ Could not remove old .jtl file: {e}.")
             print("Please ensure the file is not open by another program and try again.")
-            return
-
-    generate_jmx(JMX_TEMPLATE, JMX_OUTPUT_PATH, params)
+            record["error"] = str(e)
+            return record
 
+    # generator and target CPU, memory, fds and sockets from /proc, alongside the run
+    sampler = start_resource_sampler(params, os.path.join(output_dir, "resources.csv"))
+    status = "completed"
     try:
         # --- Adjusted Dynamic Timeout Calculation ---
         # Increased multiplier and buffer to account for potential delays under stress
         # For a 150-second test, 2.5x buffer + 20s = 375 + 20 = 395 seconds
         # This will be sufficient for your 400-second target.
+        # total_simulation_time comes from the closed-loop model, so it already includes
+        # draining in-flight requests at the (possibly saturated) effective response time.
         jmeter_timeout = theory['total_simulation_time'] * 2.5 # Multiplier increased from 1.5 to 2.5
         calculated_timeout_seconds = int(jmeter_timeout) + 20   # Buffer increased from 10 to 20
         
@@ -198,34 +460,126 @@ def main():
 
         print(f"Calculated JMeter execution timeout: {calculated_timeout_seconds} seconds.")
 
-        run_jmeter(JMX_OUTPUT_PATH, JTL_OUTPUT_PATH, timeout_seconds=calculated_timeout_seconds)
+        if load_generator == "python":
+            # the plan is still rendered: the engine takes its HTTP request from it, and it reproduces the run in JMeter
+            generate_jmx(template_path, jmx_path, params, profile)
+            monitor = build_live_monitor(params, theory, os.path.join(output_dir, "live_summary.csv"), name=name)
+            run_load(params, jmx_path, jtl_path, calculated_timeout_seconds, monitor=monitor,
+                     work_dir=os.path.join(output_dir, "engines"), workers=generators,
+                     summariser_interval=profile["summariser_interval"], resource_sampler=sampler)
+        elif generators > 1:
+            run_distributed(params, theory, jtl_path, calculated_timeout_seconds,
+                            engines=generators, remote_hosts=remote_hosts, template_path=template_path,
+                            work_dir=os.path.join(output_dir, "engines"), profile=profile,
+                            resource_sampler=sampler)
+        else:
+            if params.get("ARRIVAL_PROFILE"):
+                print(f"📈 Open model: {theory['threads_required']} threads for a peak of {theory['max_rps']:.2f} req/s")
+                plan_template = OPEN_MODEL_TEMPLATE if template_path == JMX_TEMPLATE else template_path
+                generate_jmx(plan_template, jmx_path, open_model_plan_params(params, theory), profile)
+            else:
+                generate_jmx(template_path, jmx_path, params, profile)
+            monitor = build_live_monitor(params, theory, os.path.join(output_dir, "live_summary.csv"), name=name)
+            run_jmeter(jmx_path, jtl_path, timeout_seconds=calculated_timeout_seconds,
+                       monitor=monitor, log_path=os.path.join(output_dir, "jmeter.log"), profile=profile,
+                       resource_sampler=sampler)
+    except RunAborted as e:
+        print(f"⚠️ Run stopped early ({e}). Analyzing the partial results...")
+        status = "aborted"
     except Exception as e:
         print(f"An error occurred during JMeter execution: {e}")
-        return
-
-    actual = analyze_jtl(JTL_OUTPUT_PATH)
+        record["error"] = str(e)
+        return record
+    finally:
+        if sampler is not None:
+            sampler.stop()
+            record["resources"] = summarize_resources(sampler)
+            print_resource_summary(record["resources"])
+
+    if load_generator == "jmeter" and profile["output_format"] != "csv":
+        print(f"⚠️ The JTL was saved as {profile['output_format']}; the analysis reads CSV only. Skipping analysis.")
+        record["status"] = status
+        return record
+
+    actual = analyze_jtl(jtl_path, workers=None)
+    record["actual"] = actual
 
     if actual:
-        print(f"\n✅ Actual RPS: {actual['actual_rps']:.2f}")
-        print(f"📦 Actual Total Requests: {actual['actual_requests']}")
-        print(f"⏱️ Actual Duration: {actual['duration_sec']:.2f} sec")
+        print_actual_results(actual)
 
-        efficiency = (actual["actual_rps"] / theory["max_rps"]) * 100 if theory["max_rps"] > 0 else 0
+        # an open model's rate varies by design, so it is measured against the profile's mean rate
+        expected_rps = theory.get("mean_rps", theory["max_rps"])
+        efficiency = (actual["actual_rps"] / expected_rps) * 100 if expected_rps > 0 else 0
         print(f"\n🎯 Efficiency: {efficiency:.2f}% (Actual vs Theoretical)")
+        record["efficiency_pct"] = efficiency
+
+        drift = compare_with_theory(params, theory, actual)
+        print_drift_summary(drift)
+        write_window_csv(drift, os.path.join(output_dir, "efficiency_windows.csv"))
+        record["drift"] = drift
+        if sampler is not None:
+            align_with_jtl(sampler, actual, os.path.join(output_dir, "resource_timeline.csv"))
+        record["status"] = status
     else:
         print("\nAnalysis could not be completed.")
 
+    return record
+
+def run_yaml_test_case(yaml_path, output_dir=RESULTS_DIR, profile=None, load_generator=None):
+    """
+    Loads a test case YAML, runs it with run_test_case and saves the traffic pattern graphs next to the results.
+    :param profile: JMeter profile name overriding the YAML's PROFILE key.
+    :param load_generator: "jmeter" or "python", overriding the YAML's LOAD_GENERATOR key.
+    """
+    if not os.path.exists(yaml_path):
+        print(f"❌ YAML file not found at: {yaml_path}")
+        print("Please ensure the YAML file exists in the 'testcases' directory.")
+        return None
+
+    try:
+        params = load_yaml(yaml_path)
+    except Exception as e:
+        print(f"❌ Error loading YAML file: {e}")
+        return None
+
+    if profile:
+        params["PROFILE"] = profile
+    if load_generator:
+        params["LOAD_GENERATOR"] = load_generator
+    record = run_test_case(params, output_dir)
+    if record["error"]:
+        return record
+
     print("\n📊 Rendering traffic pattern graph...")
     try:
-        plot_traffic_pattern(
-            threads=params.get("THREADS", 1),
-            ramp_up=params.get("RAMP_UP", 0),
-            duration=params.get("DURATION", 60),
-            think_time_ms=params.get("THINK_TIME", 0)
-        )
+        import chart_render
+        from arrival_profiles import arrival_specs
+        from drift_analysis import drift_chart_spec
+
+        if params.get("ARRIVAL_PROFILE"):
+            chart_render.render_charts(arrival_specs(params["ARRIVAL_PROFILE"], record["theory"]), record["output_dir"])
+        else:
+            plot_traffic_pattern(
+                threads=params.get("THREADS", 1),
+                ramp_up=params.get("RAMP_UP", 0),
+                duration=params.get("DURATION", 60),
+                think_time_ms=params.get("THINK_TIME", 0),
+                show=False,
+                output_dir=record["output_dir"]
+            )
+        if record["drift"] is not None:
+            chart_render.render_chart(drift_chart_spec(record["drift"]), record["output_dir"])
+        print(f"✅ Graphs saved to {record['output_dir']}")
     except Exception as e:
         print(f"❌ Error rendering traffic pattern graph: {e}")
+    return record
+
+def main():
+    print("=== JMeter Calculator & Test Runner ===")
+    
+    yaml_file = input(f"Enter test case YAML (e.g. light.yaml, from '{YAML_TESTCASES_DIR}' directory): ").strip()
+    run_yaml_test_case(os.path.join(YAML_TESTCASES_DIR, yaml_file))
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
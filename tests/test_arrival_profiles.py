@@ -0,0 +1,17 @@
+import re
+
+from arrival_profiles import calculate_open_model_values, open_model_plan_params
+
+
+def test_shaping_schedule_matches_plan_duration():
+    # 40 ramps of 2.4 s: rounding each duration would schedule 80 s for a 96 s profile
+    profile = [{"shape": "ramp", "from": i, "to": i + 1, "duration": 2.4} for i in range(40)]
+    theory = calculate_open_model_values(profile, response_time_ms=50)
+    plan = open_model_plan_params({"ARRIVAL_PROFILE": profile}, theory)
+
+    durations = [int(row[2]) for row in re.findall(
+        r'<collectionProp name="-?\d+">' + r'<stringProp name="-?\d+">([^<]*)</stringProp>' * 3, plan["LOAD_PROFILE"])]
+
+    assert sum(durations) == plan["DURATION"] == 96
+    assert min(durations) >= 1
+    assert theory["shaping_rows"] == len(durations)
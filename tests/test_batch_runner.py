@@ -0,0 +1,46 @@
+import csv
+import os
+
+import batch_runner
+from batch_runner import ResultsStore, run_batch
+
+
+def _record(params, status, output_dir):
+    completed = status == "completed"
+    return {
+        "params": params, "status": status, "error": None if completed else "boom", "output_dir": output_dir,
+        "profile": None, "drift": None,
+        "theory": {"max_rps": 10.0, "total_requests_approx": 600.0, "total_simulation_time": 60.0} if completed else None,
+        "actual": {"actual_rps": 9.5, "actual_requests": 570, "duration_sec": 60.0} if completed else None,
+        "efficiency_pct": 95.0 if completed else None,
+    }
+
+
+def test_csv_store_keeps_only_completed_runs(tmp_path):
+    store_path = str(tmp_path / "results.csv")
+    store = ResultsStore(store_path)
+
+    store.append(_record({"NAME": "ok", "THREADS": 10}, "completed", "ok"), "b1", "t")
+    store.append(_record({"NAME": "broken", "THREADS": 10}, "failed", "broken"), "b1", "t")
+
+    with open(store_path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [row["TestCase"] for row in rows] == ["Ok"]
+    assert rows[0]["ActualRPS"] == "9.5"
+
+
+def test_name_is_sanitized_into_the_batch_directory(tmp_path, monkeypatch):
+    def fake_run_test_case(params, output_dir, template_path=None, name=None):
+        return _record(params, "completed", output_dir)
+
+    monkeypatch.setattr(batch_runner, "run_test_case", fake_run_test_case)
+    case = tmp_path / "case.yaml"
+    case.write_text('NAME: "../up/and away"\nTHREADS: 1\n')
+
+    records = run_batch([str(case), str(case)], store_path=str(tmp_path / "results.csv"),
+                        output_root=str(tmp_path / "batch"))
+
+    batch_dirs = os.listdir(tmp_path / "batch")
+    assert len(batch_dirs) == 1
+    assert sorted(os.listdir(tmp_path / "batch" / batch_dirs[0])) == ["_up_and_away", "_up_and_away_2"]
+    assert [r["params"]["NAME"] for r in records] == ["_up_and_away", "_up_and_away_2"]
@@ -0,0 +1,31 @@
+import pytest
+
+from capacity_search import evaluate_probe, initial_bracket
+from drift_analysis import compare_with_theory
+from jmeter_calc import calculate_closed_loop_values
+from jmeter_sim import simulate_test_case
+
+
+def test_bracket_counts_the_response_time():
+    # 500 ms think + 500 ms response: one thread sends 1 req/s, so 100 req/s takes 100 threads
+    params = {"THREADS": 10, "THINK_TIME": 500, "RESPONSE_TIME": 500}
+    assert initial_bracket(params, max_rps=100) == (1, 100)
+
+
+def test_unsaturated_probe_is_fully_efficient_despite_its_ramp_up():
+    params = {"THREADS": 50, "RAMP_UP": 5, "DURATION": 30, "THINK_TIME": 500}
+    theory = calculate_closed_loop_values(threads=50, ramp_up=5, duration=30, think_time_ms=500, response_time_ms=20)
+    simulated = simulate_test_case(params, response_time_ms=20, seed=1)
+    actual = dict(simulated, actual_requests=simulated["total_requests"], error_rate_pct=0.0, p99_latency_ms=20,
+                  actual_rps=simulated["total_requests"] / simulated["duration_sec"])
+    record = {
+        "params": params, "theory": theory, "actual": actual, "status": "completed", "output_dir": "probe",
+        "efficiency_pct": actual["actual_rps"] / theory["max_rps"] * 100,
+        "drift": compare_with_theory(params, theory, actual),
+    }
+
+    point = evaluate_probe(record, min_efficiency_pct=95, max_error_pct=1)
+
+    assert record["efficiency_pct"] < 95 # the whole run counts the ramp-up against the plateau
+    assert point["efficiency_pct"] == pytest.approx(100, abs=3)
+    assert point["passed"]
@@ -0,0 +1,16 @@
+from drift_analysis import compare_with_theory
+from jmeter_calc import MIN_PROCESSING_TIME_MS, calculate_closed_loop_values
+from jmeter_sim import simulate_test_case
+
+
+def test_simulated_run_has_no_drift():
+    params = {"THREADS": 50, "RAMP_UP": 30, "DURATION": 120, "THINK_TIME": 500}
+    theory = calculate_closed_loop_values(threads=50, ramp_up=30, duration=120, think_time_ms=500)
+    actual = simulate_test_case(params, response_time_ms=MIN_PROCESSING_TIME_MS, seed=1)
+
+    drift = compare_with_theory(params, theory, actual)
+
+    assert drift["drift_alarm_sec"] is None
+    assert drift["change_point_sec"] is None
+    assert drift["tail_sec"] == 0
+    assert 95 <= drift["overall_efficiency_pct"] <= 105
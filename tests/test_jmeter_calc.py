@@ -0,0 +1,28 @@
+import pytest
+
+from drift_analysis import scheduler_stop_sec, theoretical_per_second
+from jmeter_calc import (MIN_PROCESSING_TIME_MS, calculate_closed_loop_values, calculate_theoretical_values,
+                         calculate_theoretical_values_batch)
+from jmeter_sim import simulate_test_case
+
+
+@pytest.mark.parametrize("ramp_up, duration", [(30, 120), (20, 10)])
+def test_duration_includes_ramp_up_everywhere(ramp_up, duration):
+    params = {"THREADS": 50, "RAMP_UP": ramp_up, "DURATION": duration, "THINK_TIME": 500}
+    theory = calculate_closed_loop_values(threads=50, ramp_up=ramp_up, duration=duration, think_time_ms=500)
+    simulated = simulate_test_case(params, response_time_ms=MIN_PROCESSING_TIME_MS, seed=1)
+    curve = theoretical_per_second(params, theory)
+
+    # the scheduler stops DURATION seconds after the start: model, drift curve and simulator agree
+    assert theory["total_simulation_time"] - theory["effective_response_time_ms"] / 1000 == pytest.approx(duration)
+    assert scheduler_stop_sec(params, theory) == duration
+    assert curve.size == duration
+    assert simulated["rps_per_second"][duration:].sum() == 0
+    # and they count the same requests
+    assert curve.sum() == pytest.approx(theory["total_requests_approx"], rel=0.02)
+    assert simulated["total_requests"] == pytest.approx(theory["total_requests_approx"], rel=0.03)
+
+    open_loop = calculate_theoretical_values(50, ramp_up, duration, 500)
+    batch = calculate_theoretical_values_batch(50, ramp_up, duration, 500)
+    assert open_loop["total_simulation_time"] == duration
+    assert float(batch["total_requests_approx"]) == pytest.approx(open_loop["total_requests_approx"])
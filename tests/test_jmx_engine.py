@@ -0,0 +1,28 @@
+import pytest
+
+from jmx_engine import JmxTemplateError, load_template, template_params
+
+TEMPLATE = "jmx_template/test_template.jmx"
+
+
+def test_runner_keys_are_left_out_of_the_plan():
+    params = {"NAME": "light", "THREADS": 10, "RAMP_UP": 5, "DURATION": 60, "THINK_TIME": 500, "LOOPS": 3,
+              "PROFILE": "stress", "TARGET_PROCESS": "mock_server.py"}
+
+    plan = load_template(TEMPLATE).render(template_params(TEMPLATE, params))
+
+    assert '<stringProp name="ThreadGroup.num_threads">10</stringProp>' in plan
+    assert set(template_params(TEMPLATE, params)) == {"THREADS", "RAMP_UP", "DURATION", "THINK_TIME"}
+
+
+def test_unused_keys_only_warn(capsys):
+    load_template(TEMPLATE).render({"THREADS": 10, "RAMP_UP": 5, "DURATION": 60, "THINK_TIME": 500, "LOOPS": 3})
+
+    assert "LOOPS" in capsys.readouterr().out
+
+
+def test_misspelled_key_raises():
+    params = {"THREADS": 10, "RAMP_UP": 5, "DURATION": 60, "THINK_TIM": 500}
+
+    with pytest.raises(JmxTemplateError, match=r"unknown test case key\(s\) THINK_TIM;"):
+        template_params(TEMPLATE, params)
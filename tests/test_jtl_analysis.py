@@ -0,0 +1,34 @@
+import numpy as np
+
+from jtl_analysis import JtlAggregate, analyze_jtl_stream
+
+
+def test_corrupt_timestamp_is_skipped(tmp_path):
+    jtl = tmp_path / "result.jtl"
+    rows = ["timeStamp,elapsed,label,success"]
+    rows += [f"{1749700000000 + i * 100},20,GET Root,true" for i in range(50)]
+    rows.append("0,20,GET Root,true")
+    jtl.write_text("\n".join(rows) + "\n")
+
+    for workers in (1, 2):
+        result = analyze_jtl_stream(str(jtl), workers=workers)
+
+        assert result["actual_requests"] == 50
+        assert result["first_timestamp_ms"] == 1749700000000
+        assert result["bucket_start_sec"] == 1749700000
+        assert result["rps_per_second"].size == 5
+
+
+def test_chunk_of_corrupt_timestamps_is_skipped():
+    aggregate = JtlAggregate()
+    good = np.arange(1749700000000, 1749700010000, 100, dtype=np.int64)
+    aggregate.update(good, np.full(good.size, 20.0), np.ones(good.size, dtype=bool))
+
+    # a whole chunk far away passes its own median check but must not stretch the run
+    for corrupt in (np.zeros(10, dtype=np.int64), np.full(10, 5_000_000_000_000, dtype=np.int64)):
+        counted = aggregate.update(corrupt, np.full(10, 20.0), np.ones(10, dtype=bool))
+        assert counted[0].size == 0
+
+    result = aggregate.result()
+    assert result["actual_requests"] == good.size
+    assert result["rps_per_second"].size == 10
@@ -0,0 +1,19 @@
+from jtl_cache import load_jtl_columns
+from plot_jmeter_results import jtl_throughput_spec
+
+
+def test_cache_and_chart_leave_out_corrupt_rows(tmp_path):
+    jtl = tmp_path / "result.jtl"
+    rows = ["timeStamp,elapsed,label,success"]
+    rows += [f"{1749700000000 + i * 100},20,GET Root,{'false' if i % 10 == 0 else 'true'}" for i in range(50)]
+    rows.insert(20, "0,20,GET Root,true")
+    jtl.write_text("\n".join(rows) + "\n")
+
+    columns, _ = load_jtl_columns(str(jtl))
+    assert columns["timeStamp"].shape[0] == 50
+    assert columns["timeStamp"].min() == 1749700000000
+
+    spec = jtl_throughput_spec(str(jtl))
+    successful, failed = (series["y"] for series in spec["series"])
+    assert successful.size == 5
+    assert successful.sum() == 45 and failed.sum() == 5
@@ -0,0 +1,41 @@
+import os
+import time
+
+import pytest
+
+import run_test
+from live_monitor import RunAborted
+
+JTL_HEADER = "timeStamp,elapsed,label,responseCode,success\n"
+
+
+def test_aborted_engine_stops_the_others(tmp_path, monkeypatch):
+    stopped = []
+
+    def fake_run_jmeter(jmx_path, jtl_path, timeout_seconds, monitor=None, log_path=None, profile=None,
+                        resource_sampler=None, stop_event=None):
+        engine = os.path.basename(os.path.dirname(jtl_path))
+        os.makedirs(os.path.dirname(jtl_path), exist_ok=True)
+        with open(jtl_path, "w") as f:
+            f.write(JTL_HEADER + f"1700000000000,5,{engine},200,true\n")
+        if engine == "engine_1":
+            time.sleep(0.1)
+            raise RunAborted("error rate too high")
+        if stop_event.wait(timeout=timeout_seconds):
+            stopped.append(engine)
+            raise RunAborted("stopped because another engine of this test failed")
+
+    monkeypatch.setattr(run_test, "run_jmeter", fake_run_jmeter)
+    monkeypatch.setattr(run_test, "generate_jmx", lambda *args, **kwargs: None)
+    monkeypatch.setattr(run_test, "build_live_monitor", lambda *args, **kwargs: None)
+
+    params = {"THREADS": 3, "RAMP_UP": 0, "DURATION": 60, "THINK_TIME": 500}
+    jtl_path = str(tmp_path / "result.jtl")
+    started = time.monotonic()
+    with pytest.raises(RunAborted, match="error rate too high"):
+        run_test.run_distributed(params, {}, jtl_path, timeout_seconds=30, engines=3, work_dir=str(tmp_path / "engines"))
+
+    assert time.monotonic() - started < 5
+    assert sorted(stopped) == ["engine_2", "engine_3"]
+    with open(jtl_path) as f:
+        assert len(f.readlines()) == 4 # the merged samples of every engine